@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.security import get_password_hash, verify_password, create_access_token, get_current_user
+from app.core.security import create_access_token, get_current_user
+from app.core.password_hasher import password_hasher
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 
@@ -27,7 +28,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         email=user.email,
         username=user.username,
         full_name=user.full_name,
-        hashed_password=get_password_hash(user.password)
+        hashed_password=await password_hasher.hash(user.password)
     )
     
     db.add(db_user)
@@ -43,7 +44,7 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
     # Find user
     db_user = db.query(User).filter(User.email == user.email).first()
     
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await password_hasher.verify(user.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
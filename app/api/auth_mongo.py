@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.security import get_password_hash, verify_password, create_access_token, decode_access_token
+from app.core.security import create_access_token, is_bcrypt_hash
+from app.core.password_hasher import password_hasher
 from app.models.mongo_models import User, Conversation
+from app.services.user_cache import user_cache
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from beanie import PydanticObjectId
 from typing import Optional
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth/mongo", tags=["MongoDB Authentication"])
 security = HTTPBearer()
@@ -36,7 +41,7 @@ async def register(user_data: UserCreate):
         email=user_data.email,
         username=user_data.username,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password)
+        hashed_password=await password_hasher.hash(user_data.password)
     )
     
     await user.insert()
@@ -52,7 +57,7 @@ async def register(user_data: UserCreate):
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks):
     """Login user and return JWT token."""
     # Find user
     user = await User.find_one({"email": credentials.email})
@@ -66,16 +71,18 @@ async def login(credentials: UserLogin):
     
     # Check password - MongoDB stores in 'password' field with bcrypt hash
     password_valid = False
+    password_field = None
     if user.password:
-        # Check if it's a hashed password (starts with $2a$ or $2b$)
-        if user.password.startswith('$2a$') or user.password.startswith('$2b$'):
-            password_valid = verify_password(credentials.password, user.password)
+        password_field = "password"
+        if is_bcrypt_hash(user.password):
+            password_valid = await password_hasher.verify(credentials.password, user.password)
         else:
             # Plain text password
             password_valid = (credentials.password == user.password)
     elif user.hashed_password:
         # New user with hashed_password field
-        password_valid = verify_password(credentials.password, user.hashed_password)
+        password_field = "hashed_password"
+        password_valid = await password_hasher.verify(credentials.password, user.hashed_password)
     
     if not password_valid:
         raise HTTPException(
@@ -84,6 +91,13 @@ async def login(credentials: UserLogin):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Plaintext, $2a$ or low-cost credentials are upgraded after the response is sent
+    stored_password = getattr(user, password_field)
+    if password_hasher.needs_rehash(stored_password):
+        background_tasks.add_task(
+            upgrade_password_hash, str(user.id), password_field, stored_password, credentials.password
+        )
+    
     # Create access token
     access_token = create_access_token(
         data={"sub": user.email, "user_id": str(user.id)}
@@ -92,10 +106,30 @@ async def login(credentials: UserLogin):
     return Token(access_token=access_token, token_type="bearer")
 
 
+async def upgrade_password_hash(user_id: str, field: str, old_value: str, password: str):
+    """
+    Rewrite a verified credential as a $2b$ hash at the current cost, in the field it came from.
+
+    The update only applies if the stored value is still the one that was verified, so a
+    password change made in the meantime is never overwritten.
+    """
+    try:
+        new_hash = await password_hasher.hash(password)
+        result = await User.get_motor_collection().update_one(
+            {"_id": PydanticObjectId(user_id), field: old_value},
+            {"$set": {field: new_hash}}
+        )
+        if result.modified_count:
+            password_hasher.rehashed += 1
+            user_cache.invalidate(user_id)
+    except Exception as e:
+        logger.error(f"Error upgrading password hash for user {user_id}: {e}")
+
+
 async def get_current_user_mongo(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
-    """Get current authenticated user from MongoDB."""
+    """Get current authenticated user from MongoDB (cached briefly per user)."""
     token = credentials.credentials
-    payload = decode_access_token(token)
+    payload = user_cache.decode_token(token)
     
     user_id: str = payload.get("user_id")
     if user_id is None:
@@ -105,7 +139,7 @@ async def get_current_user_mongo(credentials: HTTPAuthorizationCredentials = Dep
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await User.get(PydanticObjectId(user_id))
+    user = await user_cache.get_user(user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -160,6 +194,7 @@ async def update_user_profile(
     """Update user preferences for personalization."""
     current_user.preferences = preferences
     await current_user.save()
+    user_cache.invalidate(str(current_user.id))
     
     return {
         "message": "Profile updated successfully",
@@ -8,9 +8,10 @@ from app.schemas.chat import (
     ChatRequest, ChatResponse, ConversationResponse,
     ConversationCreate, MessageResponse
 )
-from app.services.llm_service import llm_service
+from app.services.llm_service import llm_service, LLMUnavailableError
 from app.services.rag_service import rag_service
 from app.services.translation_service import translation_service
+import math
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -85,7 +86,14 @@ async def chat(
     messages.append({"role": "user", "content": request.message})
     
     # Generate response
-    response_text = await llm_service.generate_response(messages)
+    try:
+        response_text = await llm_service.generate_response(messages)
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The assistant is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     
     # Save assistant message
     assistant_message = Message(
@@ -1,17 +1,64 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.mongo_models import User, Conversation, Message
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from app.models.mongo_models import User, Message
 from app.api.auth_mongo import get_current_user_mongo
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.services.rag_service import RAGService
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, LLMUnavailableError
 from app.services.translation_service import TranslationService
 from app.services.student_service import StudentDataService
-from datetime import datetime
+from app.services.prompt_budget_service import prompt_budget_service
+from app.services.conversation_summary_service import conversation_summary_service
+from app.services.intent_service import intent_service
+from app.services.certificate_lookup_service import certificate_lookup_service
+from app.services.student_summary_cache import student_summary_cache
+from app.services.conversation_store import conversation_store
+from app.core.llm_scheduler import priority_for_role, PRIORITY_PUBLIC
+from app.core.config import settings
+from app.core.timing import StageTimer
 from beanie import PydanticObjectId
-from typing import Optional
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import math
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat/mongo", tags=["MongoDB Chat"])
 
+# Largest conversation page a single request may ask for; use the cursor for more
+MAX_CONVERSATION_PAGE_SIZE = 100
+
+PUBLIC_SYSTEM_PROMPT = """You are SatyaSetu AI Assistant, a helpful chatbot for the SatyaSetu Educational Document Verification System.
+
+Your role:
+- Provide general information about SatyaSetu certificate verification system
+- Explain how the blockchain-based verification works
+- Help users understand certificate authenticity and security
+- Guide users on how to verify certificates
+- Answer questions about educational document verification
+- Explain the benefits of digital certificates
+
+Important Guidelines:
+- You are speaking to a GUEST USER (not logged in)
+- DO NOT show any personal certificate data or student information
+- Encourage users to login for personalized certificate information
+- Be helpful, professional, and informative
+- If asked about specific certificates, tell them to login first
+
+Context from knowledge base:
+{context_text}
+
+Respond in {language} language."""
+
+def llm_unavailable_exception(error: LLMUnavailableError) -> HTTPException:
+    """503 for upstream LLM failures, so error text never lands in conversation history."""
+    return HTTPException(
+        status_code=503,
+        detail="The assistant is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    )
+
+
 # Initialize services
 rag_service = RAGService()
 llm_service = LLMService()
@@ -19,87 +66,177 @@ translation_service = TranslationService()
 student_service = StudentDataService()
 
 
+async def _to_english(message: str, language: str) -> str:
+    if language == "hi":
+        return (await translation_service.translate(message, "hi", "en"))["translated_text"]
+    return message
+
+
+async def _load_conversation(request: ChatRequest, current_user: User) -> Dict:
+    """
+    The requested conversation (owned by the user, only the messages not yet summarized) or a new one.
+    
+    New conversations get their id here and are written together with their first
+    turn, so creating one costs no extra round-trip.
+    """
+    if request.conversation_id and request.conversation_id != 0:
+        conversation = await conversation_store.load(
+            PydanticObjectId(str(request.conversation_id)),
+            str(current_user.id),
+            recent=settings.CONVERSATION_MAX_RAW_MESSAGES,
+            unsummarized=True
+        )
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return conversation
+    
+    return conversation_store.new(str(current_user.id), request.university_id)
+
+
+async def _generate_answer(
+    question_en: str,
+    original_language: str,
+    conversation: Dict,
+    current_user: User,
+    context_docs: List[Dict],
+    student_summary: str
+) -> str:
+    """Personalized prompt + LLM over the inputs gathered by the pipeline."""
+    user_role = getattr(current_user, 'role', 'USER')
+    
+    # Build conversation history: running summary of older turns + recent messages
+    messages = []
+    for msg in conversation_summary_service.recent_messages(
+        conversation["messages"], conversation["message_count"], conversation["summarized_count"]
+    ):
+        messages.append({
+            "role": "user" if msg.is_user else "assistant",
+            "content": msg.content
+        })
+    
+    # Add personalized greeting for first message
+    greeting = ""
+    if conversation["message_count"] == 0:
+        greeting = f"\n\nThis is your first conversation with {current_user.full_name}. Greet them warmly by name and ask how you can help them today."
+    
+    # Fit user data, retrieved context and history into the prompt budget
+    user_info = f"User: {current_user.full_name} ({current_user.email})\n\n{student_summary}"
+    packed = prompt_budget_service.pack(
+        instructions=llm_service.create_system_prompt("", original_language) + greeting,
+        question=question_en,
+        user_data=user_info,
+        summary=conversation["summary"],
+        context_docs=[doc.get("text", "") for doc in context_docs],
+        history=messages,
+        label=f"mongo:{user_role}"
+    )
+    
+    # Create personalized system prompt with user info, student data, and context
+    context_text = "\n\n".join(packed["context_docs"])
+    personalized_context = f"{packed['user_data']}\n\n{context_text}"
+    if packed["summary"]:
+        personalized_context = (
+            f"{packed['user_data']}\n\nSummary of the earlier conversation:\n{packed['summary']}\n\n{context_text}"
+        )
+    system_prompt = llm_service.create_system_prompt(personalized_context, original_language) + greeting
+    
+    # Add system prompt and current question
+    llm_messages = [
+        {"role": "system", "content": system_prompt},
+        *packed["history"],
+        {"role": "user", "content": question_en}
+    ]
+    
+    # Generate response, routed to a model tier from question length/intent and retrieval confidence
+    route = llm_service.route_request(question_en, user_role, context_docs)
+    response_en = await llm_service.generate_response(
+        llm_messages, priority=priority_for_role(user_role), route=route
+    )
+    
+    # Translate response if needed
+    if original_language == "hi":
+        return (await translation_service.translate(response_en, "en", "hi"))["translated_text"]
+    return response_en
+
+
+async def _no_result(value=None):
+    return value
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat_mongo(
     request: ChatRequest,
+    http_response: Response,
     current_user: User = Depends(get_current_user_mongo)
 ):
-    """Chat endpoint using MongoDB for conversation storage."""
+    """
+    Chat endpoint using MongoDB for conversation storage.
+    
+    Runs as a staged pipeline: everything that only depends on the request (conversation
+    load, translation + retrieval, certificate lookup, fast path, user summary, running
+    summary) is gathered concurrently, then the answer is generated. Per-stage latencies
+    are logged and, in debug mode, returned in the Server-Timing header.
+    """
     try:
-        # Translate to English if needed
         original_language = request.language
-        if request.language == "hi":
-            question_en = await translation_service.translate(request.message, "hi", "en")
-        else:
-            question_en = request.message
-        
-        # Get or create conversation
-        if request.conversation_id and request.conversation_id != 0:
-            conversation = await Conversation.get(PydanticObjectId(str(request.conversation_id)))
-            if not conversation or conversation.user_id != str(current_user.id):
-                raise HTTPException(status_code=404, detail="Conversation not found")
-        else:
-            # Create new conversation
-            conversation = Conversation(
-                user_id=str(current_user.id),
-                university_id=request.university_id,
-                messages=[]
-            )
-            await conversation.insert()
-        
-        # Retrieve relevant context using RAG
-        context_docs = await rag_service.retrieve_context(
-            query=question_en,
-            top_k=5,
-            university_id=request.university_id
-        )
-        
-        context_text = "\n\n".join([doc.get("text", "") for doc in context_docs])
-        sources = [doc.get("source", "unknown") for doc in context_docs]
-        
-        # Build conversation history
-        messages = []
-        for msg in conversation.messages[-5:]:  # Last 5 messages for context
-            messages.append({
-                "role": "user" if msg.is_user else "assistant",
-                "content": msg.content
-            })
-        
-        # Get data from MongoDB based on user role
         user_role = getattr(current_user, 'role', 'USER')
-        organization_id = getattr(current_user, 'organization', None)
-        
-        student_summary = await student_service.get_student_summary(
-            current_user.email, 
-            current_user.full_name or current_user.email.split('@')[0],
-            user_role,
-            organization_id
-        )
-        
-        # Create personalized system prompt with user info, student data, and context
-        user_info = f"User: {current_user.full_name} ({current_user.email})\n\n{student_summary}"
-        personalized_context = f"{user_info}\n\n{context_text}"
-        system_prompt = llm_service.create_system_prompt(personalized_context, original_language)
+        timer = StageTimer()
         
-        # Add personalized greeting for first message
-        if len(conversation.messages) == 0:
-            system_prompt += f"\n\nThis is your first conversation with {current_user.full_name}. Greet them warmly by name and ask how you can help them today."
+        # Certificate IDs pasted into chat are resolved directly against the registry,
+        # so the LLM inputs are not needed for those messages
+        certificate_ids = certificate_lookup_service.extract_ids(request.message)
+        needs_llm_inputs = not certificate_ids
         
-        # Add system prompt and current question
-        llm_messages = [
-            {"role": "system", "content": system_prompt},
-            *messages,
-            {"role": "user", "content": question_en}
-        ]
+        async def understand():
+            question = await timer.run("translate", _to_english(request.message, original_language))
+            docs = []
+            if needs_llm_inputs:
+                docs = await timer.run("retrieve", rag_service.retrieve_context(
+                    query=question,
+                    top_k=5,
+                    university_id=request.university_id
+                ))
+            return question, docs
         
-        # Generate response
-        response_en = await llm_service.generate_response(llm_messages)
+        # Stage 1: independent reads, concurrently
+        (
+            conversation,
+            (question_en, context_docs),
+            certificate_results,
+            fast_answer,
+            student_summary
+        ) = await asyncio.gather(
+            timer.run("conversation", _load_conversation(request, current_user)),
+            understand(),
+            timer.run("certificates", certificate_lookup_service.lookup(certificate_ids))
+            if certificate_ids else _no_result([]),
+            # LLM-free fast path for FAQ and simple questions about the user's own certificates
+            timer.run("fast_path", intent_service.try_fast_path(
+                request.message, original_language, current_user.email, user_role
+            )) if settings.FAST_PATH_ENABLED and needs_llm_inputs else _no_result(),
+            timer.run("user_summary", student_summary_cache.get_summary(
+                current_user.email,
+                current_user.full_name or current_user.email.split('@')[0],
+                user_role,
+                getattr(current_user, 'organization', None)
+            )) if needs_llm_inputs else _no_result()
+        )
         
-        # Translate response if needed
-        if original_language == "hi":
-            response = await translation_service.translate(response_en, "en", "hi")
+        # Stage 2: answer
+        llm_used = False
+        if certificate_results:
+            response = certificate_lookup_service.format_answer(certificate_results, original_language)
+            sources = ["SatyaSetu certificate registry"]
+        elif fast_answer:
+            response = fast_answer["answer"]
+            sources = fast_answer["sources"]
         else:
-            response = response_en
+            llm_used = True
+            sources = [doc.get("source", "unknown") for doc in context_docs]
+            response = await timer.run("llm", _generate_answer(
+                question_en, original_language, conversation, current_user,
+                context_docs, student_summary
+            ))
         
         # Save messages to conversation
         user_message = Message(
@@ -116,31 +253,49 @@ async def chat_mongo(
             sources=sources
         )
         
-        conversation.messages.append(user_message)
-        conversation.messages.append(assistant_message)
-        conversation.updated_at = datetime.utcnow()
+        # Atomic $push of the new turn, persisted behind the response unless
+        # CONVERSATION_DURABILITY is "sync"
+        await timer.run("save", conversation_store.append(conversation, [user_message, assistant_message]))
         
-        await conversation.save()
+        # Fold older turns into the running summary off the request path
+        if llm_used:
+            conversation_summary_service.schedule(conversation["id"], conversation["message_count"], conversation)
+        
+        logger.info(f"chat_mongo stages: {timer.header()}")
+        timer.apply(http_response)
         
         return ChatResponse(
-            conversation_id=str(conversation.id),
+            conversation_id=str(conversation["id"]),
             message=response,
             response=response,
             language=original_language,
-            sources=sources
+            sources=sources,
+            certificates=certificate_results
         )
     
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        raise llm_unavailable_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/conversations")
-async def get_conversations(current_user: User = Depends(get_current_user_mongo)):
-    """Get all conversations for ONLY the current logged-in user."""
+async def get_conversations(
+    current_user: User = Depends(get_current_user_mongo),
+    limit: int = Query(50, description="Conversations per page (max 100)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Get conversations for ONLY the current logged-in user, most recently updated first.
+
+    Only header fields are read (no messages), paged by (updated_at, _id); pass
+    `pagination.next_cursor` back as `cursor` for the next page.
+    """
+    page_size = max(1, min(limit, MAX_CONVERSATION_PAGE_SIZE))
     # IMPORTANT: Only fetch conversations belonging to this specific user
-    conversations = await Conversation.find(
-        {"user_id": str(current_user.id)}
-    ).sort("-updated_at").to_list()
+    conversations, next_cursor = await conversation_store.list_headers(str(current_user.id), page_size, cursor)
     
     return {
         "user": {
@@ -149,14 +304,19 @@ async def get_conversations(current_user: User = Depends(get_current_user_mongo)
         },
         "conversations": [
             {
-                "id": str(conv.id),
-                "created_at": conv.created_at,
-                "updated_at": conv.updated_at,
-                "message_count": len(conv.messages),
-                "preview": conv.messages[0].content if conv.messages else "Empty conversation"
+                "id": str(conv["_id"]),
+                "created_at": conv.get("created_at"),
+                "updated_at": conv.get("updated_at"),
+                "message_count": conv.get("message_count", 0),
+                "preview": conv.get("preview") or "Empty conversation"
             }
             for conv in conversations
-        ]
+        ],
+        "pagination": {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
     }
 
 
@@ -166,10 +326,10 @@ async def get_conversation(
     current_user: User = Depends(get_current_user_mongo)
 ):
     """Get a specific conversation - ONLY if it belongs to the logged-in user."""
-    conversation = await Conversation.get(PydanticObjectId(conversation_id))
+    # SECURITY CHECK: the owner is part of the lookup, so users can only access their own conversations
+    conversation = await conversation_store.load(PydanticObjectId(conversation_id), str(current_user.id))
     
-    # SECURITY CHECK: Ensure user can only access their own conversations
-    if not conversation or conversation.user_id != str(current_user.id):
+    if not conversation:
         raise HTTPException(
             status_code=404, 
             detail="Conversation not found or you don't have permission to access it"
@@ -178,9 +338,9 @@ async def get_conversation(
     return {
         "user": current_user.full_name,
         "conversation": {
-            "id": str(conversation.id),
-            "created_at": conversation.created_at,
-            "updated_at": conversation.updated_at,
+            "id": str(conversation["id"]),
+            "created_at": conversation["created_at"],
+            "updated_at": conversation["updated_at"],
             "messages": [
                 {
                     "content": msg.content,
@@ -189,7 +349,7 @@ async def get_conversation(
                     "language": msg.language,
                     "sources": msg.sources
                 }
-                for msg in conversation.messages
+                for msg in conversation["messages"]
             ]
         }
     }
@@ -202,10 +362,33 @@ async def chat_public(request: ChatRequest):
         # Translate to English if needed
         original_language = request.language
         if request.language == "hi":
-            question_en = await translation_service.translate(request.message, "hi", "en")
+            question_en = (await translation_service.translate(request.message, "hi", "en"))["translated_text"]
         else:
             question_en = request.message
         
+        # Certificate IDs are verified directly; guests get status/issuer but no student details
+        certificate_ids = certificate_lookup_service.extract_ids(request.message)
+        if certificate_ids:
+            certificate_results = await certificate_lookup_service.lookup(certificate_ids, include_student=False)
+            return ChatResponse(
+                conversation_id="0",
+                message=certificate_lookup_service.format_answer(certificate_results, original_language),
+                sources=["SatyaSetu certificate registry"],
+                language=original_language,
+                certificates=certificate_results
+            )
+        
+        # LLM-free fast path for FAQ questions (no personal data for guests)
+        if settings.FAST_PATH_ENABLED:
+            fast_answer = await intent_service.try_fast_path(request.message, original_language)
+            if fast_answer:
+                return ChatResponse(
+                    conversation_id="0",
+                    message=fast_answer["answer"],
+                    sources=fast_answer["sources"],
+                    language=original_language
+                )
+        
         # Retrieve relevant context using RAG
         context_docs = await rag_service.retrieve_context(
             query=question_en,
@@ -213,31 +396,19 @@ async def chat_public(request: ChatRequest):
             university_id=request.university_id
         )
         
-        context_text = "\n\n".join([doc.get("text", "") for doc in context_docs])
         sources = [doc.get("source", "unknown") for doc in context_docs]
         
+        # Fit retrieved context into the prompt budget
+        packed = prompt_budget_service.pack(
+            instructions=PUBLIC_SYSTEM_PROMPT.format(context_text="", language=original_language),
+            question=question_en,
+            context_docs=[doc.get("text", "") for doc in context_docs],
+            label="public"
+        )
+        context_text = "\n\n".join(packed["context_docs"])
+        
         # Create public system prompt (no personal info)
-        public_system_prompt = f"""You are SatyaSetu AI Assistant, a helpful chatbot for the SatyaSetu Educational Document Verification System.
-
-Your role:
-- Provide general information about SatyaSetu certificate verification system
-- Explain how the blockchain-based verification works
-- Help users understand certificate authenticity and security
-- Guide users on how to verify certificates
-- Answer questions about educational document verification
-- Explain the benefits of digital certificates
-
-Important Guidelines:
-- You are speaking to a GUEST USER (not logged in)
-- DO NOT show any personal certificate data or student information
-- Encourage users to login for personalized certificate information
-- Be helpful, professional, and informative
-- If asked about specific certificates, tell them to login first
-
-Context from knowledge base:
-{context_text}
-
-Respond in {original_language} language."""
+        public_system_prompt = PUBLIC_SYSTEM_PROMPT.format(context_text=context_text, language=original_language)
         
         # Generate response
         llm_messages = [
@@ -245,11 +416,14 @@ Respond in {original_language} language."""
             {"role": "user", "content": question_en}
         ]
         
-        response_en = await llm_service.generate_response(llm_messages)
+        route = llm_service.route_request(question_en, None, context_docs)
+        response_en = await llm_service.generate_response(
+            llm_messages, priority=PRIORITY_PUBLIC, route=route
+        )
         
         # Translate response if needed
         if original_language == "hi":
-            response = await translation_service.translate(response_en, "en", "hi")
+            response = (await translation_service.translate(response_en, "en", "hi"))["translated_text"]
         else:
             response = response_en
         
@@ -261,5 +435,9 @@ Respond in {original_language} language."""
             language=original_language
         )
     
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        raise llm_unavailable_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
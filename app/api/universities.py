@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.university import University
@@ -9,9 +10,162 @@ from app.services.university_service import university_service
 from app.models.mongo_models import User, Certificate
 from bson import ObjectId
 from app.core.mongodb import get_database
+from app.core.config import INSTITUTION_ROLES, settings
+from app.services.institution_stats_service import institution_stats_service
+from app.core.timing import StageTimer
+from app.core.pagination import keyset_filter, page_result
+from datetime import datetime
+import asyncio
+import csv
+import io
+import json
+import time
+import zlib
 
 router = APIRouter(prefix="/universities", tags=["Universities"])
 
+# Issuer (sub-admin) details rarely change; cache them per process
+ISSUER_CACHE_TTL_SECONDS = 300
+ISSUER_CACHE_MAX_ENTRIES = 5000
+_issuer_cache: Dict[ObjectId, tuple] = {}
+
+# Largest certificate page a single request may ask for; use the cursor for more
+MAX_CERTIFICATE_PAGE_SIZE = 500
+
+# Only the fields the institution details response uses
+INSTITUTION_FIELDS = {"name": 1, "email": 1, "address": 1, "type": 1, "createdAt": 1, "updatedAt": 1}
+CERTIFICATE_FIELDS = {
+    "certificateId": 1, "student.fullName": 1, "student.course": 1, "student.department": 1,
+    "student.rollNumber": 1, "student.registrationNumber": 1, "student.cgpa": 1,
+    "student.passingYear": 1, "student.issueDate": 1, "issuedAt": 1, "status": 1, "pdfUrl": 1,
+    "verificationUrl": 1, "issuerId": 1, "blockchainStatus": 1, "createdAt": 1,
+    "metadata.templateName": 1
+}
+
+
+async def resolve_issuers(mongo_db, issuer_ids) -> Dict:
+    """Issuer details for a set of user ids: cache first, then one `$in` query for the rest."""
+    now = time.monotonic()
+    issuers = {}
+    missing = []
+    for issuer_id in set(issuer_ids):
+        cached = _issuer_cache.get(issuer_id)
+        if cached and cached[0] > now:
+            issuers[issuer_id] = cached[1]
+        else:
+            missing.append(issuer_id)
+    
+    if missing:
+        found = {}
+        async for issuer in mongo_db.users.find(
+            {"_id": {"$in": missing}},
+            {"name": 1, "full_name": 1, "email": 1, "role": 1}
+        ):
+            found[issuer["_id"]] = {
+                "id": str(issuer.get('_id')),
+                "name": issuer.get('name') or issuer.get('full_name'),
+                "email": issuer.get('email'),
+                "role": issuer.get('role')
+            }
+        
+        if len(_issuer_cache) + len(missing) > ISSUER_CACHE_MAX_ENTRIES:
+            _issuer_cache.clear()
+        for issuer_id in missing:
+            # Unknown issuers are cached too, so they are not looked up again on every request
+            issuers[issuer_id] = found.get(issuer_id)
+            _issuer_cache[issuer_id] = (now + ISSUER_CACHE_TTL_SECONDS, issuers[issuer_id])
+    
+    return issuers
+
+
+def serialize_certificate(cert: Dict, issuers: Dict) -> Dict:
+    """API representation of a certificate document."""
+    return {
+        "certificate_id": cert.get('certificateId'),
+        "student_name": cert.get('student', {}).get('fullName'),
+        "course": cert.get('student', {}).get('course'),
+        "department": cert.get('student', {}).get('department'),
+        "roll_number": cert.get('student', {}).get('rollNumber'),
+        "registration_number": cert.get('student', {}).get('registrationNumber'),
+        "cgpa": cert.get('student', {}).get('cgpa'),
+        "passing_year": cert.get('student', {}).get('passingYear'),
+        "issue_date": cert.get('student', {}).get('issueDate') or cert.get('issuedAt'),
+        "status": cert.get('status'),
+        "pdf_url": cert.get('pdfUrl'),
+        "verification_url": cert.get('verificationUrl'),
+        "issuer": issuers.get(cert.get('issuerId')) if cert.get('issuerId') else None,
+        "blockchain_status": cert.get('blockchainStatus'),
+        "created_at": cert.get('createdAt'),
+        "template_name": cert.get('metadata', {}).get('templateName')
+    }
+
+
+EXPORT_CSV_COLUMNS = [
+    "certificate_id", "student_name", "course", "department", "roll_number", "registration_number",
+    "cgpa", "passing_year", "issue_date", "status", "blockchain_status", "pdf_url", "verification_url",
+    "issuer_name", "issuer_email", "created_at", "template_name"
+]
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _export_batches(mongo_db, org_id: ObjectId):
+    """Serialized certificates of an institution, one cursor batch at a time."""
+    cursor = mongo_db.certificates.find({"institutionId": org_id}, CERTIFICATE_FIELDS).sort(
+        [("issuedAt", -1), ("_id", -1)]
+    ).batch_size(settings.EXPORT_BATCH_SIZE)
+    
+    batch = []
+    async for cert in cursor:
+        batch.append(cert)
+        if len(batch) >= settings.EXPORT_BATCH_SIZE:
+            yield await _serialize_batch(mongo_db, batch)
+            batch = []
+    if batch:
+        yield await _serialize_batch(mongo_db, batch)
+
+
+async def _serialize_batch(mongo_db, batch: List[Dict]) -> List[Dict]:
+    issuers = await resolve_issuers(mongo_db, [cert['issuerId'] for cert in batch if cert.get('issuerId')])
+    return [serialize_certificate(cert, issuers) for cert in batch]
+
+
+async def _export_chunks(mongo_db, org_id: ObjectId, export_format: str, compress: bool):
+    """Encoded (and optionally gzip-compressed) export body, produced batch by batch."""
+    # wbits=31 makes zlib write a gzip container
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+    
+    if export_format == "csv":
+        yield encode(",".join(EXPORT_CSV_COLUMNS) + "\r\n")
+    
+    async for rows in _export_batches(mongo_db, org_id):
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                issuer = row.pop("issuer") or {}
+                row["issuer_name"] = issuer.get("name")
+                row["issuer_email"] = issuer.get("email")
+                writer.writerow([_export_value(row.get(column)) for column in EXPORT_CSV_COLUMNS])
+            chunk = buffer.getvalue()
+        else:
+            chunk = "".join(json.dumps(row, default=_export_value) + "\n" for row in rows)
+        
+        data = encode(chunk)
+        if data:
+            yield data
+    
+    if compressor:
+        yield compressor.flush()
+
 
 @router.get("/", response_model=List[UniversityResponse])
 async def search_universities(
@@ -71,8 +225,10 @@ async def get_verification_info(
 @router.get("/institution/{institution_id}/details")
 async def get_institution_details(
     institution_id: str,
+    response: Response,
     include_certificates: bool = Query(True, description="Include certificates issued by sub-admins"),
-    limit_certificates: int = Query(100, description="Maximum number of certificates to return")
+    limit_certificates: int = Query(100, description="Maximum number of certificates to return (page size, capped at 500)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Get comprehensive institution details including all sub-admins and certificates.
@@ -82,7 +238,12 @@ async def get_institution_details(
     Parameters:
     - institution_id: The MongoDB ObjectId of the institution
     - include_certificates: Whether to include certificate details (default: True)
-    - limit_certificates: Maximum number of certificates to return (default: 100)
+    - limit_certificates: Maximum number of certificates to return (default: 100, max: 500)
+    - cursor: Opaque cursor from `pagination.next_cursor` to fetch the next page
+    
+    Certificates are returned newest first and paged by (issuedAt, _id), so every
+    page costs the same however deep it is. Independent reads run concurrently; in debug mode their durations are returned
+    in the Server-Timing header.
     """
     try:
         # Convert string to ObjectId
@@ -92,14 +253,33 @@ async def get_institution_details(
         org_id = ObjectId(institution_id)
         mongo_db = get_database()
         
-        # Get institution details
-        institution = await mongo_db.institutions.find_one({"_id": org_id})
+        timer = StageTimer()
+        page_size = max(1, min(limit_certificates, MAX_CERTIFICATE_PAGE_SIZE))
+        certificate_query = {"institutionId": org_id, **keyset_filter("issuedAt", cursor)}
+
+        # Query plan: institution, linked users, the certificate page and the certificate
+        # count are independent, so they run concurrently; issuers depend on the page
+        reads = [
+            timer.run("institution", mongo_db.institutions.find_one({"_id": org_id}, INSTITUTION_FIELDS)),
+            timer.run("users", User.find({"organization": str(org_id)}).to_list())
+        ]
+        if include_certificates:
+            reads += [
+                timer.run(
+                    "certificates",
+                    mongo_db.certificates.find(certificate_query, CERTIFICATE_FIELDS)
+                    .sort([("issuedAt", -1), ("_id", -1)])
+                    .limit(page_size + 1)
+                    .to_list(length=page_size + 1)
+                ),
+                timer.run("stats", institution_stats_service.get(org_id))
+            ]
+        results = await asyncio.gather(*reads)
+        institution, all_users = results[0], results[1]
+        
         if not institution:
             raise HTTPException(status_code=404, detail="Institution not found")
         
-        # Get all users (sub-admins) linked to this institution
-        all_users = await User.find({"organization": str(org_id)}).to_list()
-        
         # Organize users by role
         sub_admins = []
         regular_users = []
@@ -116,7 +296,7 @@ async def get_institution_details(
                 "meta": user.meta or {}
             }
             
-            if user.role in ['ADMIN', 'SUBADMIN', 'INSTITUTION_ADMIN', 'INSTITUTION']:
+            if user.role in INSTITUTION_ROLES:
                 sub_admins.append(user_data)
             else:
                 regular_users.append(user_data)
@@ -124,52 +304,21 @@ async def get_institution_details(
         # Get certificates issued by this institution
         certificates_data = []
         total_certificates = 0
+        next_cursor = None
         
         if include_certificates:
-            # Query certificates from MongoDB using native collection
-            certificates_cursor = mongo_db.certificates.find(
-                {"institutionId": org_id}
-            ).limit(limit_certificates)
-            
-            certificates_list = await certificates_cursor.to_list(length=limit_certificates)
-            total_certificates = await mongo_db.certificates.count_documents({"institutionId": org_id})
+            stats = results[3]
+            certificates_list, next_cursor = page_result(results[2], page_size, "issuedAt")
+            total_certificates = stats["total"] if stats else 0
             
-            # Process certificates
-            for cert in certificates_list:
-                # Get issuer details
-                issuer_info = None
-                if cert.get('issuerId'):
-                    issuer = await mongo_db.users.find_one({"_id": cert.get('issuerId')})
-                    if issuer:
-                        issuer_info = {
-                            "id": str(issuer.get('_id')),
-                            "name": issuer.get('name') or issuer.get('full_name'),
-                            "email": issuer.get('email'),
-                            "role": issuer.get('role')
-                        }
-                
-                cert_data = {
-                    "certificate_id": cert.get('certificateId'),
-                    "student_name": cert.get('student', {}).get('fullName'),
-                    "course": cert.get('student', {}).get('course'),
-                    "department": cert.get('student', {}).get('department'),
-                    "roll_number": cert.get('student', {}).get('rollNumber'),
-                    "registration_number": cert.get('student', {}).get('registrationNumber'),
-                    "cgpa": cert.get('student', {}).get('cgpa'),
-                    "passing_year": cert.get('student', {}).get('passingYear'),
-                    "issue_date": cert.get('student', {}).get('issueDate') or cert.get('issuedAt'),
-                    "status": cert.get('status'),
-                    "pdf_url": cert.get('pdfUrl'),
-                    "verification_url": cert.get('verificationUrl'),
-                    "issuer": issuer_info,
-                    "blockchain_status": cert.get('blockchainStatus'),
-                    "created_at": cert.get('createdAt'),
-                    "template_name": cert.get('metadata', {}).get('templateName')
-                }
-                certificates_data.append(cert_data)
+            # Resolve all issuers at once instead of one query per certificate
+            issuers = await timer.run("issuers", resolve_issuers(
+                mongo_db, [cert['issuerId'] for cert in certificates_list if cert.get('issuerId')]
+            ))
+            certificates_data = [serialize_certificate(cert, issuers) for cert in certificates_list]
         
         # Build response
-        response = {
+        details = {
             "institution": {
                 "id": str(institution.get('_id')),
                 "name": institution.get('name'),
@@ -187,10 +336,16 @@ async def get_institution_details(
             },
             "sub_admins": sub_admins,
             "regular_users": regular_users,
-            "certificates": certificates_data if include_certificates else []
+            "certificates": certificates_data if include_certificates else [],
+            "pagination": {
+                "page_size": page_size,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
+            }
         }
         
-        return response
+        timer.apply(response)
+        return details
         
     except HTTPException:
         raise
@@ -198,11 +353,71 @@ async def get_institution_details(
         raise HTTPException(status_code=500, detail=f"Error fetching institution details: {str(e)}")
 
 
+@router.get("/institution/{institution_id}/stats")
+async def get_institution_stats(institution_id: str):
+    """
+    Certificate counts for an institution: total and by status, course, department,
+    issue year and blockchain status. Served from the `institution_stats` view.
+    """
+    try:
+        if not ObjectId.is_valid(institution_id):
+            raise HTTPException(status_code=400, detail="Invalid institution ID format")
+        
+        stats = await institution_stats_service.get(institution_id)
+        if not stats:
+            return {"institution_id": institution_id, "total": 0}
+        
+        stats["institution_id"] = str(stats.pop("_id"))
+        return stats
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching institution stats: {str(e)}")
+
+
+@router.get("/institution/{institution_id}/certificates/export")
+async def export_institution_certificates(
+    institution_id: str,
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    gzip: bool = Query(True, description="Compress the stream when the client accepts gzip")
+):
+    """
+    Stream every certificate of an institution as NDJSON or CSV, newest first.
+    
+    Rows are written as the Mongo cursor is read (EXPORT_BATCH_SIZE at a time), so
+    memory use does not depend on the institution's size.
+    """
+    if not ObjectId.is_valid(institution_id):
+        raise HTTPException(status_code=400, detail="Invalid institution ID format")
+    
+    org_id = ObjectId(institution_id)
+    mongo_db = get_database()
+    institution = await mongo_db.institutions.find_one({"_id": org_id}, {"_id": 1})
+    if not institution:
+        raise HTTPException(status_code=404, detail="Institution not found")
+    
+    compress = gzip and "gzip" in request.headers.get("accept-encoding", "")
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="certificates-{institution_id}.{export_format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(
+        _export_chunks(mongo_db, org_id, export_format, compress),
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @router.get("/user/{user_email}/institution-details")
 async def get_user_institution_details(
     user_email: str,
+    response: Response,
     include_certificates: bool = Query(True, description="Include certificates issued by sub-admins"),
-    limit_certificates: int = Query(100, description="Maximum number of certificates to return")
+    limit_certificates: int = Query(100, description="Maximum number of certificates to return (page size, capped at 500)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Get institution details by user email (e.g., Mumbai University SE ID).
@@ -211,7 +426,8 @@ async def get_user_institution_details(
     Parameters:
     - user_email: Email of the institution admin or sub-admin
     - include_certificates: Whether to include certificate details (default: True)
-    - limit_certificates: Maximum number of certificates to return (default: 100)
+    - limit_certificates: Maximum number of certificates to return (default: 100, max: 500)
+    - cursor: Opaque cursor from `pagination.next_cursor` to fetch the next page
     """
     try:
         # Find user by email
@@ -225,8 +441,10 @@ async def get_user_institution_details(
         # Call the institution details endpoint with the organization ID
         return await get_institution_details(
             institution_id=user.organization,
+            response=response,
             include_certificates=include_certificates,
-            limit_certificates=limit_certificates
+            limit_certificates=limit_certificates,
+            cursor=cursor
         )
         
     except HTTPException:
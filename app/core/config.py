@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List
 import os
 
 
@@ -21,6 +21,11 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str = "mongodb://localhost:27017"  # Override with environment variable
     MONGODB_DB_NAME: str = "SatyaSetu"
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MIN_POOL_SIZE: int = 2  # Keep a few warm connections so chat turns skip the handshake
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_OPERATION_TIMEOUT_MS: int = 5000  # Server-side maxTimeMS for request-path queries
     
     # Groq API (Free)
     GROQ_API_KEY: str = ""
@@ -41,8 +46,83 @@ class Settings(BaseSettings):
     CHUNK_OVERLAP: int = 50
     TOP_K_RESULTS: int = 5
     
+    # Prompt Budget
+    PROMPT_MAX_TOKENS: int = 6000  # Input tokens allowed per chat prompt (completion is budgeted separately)
+    PROMPT_MESSAGE_OVERHEAD_TOKENS: int = 4  # Role/formatting tokens added per chat message
+    # Soft shares of the remaining budget, in priority order (leftovers flow to higher priority first)
+    PROMPT_BUDGET_SHARES: Dict[str, float] = {"user_data": 0.4, "summary": 0.1, "context": 0.3, "history": 0.2}
+    
+    # Conversation Summarization
+    CONVERSATION_RECENT_MESSAGES: int = 6  # Raw messages kept in the prompt after the running summary
+    CONVERSATION_MAX_RAW_MESSAGES: int = 40  # Cap on unsummarized messages loaded into a prompt while folding lags
+    CONVERSATION_SUMMARY_TRIGGER: int = 10  # Unsummarized older messages needed before folding them
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 300
+    
+    # Conversation persistence: "async" queues writes behind the response, "sync" awaits them
+    CONVERSATION_DURABILITY: str = "async"
+    CONVERSATION_WRITE_QUEUE_SIZE: int = 1000
+    CONVERSATION_WRITE_BATCH_SIZE: int = 50
+    CONVERSATION_WRITE_MAX_RETRIES: int = 3
+    
     # Rate Limiting
-    MAX_REQUESTS_PER_MINUTE: int = 30
+    RATE_LIMIT_ENABLED: bool = True
+    MAX_REQUESTS_PER_MINUTE: int = 30  # Per authenticated user
+    PUBLIC_MAX_REQUESTS_PER_MINUTE: int = 10  # Per IP for anonymous traffic
+    RATE_LIMIT_BURST: int = 10  # Token bucket capacity
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per process) or "mongodb" (shared across workers)
+    TRUSTED_PROXY_HOPS: int = 1  # Proxies in front of the API that append to X-Forwarded-For (Railway: 1)
+    
+    # LLM admission control
+    LLM_MAX_CONCURRENCY: int = 8  # Outstanding Groq calls per process
+    LLM_MAX_QUEUE: int = 32  # Requests allowed to wait for a free slot
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 15.0
+    # Weighted fair queuing between priority classes, and the max share of slots each may hold
+    LLM_PRIORITY_WEIGHTS: Dict[str, float] = {"admin": 6, "student": 3, "public": 1, "background": 1}
+    LLM_PRIORITY_SHARES: Dict[str, float] = {"admin": 1.0, "student": 0.75, "public": 0.5, "background": 0.25}
+    
+    # LLM resilience
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before failing fast
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_HEDGE_ENABLED: bool = False  # Send a second request once a call exceeds the observed p95
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    
+    # Model routing: tier -> Groq model and completion budget ("" model = GROQ_MODEL)
+    LLM_MODEL_TIERS: Dict[str, Dict[str, Any]] = {
+        "fast": {"model": "llama-3.1-8b-instant", "max_tokens": 384},
+        "standard": {"model": "", "max_tokens": 1024},
+        "complex": {"model": "", "max_tokens": 2048}
+    }
+    LLM_ROUTING_ENABLED: bool = True
+    LLM_ROUTING_MIN_RETRIEVAL_CONFIDENCE: float = 0.6  # FAQ answers need a good knowledge-base match to go fast
+    
+    # LLM-free fast paths (intent router)
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_MIN_CONFIDENCE: float = 0.85
+    CERTIFICATE_BLOOM_REFRESH_SECONDS: int = 300
+    CERTIFICATE_BLOOM_FP_RATE: float = 0.001
+    
+    # Cached per-user student summaries (invalidated by certificate changes)
+    STUDENT_SUMMARY_CACHE_TTL_SECONDS: int = 600
+    STUDENT_SUMMARY_CACHE_MAX_ENTRIES: int = 2000
+    CERTIFICATE_WATCH_POLL_SECONDS: int = 30
+    
+    # Authenticated users cached per process (profile updates invalidate immediately)
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    
+    # bcrypt worker pool (0 workers = one per CPU core)
+    BCRYPT_WORKERS: int = 0
+    BCRYPT_ROUNDS: int = 0  # Cost factor for new hashes; 0 tunes it at startup to BCRYPT_TARGET_MS
+    BCRYPT_TARGET_MS: float = 250.0
+    BCRYPT_MAX_QUEUE: int = 64  # Password checks allowed to wait for a worker before shedding with 503
+    
+    # Streaming certificate export
+    EXPORT_BATCH_SIZE: int = 1000  # Certificates per Mongo cursor batch (and per issuer lookup)
+    EXPORT_GZIP_LEVEL: int = 6
     
     class Config:
         env_file = ".env"
@@ -50,3 +130,10 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
+
+# User.role groups; every module that branches on a role uses these
+MOE_ROLE = "MOE"
+# Staff of one institution: they see (and ask about) that institution's certificates
+INSTITUTION_ROLES = frozenset({"ADMIN", "INSTITUTION", "INSTITUTION_ADMIN", "SUBADMIN"})
+# Roles whose data covers more than their own certificates
+STAFF_ROLES = INSTITUTION_ROLES | {MOE_ROLE}
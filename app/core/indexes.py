@@ -0,0 +1,146 @@
+"""
+Declarative registry of the MongoDB indexes the API's queries rely on.
+
+`ensure_indexes()` runs at startup. It creates missing indexes with background builds
+and leaves existing ones alone (matched by key pattern, whatever their name), so it is
+safe to run on every boot and against databases indexed by hand.
+
+`QUERY_SHAPES` lists the queries each index serves; check_indexes.py explains them and
+flags any that still fall back to a collection scan.
+"""
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "certificates": [
+        # Student summaries and /student endpoints
+        IndexModel([("student.email", ASCENDING)], name="student_email"),
+        # Admin summaries and institution details; also the keyset pagination order
+        IndexModel(
+            [("institutionId", ASCENDING), ("issuedAt", DESCENDING), ("_id", DESCENDING)],
+            name="institution_issued_at"
+        ),
+        # MOE summaries (newest first across all institutions)
+        IndexModel([("issuedAt", DESCENDING), ("_id", DESCENDING)], name="issued_at"),
+        # Certificate-ID lookups from chat
+        IndexModel([("certificateId", ASCENDING)], name="certificate_id"),
+        # Change polling on servers without change streams
+        IndexModel([("updatedAt", ASCENDING)], name="updated_at"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("organization", ASCENDING)], name="organization"),
+    ],
+    "conversations": [
+        # Conversation listing, keyset-paged on (updated_at, _id)
+        IndexModel(
+            [("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_updated_at_id"
+        ),
+    ],
+    "conversation_messages": [
+        # One bucket per (conversation, seq); unique so concurrent upserts cannot split a bucket
+        IndexModel([("conversation_id", ASCENDING), ("seq", ASCENDING)], name="conversation_seq", unique=True),
+    ],
+    "rate_limits": [
+        # Idle token buckets are dropped after an hour
+        IndexModel([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=3600),
+    ],
+}
+
+# (collection, filter, sort) for every indexed query; values are representative samples
+QUERY_SHAPES = [
+    ("certificates", {"student.email": "student@example.com"}, None),
+    ("certificates", {"institutionId": "<institution_id>"}, [("issuedAt", DESCENDING), ("_id", DESCENDING)]),
+    (
+        "certificates",
+        {"institutionId": "<institution_id>", "$or": [{"issuedAt": {"$lt": "<datetime>"}}, {"issuedAt": None}]},
+        [("issuedAt", DESCENDING), ("_id", DESCENDING)]
+    ),
+    ("certificates", {}, [("issuedAt", DESCENDING)]),
+    ("certificates", {"certificateId": {"$in": ["SATYA-2025-0000000000000000"]}}, None),
+    ("certificates", {"updatedAt": {"$gt": "<datetime>"}}, [("updatedAt", ASCENDING)]),
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"organization": "<institution_id>"}, None),
+    ("conversations", {"user_id": "<user_id>"}, [("updated_at", DESCENDING), ("_id", DESCENDING)]),
+    ("conversation_messages", {"conversation_id": "<conversation_id>", "seq": {"$in": [0, 1]}}, None),
+]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create any registered index that is missing.
+
+    Returns:
+        collection -> names of indexes created in this call
+    """
+    created = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing_keys = {tuple(tuple(key) for key in info["key"]) for info in existing.values()}
+
+        missing = [
+            model for model in models
+            if tuple(model.document["key"].items()) not in existing_keys
+        ]
+        for model in missing:
+            options = {key: value for key, value in model.document.items() if key != "key"}
+            try:
+                await db[collection].create_index(list(model.document["key"].items()), background=True, **options)
+                created.setdefault(collection, []).append(model.document["name"])
+            except OperationFailure as e:
+                # e.g. an index with the same name but different keys/options; leave it for an operator
+                logger.warning(f"Could not create index {collection}.{model.document['name']}: {e}")
+
+    if created:
+        logger.info(f"Created MongoDB indexes: {created}")
+    return created
+
+
+# Plan stages that read through an index (EXPRESS_* are the MongoDB 8 fast paths)
+INDEX_STAGES = {"IXSCAN", "IDHACK", "COUNT_SCAN", "DISTINCT_SCAN", "EXPRESS_IXSCAN"}
+# Plan fields that hold predicates or index bounds rather than child stages
+NON_STAGE_FIELDS = {"filter", "parsedQuery", "indexBounds", "keyPattern"}
+
+
+def plan_stages(plan) -> List[str]:
+    """
+    Every stage name in an explain() plan tree.
+
+    Children are found wherever they nest (inputStage, inputStages, the SBE queryPlan,
+    shards[].winningPlan, ...) rather than under a fixed list of keys, so a new plan
+    layout cannot hide a collection scan.
+    """
+    stages = []
+    if isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    elif isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key not in NON_STAGE_FIELDS and isinstance(value, (dict, list)):
+                stages.extend(plan_stages(value))
+    return stages
+
+
+def find_collection_scans(plan: Dict) -> List[str]:
+    """Stage names of any COLLSCAN in an explain() plan tree."""
+    return [stage for stage in plan_stages(plan) if stage == "COLLSCAN"]
+
+
+def uses_index(plan: Dict) -> bool:
+    """True if some stage of the plan reads through an index."""
+    return any(stage in INDEX_STAGES for stage in plan_stages(plan))
+
+
+def plan_status(plan: Dict) -> str:
+    """'COLLSCAN', 'ok', or 'UNKNOWN' for a plan with no index stage we recognise."""
+    if find_collection_scans(plan):
+        return "COLLSCAN"
+    # Neither a scan nor an index: a plan layout we don't understand must not pass
+    return "ok" if uses_index(plan) else "UNKNOWN"
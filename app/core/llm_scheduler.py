@@ -0,0 +1,222 @@
+"""
+Priority-aware admission for LLM calls.
+
+Outstanding Groq calls are capped per process (LLM_MAX_CONCURRENCY). Requests
+that cannot start immediately wait in per-class queues that are drained with
+weighted fair queuing, so institution admins and the MOE keep low latency while
+anonymous traffic only gets what is left over. Each class may hold at most its
+share of the slots, and requests are shed with 429 when its queue is full or the
+wait exceeds LLM_QUEUE_TIMEOUT_SECONDS.
+"""
+from fastapi import HTTPException, status
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from app.core.config import STAFF_ROLES, settings
+import asyncio
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_ADMIN = "admin"
+PRIORITY_STUDENT = "student"
+PRIORITY_PUBLIC = "public"
+PRIORITY_BACKGROUND = "background"
+
+def priority_for_role(role: Optional[str]) -> str:
+    """Scheduling class for an authenticated user's role."""
+    if role and role.upper() in STAFF_ROLES:
+        return PRIORITY_ADMIN
+    return PRIORITY_STUDENT
+
+
+class _ClassState:
+    """Queue, counters and queue-time samples for one priority class."""
+
+    def __init__(self, name: str, weight: float, max_active: int, max_queue: int):
+        self.name = name
+        self.weight = weight
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.active = 0
+        self.finish_tag = 0.0
+        self.dispatched = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=500)
+
+    def record_wait(self, wait: float):
+        self.dispatched += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    def stats(self) -> Dict:
+        waits = sorted(self.recent_waits)
+        return {
+            "weight": self.weight,
+            "max_active": self.max_active,
+            "active": self.active,
+            "waiting": len(self.queue),
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.total_wait / self.dispatched, 1) if self.dispatched else 0.0,
+            "p95_wait_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait, 1)
+        }
+
+
+class LLMScheduler:
+    """Weighted fair queuing of LLM calls across priority classes."""
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        queue_timeout: float = None,
+        weights: Dict[str, float] = None,
+        shares: Dict[str, float] = None
+    ):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.max_queue = settings.LLM_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.LLM_QUEUE_TIMEOUT_SECONDS
+        weights = weights or settings.LLM_PRIORITY_WEIGHTS
+        shares = shares or settings.LLM_PRIORITY_SHARES
+
+        self.active = 0
+        self._virtual_time = 0.0
+        self._classes = {
+            name: _ClassState(
+                name,
+                weight=weight,
+                max_active=max(1, math.floor(self.max_concurrency * shares.get(name, 1.0))),
+                max_queue=max(1, math.floor(self.max_queue * shares.get(name, 1.0)))
+            )
+            for name, weight in weights.items()
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_STUDENT):
+        """Hold one LLM slot for the duration of the block."""
+        state = self._classes.get(priority) or self._classes[PRIORITY_STUDENT]
+        enqueued_at = time.monotonic()
+
+        if self._can_start(state) and not self._has_eligible_waiters():
+            self._start(state, enqueued_at)
+        else:
+            if len(state.queue) >= state.max_queue:
+                self._reject(state, "queue is full")
+
+            waiter = asyncio.get_running_loop().create_future()
+            entry = (waiter, enqueued_at)
+            state.queue.append(entry)
+            # Free slots go to the fairest eligible waiter, which may well be this one
+            self._dispatch()
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                if waiter.done():
+                    # Dispatched right as the timeout fired: keep the slot
+                    pass
+                else:
+                    state.queue.remove(entry)
+                    self._reject(state, "timed out waiting for a slot")
+            except asyncio.CancelledError:
+                if waiter.done():
+                    self._finish(state)
+                else:
+                    state.queue.remove(entry)
+                raise
+
+        try:
+            yield
+        finally:
+            self._finish(state)
+
+    def try_acquire(self, priority: str = PRIORITY_STUDENT) -> bool:
+        """Take a slot only if one is free right now (never queues); pair with release()."""
+        state = self._classes.get(priority) or self._classes[PRIORITY_STUDENT]
+        if self._can_start(state) and not self._has_eligible_waiters():
+            self._start(state, time.monotonic())
+            return True
+        return False
+
+    def release(self, priority: str = PRIORITY_STUDENT):
+        """Return a slot taken with try_acquire()."""
+        self._finish(self._classes.get(priority) or self._classes[PRIORITY_STUDENT])
+
+    def hold_until(self, call: "asyncio.Future", priority: str = PRIORITY_STUDENT):
+        """
+        Count an abandoned upstream call against the cap until `call` finishes.
+
+        Take it while the call's own slot is still held: the counter is briefly one over,
+        but the calls actually running never exceed LLM_MAX_CONCURRENCY.
+        """
+        state = self._classes.get(priority) or self._classes[PRIORITY_STUDENT]
+        self.active += 1
+        state.active += 1
+        call.add_done_callback(lambda _: self._finish(state))
+
+    def _can_start(self, state: _ClassState) -> bool:
+        return self.active < self.max_concurrency and state.active < state.max_active
+
+    def _has_eligible_waiters(self) -> bool:
+        """Waiters that could take a free slot now (not those held back by their class share)."""
+        return any(state.queue and state.active < state.max_active for state in self._classes.values())
+
+    def _start(self, state: _ClassState, enqueued_at: float):
+        # Start-time fair queuing: each dispatch advances the class tag by 1/weight
+        start_tag = max(state.finish_tag, self._virtual_time)
+        state.finish_tag = start_tag + 1.0 / state.weight
+        self._virtual_time = start_tag
+
+        self.active += 1
+        state.active += 1
+        state.record_wait(time.monotonic() - enqueued_at)
+
+    def _finish(self, state: _ClassState):
+        self.active -= 1
+        state.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to the eligible class with the smallest virtual start tag."""
+        while self.active < self.max_concurrency:
+            eligible = [
+                state for state in self._classes.values()
+                if state.queue and state.active < state.max_active
+            ]
+            if not eligible:
+                return
+
+            state = min(eligible, key=lambda s: max(s.finish_tag, self._virtual_time))
+            waiter, enqueued_at = state.queue.popleft()
+            self._start(state, enqueued_at)
+            waiter.set_result(True)
+
+    def _reject(self, state: _ClassState, reason: str):
+        state.rejected += 1
+        logger.warning(
+            f"LLM {state.name} request shed: {reason} "
+            f"(active={self.active}/{self.max_concurrency}, waiting={len(state.queue)})"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="The assistant is busy right now. Please try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(self.queue_timeout / 3)))}
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "classes": {name: state.stats() for name, state in self._classes.items()}
+        }
+
+
+# Singleton instance shared by every LLMService
+llm_scheduler = LLMScheduler()
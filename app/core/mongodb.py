@@ -13,7 +13,14 @@ async def connect_to_mongodb():
     """Connect to MongoDB."""
     global mongodb_client
     try:
-        mongodb_client = AsyncIOMotorClient(settings.MONGODB_URL)
+        # One pooled client for the whole application
+        mongodb_client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+        )
         # Test connection
         await mongodb_client.admin.command('ping')
         logger.info(f"Connected to MongoDB at {settings.MONGODB_URL}")
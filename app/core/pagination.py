@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination over a descending (field, _id) sort.
+
+Each page filters on the last row of the previous one instead of skipping rows, so
+with an index on (..., field -1, _id -1) page 1000 costs the same as page 1.
+Cursors are opaque to clients: URL-safe base64 of the last row's sort key.
+"""
+from typing import Dict, Optional, Tuple
+from bson import ObjectId
+from datetime import datetime
+from fastapi import HTTPException
+import base64
+import json
+
+
+def encode_cursor(value, last_id) -> str:
+    """Cursor pointing just after a row with sort key (value, last_id)."""
+    if isinstance(value, datetime):
+        payload = {"t": value.isoformat(), "d": True}
+    else:
+        payload = {"t": value}
+    payload["id"] = str(last_id)
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[object], ObjectId]:
+    """Inverse of encode_cursor; raises a 400 for anything that is not a cursor we issued."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["t"]
+        if payload.get("d") and value is not None:
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(field: str, cursor: Optional[str]) -> Dict:
+    """
+    Filter selecting rows after the cursor in (field desc, _id desc) order.
+
+    MongoDB sorts null/missing values last in descending order, so rows without the
+    field come after every row that has it.
+    """
+    if not cursor:
+        return {}
+    value, last_id = decode_cursor(cursor)
+    if value is None:
+        return {field: None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": last_id}},
+        {field: None}
+    ]}
+
+
+def page_result(rows: list, page_size: int, field: str) -> Tuple[list, Optional[str]]:
+    """
+    Split a fetch of page_size + 1 rows into the page and the cursor for the next one.
+
+    Returns:
+        (rows on this page, next cursor or None on the last page)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.get(field), last["_id"])
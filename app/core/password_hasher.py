@@ -0,0 +1,134 @@
+"""
+bcrypt off the event loop.
+
+A bcrypt check costs 100-300 ms of CPU. Run inline in an async handler it stalls
+every other request on the worker, so hashing and verification go to a dedicated
+thread pool instead. bcrypt releases the GIL while it works, so threads use all
+cores without the pickling overhead of a process pool.
+
+At most BCRYPT_WORKERS operations run at once (default: one per core) and at most
+BCRYPT_MAX_QUEUE wait for a thread; beyond that, logins are shed with 503 rather
+than piling up behind a burst.
+
+New hashes use BCRYPT_ROUNDS; with 0 the cost is tuned at startup so one check takes
+about BCRYPT_TARGET_MS on this hardware (never below MIN_ROUNDS). Logins rehash
+weaker or legacy stored credentials to that cost.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from fastapi import HTTPException, status
+from typing import Callable, Dict, TypeVar
+from app.core.config import settings
+from app.core.security import get_password_hash, needs_rehash, verify_password
+import asyncio
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+DEFAULT_ROUNDS = 12
+# Cost the tuner measures at; every extra round doubles the time
+CALIBRATION_ROUNDS = 10
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt with queue metrics."""
+
+    def __init__(self, workers: int = None, max_queue: int = None):
+        self.workers = workers or settings.BCRYPT_WORKERS or os.cpu_count() or 1
+        self.max_queue = settings.BCRYPT_MAX_QUEUE if max_queue is None else max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = asyncio.Semaphore(self.workers)
+        self.rounds = settings.BCRYPT_ROUNDS or DEFAULT_ROUNDS
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.recent_waits = deque(maxlen=500)
+        self.recent_runs = deque(maxlen=500)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, self.rounds)
+
+    def needs_rehash(self, stored_password: str) -> bool:
+        return needs_rehash(stored_password, self.rounds)
+
+    async def tune(self) -> int:
+        """Pick the cost factor for new hashes (BCRYPT_ROUNDS, or measured when it is 0)."""
+        if settings.BCRYPT_ROUNDS:
+            self.rounds = settings.BCRYPT_ROUNDS
+            return self.rounds
+
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, get_password_hash, "calibration", CALIBRATION_ROUNDS
+        )
+        elapsed_ms = max((time.perf_counter() - started) * 1000, 0.1)
+        # Largest cost whose estimated check time stays within the target
+        rounds = CALIBRATION_ROUNDS + math.floor(math.log2(settings.BCRYPT_TARGET_MS / elapsed_ms))
+        self.rounds = max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+        logger.info(
+            f"bcrypt cost {self.rounds} (cost {CALIBRATION_ROUNDS} took {elapsed_ms:.0f} ms, "
+            f"target {settings.BCRYPT_TARGET_MS:.0f} ms)"
+        )
+        return self.rounds
+
+    async def _run(self, function: Callable[..., T], *args) -> T:
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"Password check shed: {self.active} running, {self.waiting} waiting")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts right now. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+        enqueued_at = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        self.recent_waits.append(started - enqueued_at)
+        self.active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self.recent_runs.append(time.monotonic() - started)
+            self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        waits = sorted(self.recent_waits)
+        runs = sorted(self.recent_runs)
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "p95_wait_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            "p50_run_ms": round(1000 * runs[len(runs) // 2], 1) if runs else 0.0
+        }
+
+
+# Singleton instance
+password_hasher = PasswordHasher()
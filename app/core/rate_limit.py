@@ -0,0 +1,167 @@
+"""
+Rate limiting.
+
+Token-bucket limiter keyed by user id (authenticated) or client IP (anonymous),
+applied as middleware and answering 429 with Retry-After. Admission control for
+outstanding LLM calls lives in app.core.llm_scheduler.
+
+Bucket state lives in process memory by default; RATE_LIMIT_BACKEND=mongodb
+shares it across workers through the `rate_limits` collection.
+"""
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from jose import JWTError, jwt
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Paths that are never rate limited
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets held in process memory (also the stand-in used for tests)."""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+
+        if len(self._buckets) > self.MAX_KEYS:
+            self._prune(now, capacity, refill_per_second)
+
+        retry_after = 0.0 if allowed else (1 - tokens) / refill_per_second
+        return allowed, retry_after
+
+    def _prune(self, now: float, capacity: int, refill_per_second: float):
+        """Drop buckets that have refilled completely; they are equivalent to new ones."""
+        full_after = capacity / refill_per_second
+        self._buckets = {
+            key: value for key, value in self._buckets.items()
+            if now - value[1] < full_after
+        }
+
+
+class MongoRateLimitBackend:
+    """Token buckets shared across workers, updated atomically in MongoDB (4.2+)."""
+
+    COLLECTION = "rate_limits"
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        from app.core.mongodb import get_database
+        from pymongo import ReturnDocument
+
+        now = time.time()
+        refilled = {"$min": [
+            capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", capacity]},
+                {"$multiply": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, refill_per_second]}
+            ]}
+        ]}
+        try:
+            bucket = await get_database()[self.COLLECTION].find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": refilled, "ts": now, "updated_at": datetime.utcnow()}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            # Fail open: a limiter outage must not take the API down
+            logger.error(f"Rate limit backend error, allowing request: {e}")
+            return True, 0.0
+
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (1 - bucket["tokens"]) / refill_per_second
+
+
+def get_rate_limit_backend():
+    """Create the configured bucket backend."""
+    if settings.RATE_LIMIT_BACKEND == "mongodb":
+        return MongoRateLimitBackend()
+    return InMemoryRateLimitBackend()
+
+
+def get_client_ip(request) -> str:
+    """
+    Client IP for per-IP limits.
+
+    X-Forwarded-For is client-controlled except for the entries our own proxies
+    append, so only the entry added by the outermost of TRUSTED_PROXY_HOPS proxies is
+    used (counting from the right). Without that many entries, or with no trusted
+    proxies, the socket peer is used.
+    """
+    hops = settings.TRUSTED_PROXY_HOPS
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and hops > 0:
+        entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+        if len(entries) >= hops:
+            return entries[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+def get_token_user_id(request) -> Optional[str]:
+    """User id from a valid bearer token, or None for anonymous/invalid tokens."""
+    auth_header = request.headers.get("authorization", "")
+    if not auth_header.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(auth_header[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("user_id") or payload.get("sub")
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Token-bucket rate limiting per user id, or per IP for anonymous requests."""
+
+    def __init__(self, app, backend=None):
+        super().__init__(app)
+        self.backend = backend or get_rate_limit_backend()
+
+    async def dispatch(self, request, call_next):
+        if not settings.RATE_LIMIT_ENABLED or request.url.path in EXEMPT_PATHS or request.method == "OPTIONS":
+            return await call_next(request)
+
+        user_id = get_token_user_id(request)
+        if user_id:
+            key = f"user:{user_id}"
+            per_minute = settings.MAX_REQUESTS_PER_MINUTE
+        else:
+            key = f"ip:{get_client_ip(request)}"
+            per_minute = settings.PUBLIC_MAX_REQUESTS_PER_MINUTE
+
+        allowed, retry_after = await self.backend.take(
+            key, settings.RATE_LIMIT_BURST, per_minute / 60.0
+        )
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {key} on {request.url.path}")
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Too many requests. Please slow down."},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+        return await call_next(request)
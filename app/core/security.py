@@ -9,23 +9,38 @@ from app.core.config import settings
 security = HTTPBearer()
 
 
+BCRYPT_PREFIX = "$2b$"
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    # Handle both $2a$ (old bcrypt) and $2b$ (new bcrypt) formats
-    hash_to_check = hashed_password
-    if hashed_password.startswith('$2a$'):
-        hash_to_check = '$2b$' + hashed_password[4:]
-    
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hash_to_check.encode('utf-8'))
+    """Verify a password against its hash ($2a$ and $2b$ bcrypt hashes are both accepted)."""
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
-def get_password_hash(password: str) -> str:
-    """Hash a password."""
-    salt = bcrypt.gensalt()
+def get_password_hash(password: str, rounds: int = 12) -> str:
+    """Hash a password ($2b$ bcrypt with the given cost factor)."""
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 
+def is_bcrypt_hash(value: str) -> bool:
+    return value[:4] in ("$2a$", "$2b$", "$2y$")
+
+
+def needs_rehash(hashed_password: str, rounds: int) -> bool:
+    """
+    True for stored credentials that should be rewritten as a $2b$ hash of the given cost:
+    plaintext, other bcrypt variants, or a lower cost. Stronger hashes are never downgraded.
+    """
+    if not hashed_password.startswith(BCRYPT_PREFIX):
+        return True
+    try:
+        return int(hashed_password.split("$")[2]) < rounds
+    except (IndexError, ValueError):
+        return True
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
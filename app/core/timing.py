@@ -0,0 +1,43 @@
+"""
+Per-stage timing for request handlers, reported in a `Server-Timing` header.
+
+    timer = StageTimer()
+    institution, users = await asyncio.gather(
+        timer.run("institution", load_institution()),
+        timer.run("users", load_users()),
+    )
+    timer.apply(response)
+
+Browsers show Server-Timing entries in the network panel. The header is only sent
+when settings.DEBUG is on, since it reveals backend structure.
+"""
+from typing import Awaitable, Dict, TypeVar
+from app.core.config import settings
+import time
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Wall-clock duration of named stages; stages may run concurrently."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[name] = (time.perf_counter() - started) * 1000
+
+    def header(self) -> str:
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.timings.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def apply(self, response):
+        """Attach the Server-Timing header in debug mode."""
+        if settings.DEBUG and response is not None:
+            response.headers["Server-Timing"] = self.header()
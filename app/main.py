@@ -18,6 +18,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Rate limiting (registered before CORS so 429 responses still carry CORS headers)
+from app.core.rate_limit import RateLimitMiddleware
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -38,6 +42,35 @@ async def startup_event():
     await connect_to_mongodb()
     logger.info("MongoDB connected")
     
+    # Indexes our queries rely on (idempotent; builds run in the background)
+    from app.core.indexes import ensure_indexes
+    from app.core.mongodb import get_database
+    try:
+        await ensure_indexes(get_database())
+    except Exception as e:
+        logger.error(f"Error ensuring MongoDB indexes: {e}")
+    
+    # Certificate-ID lookups: periodically refreshed Bloom filter
+    from app.services.certificate_lookup_service import certificate_lookup_service
+    await certificate_lookup_service.start()
+    
+    # Certificate change feed: keeps cached summaries and the Bloom filter current
+    from app.services.certificate_watcher import certificate_watcher
+    from app.services.student_summary_cache import student_summary_cache
+    from app.services.institution_stats_service import institution_stats_service
+    certificate_watcher.subscribe(student_summary_cache.on_certificate_change)
+    certificate_watcher.subscribe(institution_stats_service.on_certificate_change)
+    certificate_watcher.subscribe(certificate_lookup_service.on_certificate_change)
+    await certificate_watcher.start()
+    
+    # bcrypt cost factor for new and upgraded password hashes
+    from app.core.password_hasher import password_hasher
+    await password_hasher.tune()
+    
+    # Conversation writes are queued behind chat responses
+    from app.services.conversation_writer import conversation_writer
+    conversation_writer.start()
+    
     # Ensure data directory exists for SQLite (legacy)
     from app.core.init_db import ensure_data_directory
     ensure_data_directory()
@@ -52,6 +85,19 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down Satyasetu Chatbot API...")
+    from app.services.conversation_writer import conversation_writer
+    await conversation_writer.shutdown()
+    from app.services.conversation_summary_service import conversation_summary_service
+    await conversation_summary_service.shutdown()
+    from app.services.certificate_lookup_service import certificate_lookup_service
+    await certificate_lookup_service.stop()
+    from app.services.certificate_watcher import certificate_watcher
+    await certificate_watcher.stop()
+    from app.services.institution_stats_service import institution_stats_service
+    await institution_stats_service.stop()
+    from app.core.password_hasher import password_hasher
+    password_hasher.shutdown()
+    
     from app.core.mongodb import close_mongodb_connection
     await close_mongodb_connection()
     logger.info("MongoDB connection closed")
@@ -76,6 +122,32 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    from app.core.llm_scheduler import llm_scheduler
+    from app.services.llm_service import llm_service
+    from app.services.intent_service import intent_service
+    from app.services.certificate_lookup_service import certificate_lookup_service
+    from app.services.certificate_watcher import certificate_watcher
+    from app.services.student_summary_cache import student_summary_cache
+    from app.services.institution_stats_service import institution_stats_service
+    from app.services.conversation_writer import conversation_writer
+    from app.services.user_cache import user_cache
+    from app.core.password_hasher import password_hasher
+    return {
+        "llm_scheduler": llm_scheduler.stats(),
+        "llm": llm_service.stats(),
+        "fast_path": intent_service.stats(),
+        "certificate_lookup": certificate_lookup_service.stats(),
+        "certificate_watcher": certificate_watcher.stats(),
+        "student_summary_cache": student_summary_cache.stats(),
+        "institution_stats": institution_stats_service.stats(),
+        "conversation_writes": conversation_writer.stats(),
+        "user_cache": user_cache.stats(),
+        "password_hashing": password_hasher.stats()
+    }
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(chat.router)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -49,3 +49,4 @@ class ChatResponse(BaseModel):
     message: str
     language: str
     sources: List[str] = []
+    certificates: List[Dict[str, Any]] = []  # Structured results of certificate-ID lookups
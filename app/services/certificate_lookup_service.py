@@ -0,0 +1,259 @@
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.core.mongodb import get_database
+import asyncio
+import hashlib
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# e.g. SATYA-2025-CB60C98FB3E0A4C0
+CERTIFICATE_ID_PATTERN = re.compile(r"\bSATYA-\d{4}-[0-9A-F]{16}\b", re.IGNORECASE)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives, tunable false-positive rate)."""
+
+    def __init__(self, expected_items: int, fp_rate: float):
+        expected_items = max(1, expected_items)
+        self.size = max(64, int(-expected_items * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class CertificateLookupService:
+    """
+    Resolves certificate IDs pasted into chat without involving the LLM.
+
+    IDs are checked against an in-memory Bloom filter of every `certificateId`
+    (refreshed every CERTIFICATE_BLOOM_REFRESH_SECONDS), so unknown IDs are rejected
+    without a database round-trip. Possible matches are resolved with one indexed
+    `certificates.certificateId` query.
+    """
+
+    def __init__(self):
+        self.bloom: Optional[BloomFilter] = None
+        # IDs added while a refresh is scanning; they go into the new filter before the swap
+        self._added_during_refresh: Optional[List[str]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # One rebuild at a time: they share the IDs recorded during a refresh
+        self._refresh_lock = asyncio.Lock()
+        self._tasks = set()
+        self.lookups = 0
+        self.bloom_rejections = 0
+        self.db_misses = 0
+
+    def extract_ids(self, text: str) -> List[str]:
+        """Certificate IDs mentioned in a message, normalized and de-duplicated."""
+        seen = []
+        for match in CERTIFICATE_ID_PATTERN.findall(text):
+            certificate_id = match.upper()
+            if certificate_id not in seen:
+                seen.append(certificate_id)
+        return seen
+
+    async def start(self):
+        """Start the periodic filter refresh (the certificateId index is in app.core.indexes)."""
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+
+    async def _refresh_loop(self):
+        while True:
+            await self._refresh_safely()
+            await asyncio.sleep(settings.CERTIFICATE_BLOOM_REFRESH_SECONDS)
+
+    async def _refresh_safely(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Error refreshing certificate Bloom filter: {e}")
+
+    async def refresh(self):
+        """Rebuild the Bloom filter from every certificate ID and swap it in."""
+        async with self._refresh_lock:
+            await self._rebuild()
+
+    async def _rebuild(self):
+        db = get_database()
+        self._added_during_refresh = []
+        try:
+            expected = await db.certificates.estimated_document_count()
+            bloom = BloomFilter(int(expected * 1.2) + 1000, settings.CERTIFICATE_BLOOM_FP_RATE)
+
+            cursor = db.certificates.find({}, {"certificateId": 1, "_id": 0}).batch_size(5000)
+            async for cert in cursor:
+                if cert.get("certificateId"):
+                    bloom.add(cert["certificateId"].upper())
+
+            # The scan may have passed these already; without them the new filter has false negatives
+            for certificate_id in self._added_during_refresh:
+                bloom.add(certificate_id)
+            self.bloom = bloom
+        finally:
+            self._added_during_refresh = None
+        logger.info(f"Certificate Bloom filter refreshed with {bloom.count} IDs ({len(bloom.bits) // 1024} KB)")
+
+    def add(self, certificate_id: str):
+        """Record a newly issued certificate between refreshes."""
+        if not certificate_id:
+            return
+        certificate_id = certificate_id.upper()
+        if self._added_during_refresh is not None:
+            self._added_during_refresh.append(certificate_id)
+        if self.bloom is not None and certificate_id not in self.bloom:
+            self.bloom.add(certificate_id)
+
+    def on_certificate_change(self, change: Dict):
+        """Certificate watcher subscriber: newly issued IDs are findable before the next refresh."""
+        if change["operation"] in ("insert", "update", "replace") and change.get("certificate"):
+            self.add(change["certificate"].get("certificateId"))
+        elif change["operation"] == "resync" and self.bloom is not None:
+            # Inserts the watcher missed would otherwise be false negatives until the next refresh
+            task = asyncio.create_task(self._refresh_safely())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def might_exist(self, certificate_id: str) -> bool:
+        # Until the first refresh completes, every ID goes to the database
+        return self.bloom is None or certificate_id in self.bloom
+
+    async def lookup(self, certificate_ids: List[str], include_student: bool = True) -> List[Dict]:
+        """
+        Resolve certificate IDs to their verification status.
+
+        Returns:
+            one dict per requested ID with 'found' and, when found, status/issuer/blockchain details
+        """
+        self.lookups += len(certificate_ids)
+        candidates = [cid for cid in certificate_ids if self.might_exist(cid)]
+        self.bloom_rejections += len(certificate_ids) - len(candidates)
+
+        found = {}
+        if candidates:
+            pipeline = [
+                {"$match": {"certificateId": {"$in": candidates}}},
+                {"$project": {
+                    "certificateId": 1, "status": 1, "blockchainStatus": 1, "issuedAt": 1,
+                    "institutionId": 1, "issuerId": 1, "verificationUrl": 1,
+                    "student.fullName": 1, "student.course": 1
+                }},
+                {"$lookup": {
+                    "from": "institutions",
+                    "let": {"id": "$institutionId"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$_id", "$$id"]}}},
+                        {"$project": {"name": 1}}
+                    ],
+                    "as": "institution"
+                }},
+                {"$lookup": {
+                    "from": "users",
+                    "let": {"id": "$issuerId"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$_id", "$$id"]}}},
+                        {"$project": {"name": 1, "full_name": 1}}
+                    ],
+                    "as": "issuer"
+                }}
+            ]
+            async for cert in get_database().certificates.aggregate(pipeline):
+                found[cert["certificateId"].upper()] = cert
+            self.db_misses += len(candidates) - len(found)
+
+        results = []
+        for certificate_id in certificate_ids:
+            cert = found.get(certificate_id)
+            if not cert:
+                results.append({"certificate_id": certificate_id, "found": False})
+                continue
+
+            institution = cert["institution"][0] if cert.get("institution") else {}
+            issuer = cert["issuer"][0] if cert.get("issuer") else {}
+            result = {
+                "certificate_id": cert["certificateId"],
+                "found": True,
+                "status": cert.get("status"),
+                "blockchain_status": cert.get("blockchainStatus"),
+                "issued_at": cert["issuedAt"].strftime("%Y-%m-%d") if cert.get("issuedAt") else None,
+                "issuer": {
+                    "institution": institution.get("name"),
+                    "issued_by": issuer.get("name") or issuer.get("full_name")
+                },
+                "verification_url": cert.get("verificationUrl")
+            }
+            if include_student:
+                result["student_name"] = cert.get("student", {}).get("fullName")
+                result["course"] = cert.get("student", {}).get("course")
+            results.append(result)
+
+        return results
+
+    def format_answer(self, results: List[Dict], language: str = "en") -> str:
+        """Human-readable summary of lookup results."""
+        hindi = language == "hi"
+        lines = []
+        for result in results:
+            if not result["found"]:
+                if hindi:
+                    lines.append(
+                        f"प्रमाणपत्र {result['certificate_id']} सत्यसेतु रजिस्ट्री में नहीं मिला। "
+                        f"कृपया आईडी जांचें; हाल ही में जारी प्रमाणपत्र कुछ मिनट बाद दिखाई देते हैं।"
+                    )
+                else:
+                    lines.append(
+                        f"Certificate {result['certificate_id']} was not found in the SatyaSetu registry. "
+                        f"Please check the ID; certificates issued in the last few minutes may not appear yet."
+                    )
+                continue
+
+            issuer = result["issuer"]["institution"] or result["issuer"]["issued_by"] or "N/A"
+            if hindi:
+                line = (
+                    f"प्रमाणपत्र {result['certificate_id']}: स्थिति {result['status'] or 'N/A'}, "
+                    f"जारीकर्ता {issuer}, जारी तिथि {result['issued_at'] or 'N/A'}, "
+                    f"ब्लॉकचेन स्थिति {result['blockchain_status'] or 'N/A'}"
+                )
+            else:
+                line = (
+                    f"Certificate {result['certificate_id']}: status {result['status'] or 'N/A'}, "
+                    f"issued by {issuer} on {result['issued_at'] or 'N/A'}, "
+                    f"blockchain status {result['blockchain_status'] or 'N/A'}"
+                )
+            if result.get("student_name"):
+                line += f" ({result['student_name']}, {result.get('course') or 'N/A'})"
+            lines.append(line + ".")
+
+        return "\n".join(lines)
+
+    def stats(self) -> Dict:
+        return {
+            "bloom_loaded": self.bloom is not None,
+            "bloom_items": self.bloom.count if self.bloom else 0,
+            "lookups": self.lookups,
+            "bloom_rejections": self.bloom_rejections,
+            "db_misses": self.db_misses
+        }
+
+
+# Singleton instance
+certificate_lookup_service = CertificateLookupService()
@@ -0,0 +1,136 @@
+from typing import Callable, Dict, List, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from app.core.config import settings
+from app.core.mongodb import get_database
+from app.core.resilience import backoff_delay
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only the fields subscribers need travel with each change event
+WATCHED_FIELDS = {
+    "certificateId": 1, "institutionId": 1, "student.email": 1, "status": 1,
+    "student.course": 1, "student.department": 1, "issuedAt": 1, "blockchainStatus": 1
+}
+
+# The stream cannot continue from the saved resume token: InvalidResumeToken,
+# ChangeStreamFatalError, ChangeStreamHistoryLost (oplog rolled past it)
+RESUME_LOST_CODES = {260, 280, 286}
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+
+class CertificateWatcher:
+    """
+    Publishes changes to the `certificates` collection to in-process subscribers.
+
+    Uses a MongoDB change stream (resumed after transient errors, with backoff). When the
+    resume point is lost the stream restarts from now and subscribers get one
+    {"operation": "resync", "certificate": None} event, since changes in between were
+    missed. Standalone servers
+    do not support change streams; there the watcher polls `updatedAt` every
+    CERTIFICATE_WATCH_POLL_SECONDS instead and reports deletions it cannot attribute
+    with certificate=None.
+
+    Subscribers are plain callables receiving {"operation": ..., "certificate": dict | None}.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self.mode: Optional[str] = None
+        self.events = 0
+        self.failures = 0
+        self.resyncs = 0
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        self._subscribers.append(callback)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def _publish(self, operation: str, certificate: Optional[Dict]):
+        self.events += 1
+        change = {"operation": operation, "certificate": certificate}
+        for callback in self._subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                logger.error(f"Certificate change subscriber failed: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                # 40573: "The $changeStream stage is only supported on replica sets"
+                if e.code == 40573 or "replica set" in str(e):
+                    logger.info("Change streams unavailable, polling certificates for changes")
+                    await self._poll()
+                    return
+                if e.code in RESUME_LOST_CODES:
+                    # Retrying with the same token fails forever; start over and let
+                    # subscribers rebuild whatever the missed events would have changed
+                    logger.warning(f"Certificate change stream cannot resume ({e}); resyncing subscribers")
+                    self._resume_token = None
+                    self.resyncs += 1
+                    self._publish("resync", None)
+                else:
+                    logger.error(f"Certificate change stream failed: {e}")
+            except PyMongoError as e:
+                logger.error(f"Certificate change stream interrupted: {e}")
+            await asyncio.sleep(backoff_delay(self.failures, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS))
+            self.failures += 1
+
+    async def _watch(self):
+        pipeline = [{"$project": {
+            "operationType": 1,
+            "documentKey": 1,
+            "fullDocument._id": 1,
+            **{f"fullDocument.{field}": 1 for field in WATCHED_FIELDS}
+        }}]
+        async with get_database().certificates.watch(
+            pipeline, full_document="updateLookup", resume_after=self._resume_token
+        ) as stream:
+            self.mode = "change_stream"
+            self.failures = 0
+            logger.info("Watching certificates via change stream")
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                self._publish(change["operationType"], change.get("fullDocument"))
+
+    async def _poll(self):
+        self.mode = "polling"
+        db = get_database()
+        since = datetime.utcnow() - timedelta(seconds=settings.CERTIFICATE_WATCH_POLL_SECONDS)
+        known_count = await db.certificates.estimated_document_count()
+        while True:
+            await asyncio.sleep(settings.CERTIFICATE_WATCH_POLL_SECONDS)
+            try:
+                cursor = db.certificates.find(
+                    {"updatedAt": {"$gt": since}}, {**WATCHED_FIELDS, "updatedAt": 1}
+                ).sort("updatedAt", 1)
+                async for cert in cursor:
+                    since = max(since, cert["updatedAt"])
+                    self._publish("update", cert)
+
+                count = await db.certificates.estimated_document_count()
+                if count < known_count:
+                    self._publish("delete", None)
+                known_count = count
+            except PyMongoError as e:
+                logger.error(f"Error polling certificates for changes: {e}")
+
+    def stats(self) -> Dict:
+        return {"mode": self.mode, "events": self.events, "resyncs": self.resyncs}
+
+
+# Singleton instance
+certificate_watcher = CertificateWatcher()
@@ -0,0 +1,289 @@
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.models.mongo_models import Conversation, Message
+from app.core.mongodb import get_database
+from app.core.pagination import keyset_filter, page_result
+from app.services.conversation_writer import conversation_writer
+from beanie import PydanticObjectId
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_PER_BUCKET = 50
+PREVIEW_CHARS = 200
+# Reservations remembered per header, so a retried turn gets back the indexes it was given
+RECENT_TURNS = 20
+
+# Header fields returned by conversation listings; legacy headers without the
+# maintained counters fall back to their embedded messages
+LISTING_FIELDS = {
+    "created_at": 1,
+    "updated_at": 1,
+    "message_count": {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]},
+    "preview": {"$ifNull": ["$preview", {"$arrayElemAt": ["$messages.content", 0]}]}
+}
+
+
+class ConversationStore:
+    """
+    Conversation storage for the chat path.
+
+    The `conversations` document is a small header (owner, message_count, running summary,
+    `preview` of the first message, latest message preview). Messages live in `conversation_messages` buckets of
+    MESSAGES_PER_BUCKET: message number i of a conversation is in bucket
+    `seq = i // MESSAGES_PER_BUCKET` and carries its `index`, so any range of the
+    history is read from just the buckets covering it.
+
+    Conversations written before bucketing keep their embedded `messages` array; those
+    messages stay where they are as indexes [0, legacy_count) and new ones continue in
+    buckets after them.
+
+    Conversations are plain dicts here:
+        id, user_id, university_id, created_at, updated_at, message_count, legacy_count,
+        messages (the loaded range, oldest first), summary, summarized_count, is_new
+    """
+
+    @property
+    def buckets(self):
+        return get_database().conversation_messages
+
+    def new(self, user_id: str, university_id: Optional[int] = None) -> Dict:
+        """A conversation that is created in the database with its first turn."""
+        return {
+            "id": PydanticObjectId(),
+            "user_id": user_id,
+            "university_id": university_id,
+            "message_count": 0,
+            "legacy_count": 0,
+            "messages": [],
+            "summary": "",
+            "summarized_count": 0,
+            "is_new": True
+        }
+
+    async def load(
+        self,
+        conversation_id,
+        user_id: str,
+        recent: Optional[int] = None,
+        unsummarized: bool = False
+    ) -> Optional[Dict]:
+        """
+        The user's conversation with its last `recent` messages (all when None), or None.
+
+        With `unsummarized`, loads the messages not yet folded into the summary instead,
+        still at most `recent` of them.
+        """
+        await conversation_writer.wait_for(conversation_id)
+        header = await self._header({"_id": conversation_id, "user_id": user_id})
+        if not header:
+            return None
+
+        count = header["message_count"]
+        start = 0 if recent is None else max(0, count - recent)
+        if unsummarized:
+            start = max(start, min(header["summarized_count"], count))
+        header["messages"] = await self._read_range(header, start, count)
+        return header
+
+    async def list_headers(self, user_id: str, page_size: int, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of a user's conversation headers, most recently updated first.
+
+        Returns:
+            (headers with id, created_at, updated_at, message_count, preview; next cursor or None)
+        """
+        pipeline = [
+            {"$match": {"user_id": user_id, **keyset_filter("updated_at", cursor)}},
+            {"$sort": {"updated_at": -1, "_id": -1}},
+            {"$limit": page_size + 1},
+            {"$project": LISTING_FIELDS}
+        ]
+        rows = await Conversation.get_motor_collection().aggregate(pipeline).to_list(length=page_size + 1)
+        return page_result(rows, page_size, "updated_at")
+
+    async def read_messages(self, conversation_id, start: int, count: int) -> List[Message]:
+        """Messages [start, start + count) of a conversation."""
+        if count <= 0:
+            return []
+        await conversation_writer.wait_for(conversation_id)
+        header = await self._header({"_id": conversation_id})
+        if not header:
+            return []
+        return await self._read_range(header, start, min(start + count, header["message_count"]))
+
+    async def _header(self, match: Dict) -> Optional[Dict]:
+        legacy_size = {"$size": {"$ifNull": ["$messages", []]}}
+        pipeline = [
+            {"$match": match},
+            {"$project": {
+                "user_id": 1,
+                "university_id": 1,
+                "summary": 1,
+                "summarized_count": 1,
+                "created_at": 1,
+                "updated_at": 1,
+                "legacy_count": legacy_size,
+                "message_count": {"$ifNull": ["$message_count", legacy_size]}
+            }}
+        ]
+        docs = await Conversation.get_motor_collection().aggregate(pipeline).to_list(length=1)
+        if not docs:
+            return None
+
+        doc = docs[0]
+        return {
+            "id": doc["_id"],
+            "user_id": doc.get("user_id"),
+            "university_id": doc.get("university_id"),
+            "message_count": doc["message_count"],
+            "legacy_count": doc["legacy_count"],
+            "summary": doc.get("summary") or "",
+            "summarized_count": doc.get("summarized_count") or 0,
+            "created_at": doc.get("created_at"),
+            "updated_at": doc.get("updated_at"),
+            "is_new": False
+        }
+
+    async def _read_range(self, header: Dict, start: int, end: int) -> List[Message]:
+        """Messages [start, end) from the embedded legacy array and/or the covering buckets."""
+        messages = []
+        legacy_count = header["legacy_count"]
+
+        if start < legacy_count and end > start:
+            pipeline = [
+                {"$match": {"_id": header["id"]}},
+                {"$project": {"messages": {"$slice": ["$messages", start, min(end, legacy_count) - start]}}}
+            ]
+            docs = await Conversation.get_motor_collection().aggregate(pipeline).to_list(length=1)
+            if docs:
+                messages.extend(docs[0]["messages"])
+
+        bucket_start = max(start, legacy_count)
+        if end > bucket_start:
+            seqs = list(range(bucket_start // MESSAGES_PER_BUCKET, (end - 1) // MESSAGES_PER_BUCKET + 1))
+            in_range = []
+            async for bucket in self.buckets.find(
+                {"conversation_id": header["id"], "seq": {"$in": seqs}}, {"messages": 1}
+            ):
+                in_range.extend(m for m in bucket["messages"] if bucket_start <= m.get("index", -1) < end)
+            messages.extend(sorted(in_range, key=lambda m: m["index"]))
+
+        return [Message(**{k: v for k, v in m.items() if k != "index"}) for m in messages]
+
+    async def append(self, conversation: Dict, messages: List[Message]):
+        """Append a turn (persisted through the conversation write queue)."""
+        write = {
+            "conversation_id": conversation["id"],
+            "messages": [message.model_dump() for message in messages],
+            "first_preview": messages[0].content[:PREVIEW_CHARS] if messages else "",
+            "preview": messages[-1].content[:PREVIEW_CHARS] if messages else "",
+            "defaults": None,
+            # Recorded on the header with the reservation, so a retried reservation is recognised
+            "turn_id": PydanticObjectId(),
+            # Set once the header has reserved this turn's message indexes
+            "start": None
+        }
+        if conversation["is_new"]:
+            # Remaining header fields (with model defaults) are written once, on creation
+            write["defaults"] = Conversation(
+                user_id=conversation["user_id"],
+                university_id=conversation["university_id"],
+                messages=[]
+            ).model_dump(exclude={"id", "revision_id", "messages", "updated_at"})
+
+        await conversation_writer.submit(conversation["id"], write)
+
+        conversation["messages"].extend(messages)
+        conversation["message_count"] += len(messages)
+        conversation["is_new"] = False
+
+    async def apply_writes(self, writes: List[Dict]):
+        """
+        Apply queued turns: reserve message indexes on each header, then add the messages
+        to their buckets in one unordered bulk write.
+
+        Safe to retry: the header keeps the `turn_id` and start index of its last RECENT_TURNS
+        reservations and only reserves a turn it does not list, so a reservation that was
+        applied but whose reply was lost is read back instead of adding the turn's messages
+        twice, even after later turns were reserved. Bucket updates use `$addToSet`, so
+        re-sending an applied message is a no-op.
+        """
+        now = datetime.utcnow()
+        headers = Conversation.get_motor_collection()
+
+        for write in writes:
+            if write["start"] is not None:
+                continue
+            added = len(write["messages"])
+            count = {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]}
+            stage = {
+                "message_count": {"$add": [count, added]},
+                "recent_turns": {"$slice": [
+                    {"$concatArrays": [
+                        {"$ifNull": ["$recent_turns", []]},
+                        [{"id": {"$literal": write["turn_id"]}, "start": count}]
+                    ]},
+                    -RECENT_TURNS
+                ]},
+                "updated_at": now,
+                "last_message_at": now,
+                "last_message_preview": {"$literal": write["preview"]},
+                # The listing preview is the conversation's first message
+                "preview": {"$ifNull": ["$preview", {"$cond": [
+                    {"$gt": [{"$size": {"$ifNull": ["$messages", []]}}, 0]},
+                    {"$substrCP": [{"$arrayElemAt": ["$messages.content", 0]}, 0, PREVIEW_CHARS]},
+                    {"$literal": write["first_preview"]}
+                ]}]}
+            }
+            for field, value in (write["defaults"] or {}).items():
+                stage[field] = {"$ifNull": [f"${field}", {"$literal": value}]}
+
+            try:
+                header = await headers.find_one_and_update(
+                    {"_id": write["conversation_id"], "recent_turns.id": {"$ne": write["turn_id"]}},
+                    [{"$set": stage}],
+                    projection={"message_count": 1},
+                    upsert=write["defaults"] is not None,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # The upsert found the header already holding this turn
+                header = None
+            if header is not None:
+                write["start"] = header["message_count"] - added
+                continue
+
+            # Either this turn was reserved by an earlier attempt or the conversation is gone
+            header = await headers.find_one(
+                {"_id": write["conversation_id"], "recent_turns.id": write["turn_id"]},
+                {"recent_turns": {"$elemMatch": {"id": write["turn_id"]}}}
+            )
+            if header is None:
+                logger.warning(f"Conversation {write['conversation_id']} no longer exists; dropping its turn")
+                write["start"] = -1
+            else:
+                write["start"] = header["recent_turns"][0]["start"]
+
+        operations = []
+        for write in writes:
+            if write["start"] < 0:
+                continue
+            by_bucket: Dict[int, List[Dict]] = {}
+            for offset, message in enumerate(write["messages"]):
+                index = write["start"] + offset
+                by_bucket.setdefault(index // MESSAGES_PER_BUCKET, []).append({**message, "index": index})
+            for seq, bucket_messages in by_bucket.items():
+                operations.append(UpdateOne(
+                    {"conversation_id": write["conversation_id"], "seq": seq},
+                    {"$addToSet": {"messages": {"$each": bucket_messages}}, "$setOnInsert": {"created_at": now}},
+                    upsert=True
+                ))
+        if operations:
+            await self.buckets.bulk_write(operations, ordered=False)
+
+
+# Singleton instance
+conversation_store = ConversationStore()
@@ -0,0 +1,139 @@
+from fastapi import HTTPException
+from app.models.mongo_models import Conversation
+from app.core.config import settings
+from app.services.llm_service import llm_service, LLMUnavailableError
+from app.core.llm_scheduler import PRIORITY_BACKGROUND
+from app.services.prompt_budget_service import prompt_budget_service, count_tokens
+from app.services.conversation_store import conversation_store
+from datetime import datetime
+from typing import Dict, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and the SatyaSetu assistant.
+Merge the existing summary with the new messages into one concise summary.
+Keep facts the assistant may need later: names, certificate IDs, institutions, courses, questions asked and answers given.
+Write plain sentences, no more than {max_words} words."""
+
+
+class ConversationSummaryService:
+    """
+    Keeps prompt size bounded for long conversations.
+
+    Older turns are folded into a running summary stored on the conversation
+    document (`summary`, `summarized_count`). Prompts then use the summary plus the
+    most recent raw messages. Folding runs in the background after the reply is sent.
+    """
+
+    def __init__(self):
+        self._tasks = set()
+        self._in_progress = set()
+
+    def recent_messages(self, tail: List, message_count: int, summarized_count: int) -> List:
+        """
+        Messages to send raw: every turn not already covered by the summary.
+
+        While a fold is pending (or lagging) that is more than CONVERSATION_RECENT_MESSAGES;
+        only beyond CONVERSATION_MAX_RAW_MESSAGES are the oldest dropped, and the prompt
+        budget trims further from the oldest end.
+
+        `tail` holds the last len(tail) of the conversation's `message_count` messages.
+        """
+        start = max(summarized_count, message_count - settings.CONVERSATION_MAX_RAW_MESSAGES)
+        tail_start = message_count - len(tail)
+        return tail[max(0, start - tail_start):]
+
+    def schedule(self, conversation_id, message_count: int, state: Dict):
+        """Fold older turns into the summary in the background once enough have piled up."""
+        fold_until = message_count - settings.CONVERSATION_RECENT_MESSAGES
+        pending = fold_until - state["summarized_count"]
+        if pending < settings.CONVERSATION_SUMMARY_TRIGGER:
+            return
+
+        # Long legacy conversations are caught up a slice at a time
+        fold_until = min(fold_until, state["summarized_count"] + 4 * settings.CONVERSATION_SUMMARY_TRIGGER)
+
+        key = str(conversation_id)
+        if key in self._in_progress:
+            return
+
+        self._in_progress.add(key)
+        task = asyncio.create_task(
+            self._fold(conversation_id, state, fold_until)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(lambda _: self._in_progress.discard(key))
+
+    async def shutdown(self, timeout: float = 10.0):
+        """Give in-flight summaries a chance to finish on shutdown."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    async def _fold(self, conversation_id, state: Dict, fold_until: int):
+        try:
+            # Only the slice being folded is read, never the whole message array
+            messages = await conversation_store.read_messages(
+                conversation_id, state["summarized_count"], fold_until - state["summarized_count"]
+            )
+            summary = await self._summarize(state["summary"], messages)
+            if not summary:
+                return
+
+            # Compare-and-set so a concurrent fold never moves the summary backwards
+            result = await Conversation.get_motor_collection().update_one(
+                {"_id": conversation_id, "summarized_count": {"$in": [state["summarized_count"], None]}},
+                {"$set": {
+                    "summary": summary,
+                    "summarized_count": fold_until,
+                    "summary_updated_at": datetime.utcnow()
+                }}
+            )
+            if result.modified_count:
+                logger.info(f"Folded {len(messages)} messages into summary for conversation {conversation_id}")
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_id}: {e}")
+
+    async def _summarize(self, previous_summary: str, messages: List) -> str:
+        """Summarize with the LLM, or fall back to an extractive summary."""
+        transcript = "\n".join(
+            f"{'User' if msg.is_user else 'Assistant'}: {msg.content}" for msg in messages
+        )
+        max_tokens = settings.CONVERSATION_SUMMARY_MAX_TOKENS
+
+        if llm_service.client:
+            try:
+                summary = await llm_service.generate_response(
+                    [
+                        {"role": "system", "content": SUMMARY_PROMPT.format(max_words=int(max_tokens * 0.7))},
+                        {"role": "user", "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+                    ],
+                    temperature=0.2,
+                    max_tokens=max_tokens,
+                    priority=PRIORITY_BACKGROUND
+                )
+                if summary:
+                    return summary.strip()
+            except (LLMUnavailableError, HTTPException) as e:
+                logger.info(f"LLM summary unavailable, using extractive summary: {e}")
+
+        # Extractive fallback: keep the previous summary and the start of each message
+        lines = [previous_summary] if previous_summary else []
+        for msg in messages:
+            words = msg.content.split()
+            snippet = " ".join(words[:25]) + (" ..." if len(words) > 25 else "")
+            lines.append(f"{'User' if msg.is_user else 'Assistant'}: {snippet}")
+
+        # Oldest lines go first when the summary outgrows its budget
+        while len(lines) > 1 and sum(count_tokens(line) for line in lines) > max_tokens:
+            lines.pop(0)
+        summary = "\n".join(lines)
+        if count_tokens(summary) > max_tokens:
+            summary = prompt_budget_service.truncate(summary, max_tokens)
+        return summary
+
+
+# Singleton instance
+conversation_summary_service = ConversationSummaryService()
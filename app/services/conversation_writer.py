@@ -0,0 +1,149 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.core.resilience import backoff_delay
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationWriter:
+    """
+    Write-behind queue for conversation updates.
+
+    Chat turns enqueue their write and respond without waiting on MongoDB. A single
+    worker drains the queue in order, handing up to CONVERSATION_WRITE_BATCH_SIZE writes
+    at a time to `apply_batch` and retrying failed batches with backoff (so
+    `apply_batch` must be safe to repeat).
+
+    Reads of a conversation call `wait_for()` first, which returns once that
+    conversation's queued writes have landed, so users always see their own messages.
+
+    CONVERSATION_DURABILITY="sync" (or a full queue) writes inline instead, keeping the
+    old behaviour where the response is only sent after the write succeeded.
+    """
+
+    def __init__(self, apply_batch: Callable[[List], Awaitable[None]]):
+        self.apply_batch = apply_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # conversation id -> [queued writes not yet applied, event set when none remain]
+        self._pending: Dict[str, list] = {}
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.inline_writes = 0
+
+    @property
+    def synchronous(self) -> bool:
+        # A dead worker would never drain the queue, so write inline rather than enqueue
+        return settings.CONVERSATION_DURABILITY == "sync" or self._worker is None or self._worker.done()
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=settings.CONVERSATION_WRITE_QUEUE_SIZE)
+        self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, conversation_id, write):
+        """Persist one write to a conversation, queued or inline depending on durability mode."""
+        if self.synchronous or self._queue.full():
+            self.inline_writes += 1
+            # Keep per-conversation order: anything already queued for it goes first
+            await self.wait_for(conversation_id)
+            await self.apply_batch([write])
+            return
+
+        key = str(conversation_id)
+        pending = self._pending.setdefault(key, [0, asyncio.Event()])
+        pending[0] += 1
+        pending[1].clear()
+        self._queue.put_nowait((key, write))
+        self.queued += 1
+
+    async def wait_for(self, conversation_id):
+        """Return once every queued write for this conversation has been applied (or given up on)."""
+        pending = self._pending.get(str(conversation_id))
+        if pending and not self.synchronous:
+            await pending[1].wait()
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < settings.CONVERSATION_WRITE_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._write(batch)
+            finally:
+                for key, _ in batch:
+                    pending = self._pending.get(key)
+                    if pending:
+                        pending[0] -= 1
+                        if pending[0] <= 0:
+                            pending[1].set()
+                            del self._pending[key]
+                    self._queue.task_done()
+
+    async def _write(self, batch: List):
+        writes = [write for _, write in batch]
+        for attempt in range(settings.CONVERSATION_WRITE_MAX_RETRIES + 1):
+            try:
+                # Writes are applied in queue order, so a conversation's turns stay in sequence
+                await self.apply_batch(writes)
+                self.batches += 1
+                self.written += len(writes)
+                return
+            except PyMongoError as e:
+                if attempt == settings.CONVERSATION_WRITE_MAX_RETRIES:
+                    self.failed += len(writes)
+                    logger.error(f"Dropping {len(writes)} conversation writes after {attempt + 1} attempts: {e}")
+                    return
+                self.retries += 1
+                delay = backoff_delay(attempt, 0.2, 5.0)
+                logger.warning(f"Conversation write batch failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                # Not a transient database error (e.g. an unencodable document): retrying
+                # cannot help, and letting it escape would kill the worker
+                self.failed += len(writes)
+                logger.error(f"Dropping {len(writes)} conversation writes: {e!r}")
+                return
+
+    async def shutdown(self, timeout: float = 10.0):
+        """Drain queued writes on shutdown, then stop the worker."""
+        if self._worker is None:
+            return
+        if self._queue.qsize():
+            logger.info(f"Draining {self._queue.qsize()} queued conversation writes")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Shutdown with {self._queue.qsize()} conversation writes still queued")
+        self._worker.cancel()
+        self._worker = None
+        # Whatever is still queued will not be written; don't leave readers waiting on it
+        for _, event in self._pending.values():
+            event.set()
+        self._pending.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "mode": "sync" if self.synchronous else "async",
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queued": self.queued,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "inline_writes": self.inline_writes
+        }
+
+
+async def _apply_conversation_writes(writes: List):
+    from app.services.conversation_store import conversation_store
+    await conversation_store.apply_writes(writes)
+
+
+# Singleton instance
+conversation_writer = ConversationWriter(_apply_conversation_writes)
@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.core.mongodb import get_database
+from datetime import datetime
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Breakdown name -> expression over a certificate document
+DIMENSIONS = {
+    "by_status": "$status",
+    "by_course": "$student.course",
+    "by_department": "$student.department",
+    "by_year": {"$cond": [{"$eq": [{"$type": "$issuedAt"}, "date"]}, {"$year": "$issuedAt"}, None]},
+    "by_blockchain_status": "$blockchainStatus",
+}
+
+REBUILD_DELAY_SECONDS = 2
+# A rebuild that keeps losing to concurrent increments is handed to the background worker
+REBUILD_ATTEMPTS = 3
+# Certificate ids kept per institution to recognise the same insert event from another worker
+RECENT_CERTIFICATES = 1000
+
+# institution_stats_meta document recording that every institution has been built
+COMPLETE_MARKER = "complete"
+
+
+def stat_key(value) -> str:
+    """Map a field value to a usable document key ('.' and a leading '$' are not allowed)."""
+    if value is None or value == "":
+        return "unknown"
+    return str(value).replace(".", "_").lstrip("$") or "unknown"
+
+
+def certificate_keys(certificate: Dict) -> Dict[str, str]:
+    """Breakdown keys a single certificate contributes to."""
+    student = certificate.get("student") or {}
+    issued_at = certificate.get("issuedAt")
+    return {
+        "by_status": stat_key(certificate.get("status")),
+        "by_course": stat_key(student.get("course")),
+        "by_department": stat_key(student.get("department")),
+        "by_year": stat_key(issued_at.year if isinstance(issued_at, datetime) else None),
+        "by_blockchain_status": stat_key(certificate.get("blockchainStatus")),
+    }
+
+
+class InstitutionStatsService:
+    """
+    Maintains `institution_stats`: one small document per institution with certificate
+    counts in total and by status, course, department, issue year and blockchain status.
+
+    New certificates are counted incrementally with `$inc`. Every API worker sees the same
+    change events, so the increment only matches while the certificate is not yet in the
+    document's `recent_certificates`, and pushes it there in the same update: exactly one
+    worker counts it. Updates and deletes do not carry the previous values, so they trigger
+    a (debounced) rebuild of the affected institution. `rebuild()` recomputes everything
+    and is exposed as a CLI (rebuild_institution_stats.py). Each document carries a
+    `version` bumped by every write; a rebuild only replaces the counts it read the
+    version of, and recomputes if an increment landed in between.
+
+    Institutions are otherwise built on first access, so system-wide totals are only
+    summed from the view once a full rebuild has recorded that it covers everyone.
+    """
+
+    def __init__(self):
+        self._pending = set()
+        self._rebuild_all_pending = False
+        self._worker: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._rebuild_all_lock = asyncio.Lock()
+        self.incremental_updates = 0
+        self.duplicate_events = 0
+        self.rebuilds = 0
+
+    async def get(self, institution_id, db=None) -> Optional[Dict]:
+        """Stats for one institution, computed on first access."""
+        db = db if db is not None else get_database()
+        org_id = ObjectId(institution_id) if isinstance(institution_id, str) else institution_id
+        stats = await db.institution_stats.find_one({"_id": org_id})
+        if stats is None:
+            await self.rebuild(db, org_id)
+            stats = await db.institution_stats.find_one({"_id": org_id})
+        return stats
+
+    async def get_system_totals(self, db=None) -> Optional[Dict]:
+        """All institutions' stats added together (one document per institution is read); None if there are no certificates."""
+        db = db if db is not None else get_database()
+        if not await db.institution_stats_meta.find_one({"_id": COMPLETE_MARKER}):
+            # Some institutions may not have been built yet; build them all once
+            async with self._rebuild_all_lock:
+                if not await db.institution_stats_meta.find_one({"_id": COMPLETE_MARKER}):
+                    await self.rebuild(db)
+
+        totals = None
+        async for stats in db.institution_stats.find({}):
+            if totals is None:
+                totals = {"total": 0, **{name: {} for name in DIMENSIONS}}
+            totals["total"] += stats.get("total", 0)
+            for name in DIMENSIONS:
+                for key, count in (stats.get(name) or {}).items():
+                    totals[name][key] = totals[name].get(key, 0) + count
+        return totals
+
+    async def rebuild(self, db=None, institution_id: ObjectId = None, claimed: Optional[List] = None) -> int:
+        """
+        Recompute stats from `certificates`, for one institution or all of them.
+
+        `claimed` certificate ids (already included in the count) are added to the
+        institution's `recent_certificates` with the new counts.
+
+        Returns:
+            number of institution documents written
+        """
+        db = db if db is not None else get_database()
+        written, conflicts = await self._rebuild_once(db, institution_id, claimed)
+        for org_id in conflicts:
+            for _ in range(REBUILD_ATTEMPTS):
+                rewritten, retry = await self._rebuild_once(db, org_id, claimed if org_id == institution_id else None)
+                if not retry:
+                    written += rewritten
+                    break
+            else:
+                logger.warning(f"Institution stats for {org_id} keep changing during rebuild; retrying later")
+                self._schedule_rebuild(org_id)
+
+        if institution_id is None:
+            # Every institution was written, or rescheduled if it kept changing
+            await db.institution_stats_meta.replace_one(
+                {"_id": COMPLETE_MARKER}, {"_id": COMPLETE_MARKER, "rebuilt_at": datetime.utcnow()}, upsert=True
+            )
+
+        self.rebuilds += 1
+        return written
+
+    async def _rebuild_once(self, db, institution_id: Optional[ObjectId], claimed: Optional[List]) -> Tuple[int, List]:
+        """One recompute-and-write pass; returns (documents written, institutions changed meanwhile)."""
+        match = {"institutionId": institution_id} if institution_id is not None else {}
+        # Versions are read before counting: an increment after this point fails the write below
+        versions = {
+            doc["_id"]: doc.get("version")
+            async for doc in db.institution_stats.find(
+                {"_id": institution_id} if institution_id is not None else {}, {"version": 1}
+            )
+        }
+        pipeline = [
+            {"$match": match},
+            {"$facet": {
+                "total": [{"$group": {"_id": "$institutionId", "n": {"$sum": 1}}}],
+                **{
+                    name: [{"$group": {"_id": {"i": "$institutionId", "v": expression}, "n": {"$sum": 1}}}]
+                    for name, expression in DIMENSIONS.items()
+                }
+            }}
+        ]
+        result = await db.certificates.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        facets = result[0] if result else {}
+
+        now = datetime.utcnow()
+        documents = {
+            row["_id"]: {"total": row["n"], **{name: {} for name in DIMENSIONS}, "updated_at": now}
+            for row in facets.get("total", [])
+        }
+        for name in DIMENSIONS:
+            for row in facets.get(name, []):
+                breakdown = documents[row["_id"].get("i")][name]
+                key = stat_key(row["_id"].get("v"))
+                breakdown[key] = breakdown.get(key, 0) + row["n"]
+
+        conflicts = []
+        for org_id, counts in documents.items():
+            version = versions.get(org_id)
+            update = {"$set": {**counts, "version": (version or 0) + 1}}
+            if claimed and org_id == institution_id:
+                update["$push"] = {"recent_certificates": {"$each": claimed, "$slice": -RECENT_CERTIFICATES}}
+            try:
+                # Matches only the document as it was when the versions were read (or its absence)
+                result = await db.institution_stats.update_one({"_id": org_id, "version": version}, update, upsert=True)
+            except DuplicateKeyError:
+                result = None
+            if result is None or not (result.matched_count or result.upserted_id is not None):
+                conflicts.append(org_id)
+
+        # Institutions whose certificates are all gone
+        for org_id, version in versions.items():
+            if org_id not in documents:
+                result = await db.institution_stats.delete_one({"_id": org_id, "version": version})
+                if not result.deleted_count:
+                    conflicts.append(org_id)
+
+        return len(documents) - len(conflicts), conflicts
+
+    async def record_issued(self, certificate: Dict, db=None):
+        """Count one newly inserted certificate (institutions without stats yet are rebuilt instead)."""
+        db = db if db is not None else get_database()
+        institution_id = certificate.get("institutionId")
+        certificate_id = certificate.get("_id")
+
+        increments = {"total": 1, "version": 1}
+        for name, key in certificate_keys(certificate).items():
+            increments[f"{name}.{key}"] = 1
+        query = {"_id": institution_id}
+        update = {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+        if certificate_id is not None:
+            # Claim and count in one atomic update: only the first worker's update matches
+            query["recent_certificates"] = {"$ne": certificate_id}
+            update["$push"] = {"recent_certificates": {"$each": [certificate_id], "$slice": -RECENT_CERTIFICATES}}
+
+        result = await db.institution_stats.update_one(query, update)
+        if result.matched_count:
+            self.incremental_updates += 1
+        elif certificate_id is not None and await db.institution_stats.find_one({"_id": institution_id}, {"_id": 1}):
+            self.duplicate_events += 1
+        else:
+            await self.rebuild(db, institution_id, claimed=[certificate_id] if certificate_id is not None else None)
+
+    def _schedule_rebuild(self, institution_id=None):
+        if institution_id is not None:
+            self._pending.add(institution_id)
+        else:
+            self._rebuild_all_pending = True
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+
+    def on_certificate_change(self, change: Dict):
+        """Certificate watcher subscriber."""
+        certificate = change.get("certificate")
+        if change["operation"] == "insert" and certificate:
+            task = asyncio.create_task(self._record_issued_safely(certificate))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+
+        self._schedule_rebuild(certificate.get("institutionId") if certificate else None)
+
+    async def _record_issued_safely(self, certificate: Dict):
+        try:
+            await self.record_issued(certificate)
+        except Exception as e:
+            logger.error(f"Error updating institution stats: {e}")
+
+    async def _drain(self):
+        # Let a burst of changes to one institution collapse into a single rebuild
+        await asyncio.sleep(REBUILD_DELAY_SECONDS)
+        while self._pending or self._rebuild_all_pending:
+            try:
+                if self._rebuild_all_pending:
+                    self._rebuild_all_pending = False
+                    self._pending.clear()
+                    await self.rebuild()
+                else:
+                    await self.rebuild(institution_id=self._pending.pop())
+            except Exception as e:
+                logger.error(f"Error rebuilding institution stats: {e}")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "incremental_updates": self.incremental_updates,
+            "rebuilds": self.rebuilds,
+            "duplicate_events": self.duplicate_events,
+            "pending_rebuilds": len(self._pending) + int(self._rebuild_all_pending)
+        }
+
+
+# Singleton instance
+institution_stats_service = InstitutionStatsService()
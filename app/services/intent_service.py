@@ -0,0 +1,312 @@
+from typing import Dict, List, Optional, Tuple
+from app.core.config import STAFF_ROLES, settings
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+INTENT_CERTIFICATE_COUNT = "certificate_count"
+INTENT_CGPA = "cgpa"
+INTENT_LIST_CERTIFICATES = "list_certificates"
+INTENT_FAQ_BLOCKCHAIN = "faq_blockchain"
+INTENT_FAQ_VERIFY = "faq_how_to_verify"
+INTENT_FAQ_ABOUT = "faq_about"
+INTENT_OTHER = "other"
+
+# Intents answered from the user's own certificates
+DATA_INTENTS = {INTENT_CERTIFICATE_COUNT, INTENT_CGPA, INTENT_LIST_CERTIFICATES}
+
+# High-precision keyword rules (English and Hindi). Data intents are anchored to the
+# user's own certificates ("my", "do I have") so questions about others never match.
+KEYWORD_RULES: List[Tuple[str, re.Pattern]] = [
+    (INTENT_CERTIFICATE_COUNT, re.compile(
+        r"\bhow many (certificates|certs|degrees) (do|have|did) i\b|\bhow many of my (certificates|certs|degrees)\b|"
+        r"\bnumber of (my )?certificates (do )?i (have|own)\b|\bnumber of my certificates\b|"
+        r"मेरे (पास )?कितने प्रमाणपत्र|मेरे प्रमाणपत्रों की संख्या", re.IGNORECASE)),
+    (INTENT_CGPA, re.compile(
+        r"\b(my|what is my|what's my) (cgpa|gpa|grade|grades)\b|मेरा (सीजीपीए|cgpa|ग्रेड)", re.IGNORECASE)),
+    (INTENT_LIST_CERTIFICATES, re.compile(
+        r"\b(list|show|display) (all )?(of )?my certificates\b|मेरे (सभी )?प्रमाणपत्र (दिखाओ|दिखाएं|बताओ)", re.IGNORECASE)),
+    (INTENT_FAQ_BLOCKCHAIN, re.compile(
+        r"\bhow (does|do) (the )?blockchain\b|\bblockchain verification work|ब्लॉकचेन (सत्यापन )?कैसे", re.IGNORECASE)),
+    (INTENT_FAQ_VERIFY, re.compile(
+        r"\bhow (can|do) i verify\b|\bhow to verify (a |my )?certificate|प्रमाणपत्र (का )?सत्यापन कैसे", re.IGNORECASE)),
+    (INTENT_FAQ_ABOUT, re.compile(
+        r"\bwhat is satya ?setu\b|सत्यसेतु क्या है", re.IGNORECASE)),
+]
+
+# Weight of a keyword rule hit. It is combined with the model's probability for the same
+# intent (noisy-OR), so a rule alone cannot clear FAST_PATH_MIN_CONFIDENCE when the
+# model finds the message unlike that intent.
+RULE_WEIGHT = 0.7
+
+# Seed corpus for the naive Bayes fallback classifier
+TRAINING_EXAMPLES: List[Tuple[str, str]] = [
+    ("how many certificates do i have", INTENT_CERTIFICATE_COUNT),
+    ("count of my certificates", INTENT_CERTIFICATE_COUNT),
+    ("total certificates issued to me", INTENT_CERTIFICATE_COUNT),
+    ("how many degrees have i received", INTENT_CERTIFICATE_COUNT),
+    ("number of certificates i own", INTENT_CERTIFICATE_COUNT),
+    ("मेरे पास कितने प्रमाणपत्र हैं", INTENT_CERTIFICATE_COUNT),
+    ("what is my cgpa", INTENT_CGPA),
+    ("tell me my cgpa", INTENT_CGPA),
+    ("what grade did i get", INTENT_CGPA),
+    ("my final gpa score", INTENT_CGPA),
+    ("what cgpa is on my certificate", INTENT_CGPA),
+    ("मेरा सीजीपीए क्या है", INTENT_CGPA),
+    ("show my certificates", INTENT_LIST_CERTIFICATES),
+    ("list all my certificates", INTENT_LIST_CERTIFICATES),
+    ("which certificates have been issued to me", INTENT_LIST_CERTIFICATES),
+    ("give me details of my certificates", INTENT_LIST_CERTIFICATES),
+    ("display my degree certificates", INTENT_LIST_CERTIFICATES),
+    ("मेरे प्रमाणपत्र दिखाओ", INTENT_LIST_CERTIFICATES),
+    ("how does blockchain verification work", INTENT_FAQ_BLOCKCHAIN),
+    ("why is blockchain used for certificates", INTENT_FAQ_BLOCKCHAIN),
+    ("what does blockchain status mean", INTENT_FAQ_BLOCKCHAIN),
+    ("is my certificate stored on blockchain", INTENT_FAQ_BLOCKCHAIN),
+    ("explain blockchain based verification", INTENT_FAQ_BLOCKCHAIN),
+    ("ब्लॉकचेन सत्यापन कैसे काम करता है", INTENT_FAQ_BLOCKCHAIN),
+    ("how do i verify a certificate", INTENT_FAQ_VERIFY),
+    ("how can an employer check my degree", INTENT_FAQ_VERIFY),
+    ("steps to verify a certificate", INTENT_FAQ_VERIFY),
+    ("how to check if a certificate is genuine", INTENT_FAQ_VERIFY),
+    ("verify certificate authenticity", INTENT_FAQ_VERIFY),
+    ("प्रमाणपत्र का सत्यापन कैसे करें", INTENT_FAQ_VERIFY),
+    ("what is satyasetu", INTENT_FAQ_ABOUT),
+    ("tell me about satyasetu", INTENT_FAQ_ABOUT),
+    ("what does this platform do", INTENT_FAQ_ABOUT),
+    ("who runs satyasetu", INTENT_FAQ_ABOUT),
+    ("सत्यसेतु क्या है", INTENT_FAQ_ABOUT),
+    ("my certificate has a spelling mistake in my name", INTENT_OTHER),
+    ("why was my certificate revoked", INTENT_OTHER),
+    ("compare cgpa across departments", INTENT_OTHER),
+    ("how many certificates did mmmut issue last year", INTENT_OTHER),
+    ("how many certificates were issued this year", INTENT_OTHER),
+    ("what are common signs of a forged marksheet", INTENT_OTHER),
+    ("can you help me write an email to the registrar", INTENT_OTHER),
+    ("which students have cgpa above 9", INTENT_OTHER),
+    ("explain the difference between degree and diploma", INTENT_OTHER),
+    ("my pdf link is not opening", INTENT_OTHER),
+    ("hello how are you", INTENT_OTHER),
+    ("मेरा प्रमाणपत्र रद्द क्यों हुआ", INTENT_OTHER),
+    ("संस्थान ने कितने प्रमाणपत्र जारी किए", INTENT_OTHER),
+]
+
+FAQ_ANSWERS = {
+    INTENT_FAQ_BLOCKCHAIN: {
+        "en": (
+            "SatyaSetu records a cryptographic fingerprint (hash) of every certificate on a blockchain when it is issued. "
+            "To verify a certificate, the system recomputes the hash of the presented document and compares it with the "
+            "one stored on-chain. Because blockchain records cannot be altered, any change to the certificate, even a "
+            "single character, produces a different hash and is flagged as tampered. The certificate's blockchain status "
+            "shows whether its record has been confirmed on-chain."
+        ),
+        "hi": (
+            "सत्यसेतु हर प्रमाणपत्र जारी होते समय उसका एक क्रिप्टोग्राफ़िक फ़िंगरप्रिंट (हैश) ब्लॉकचेन पर दर्ज करता है। "
+            "सत्यापन के समय प्रस्तुत दस्तावेज़ का हैश दोबारा निकाला जाता है और ब्लॉकचेन पर दर्ज हैश से मिलाया जाता है। "
+            "ब्लॉकचेन रिकॉर्ड बदले नहीं जा सकते, इसलिए प्रमाणपत्र में एक अक्षर का बदलाव भी अलग हैश बनाता है और "
+            "उसे छेड़छाड़ किया हुआ माना जाता है। प्रमाणपत्र की ब्लॉकचेन स्थिति बताती है कि उसका रिकॉर्ड ब्लॉकचेन पर पुष्टि हो चुका है या नहीं।"
+        ),
+    },
+    INTENT_FAQ_VERIFY: {
+        "en": (
+            "To verify a certificate on SatyaSetu:\n"
+            "1. Open the verification link or scan the QR code printed on the certificate, or enter its certificate ID "
+            "(for example SATYA-2025-XXXXXXXXXXXXXXXX).\n"
+            "2. SatyaSetu shows the issuing institution, the student details and the certificate status.\n"
+            "3. The blockchain status confirms the record has not been altered since it was issued.\n"
+            "If the ID is not found or the status is not ISSUED, contact the issuing institution."
+        ),
+        "hi": (
+            "सत्यसेतु पर प्रमाणपत्र सत्यापित करने के लिए:\n"
+            "1. प्रमाणपत्र पर छपा सत्यापन लिंक खोलें या QR कोड स्कैन करें, या प्रमाणपत्र आईडी दर्ज करें "
+            "(जैसे SATYA-2025-XXXXXXXXXXXXXXXX)।\n"
+            "2. सत्यसेतु जारी करने वाले संस्थान, छात्र का विवरण और प्रमाणपत्र की स्थिति दिखाता है।\n"
+            "3. ब्लॉकचेन स्थिति पुष्टि करती है कि जारी होने के बाद रिकॉर्ड में कोई बदलाव नहीं हुआ है।\n"
+            "यदि आईडी नहीं मिलती या स्थिति ISSUED नहीं है, तो जारी करने वाले संस्थान से संपर्क करें।"
+        ),
+    },
+    INTENT_FAQ_ABOUT: {
+        "en": (
+            "SatyaSetu is an educational document verification system. Institutions issue digital certificates whose "
+            "records are secured on a blockchain, so students, employers and authorities can instantly check that a "
+            "degree, marksheet or certificate is genuine and detect forgeries."
+        ),
+        "hi": (
+            "सत्यसेतु एक शैक्षिक दस्तावेज़ सत्यापन प्रणाली है। संस्थान डिजिटल प्रमाणपत्र जारी करते हैं जिनके रिकॉर्ड ब्लॉकचेन "
+            "पर सुरक्षित होते हैं, ताकि छात्र, नियोक्ता और अधिकारी तुरंत जांच सकें कि डिग्री, मार्कशीट या प्रमाणपत्र असली है "
+            "और जालसाजी पकड़ सकें।"
+        ),
+    },
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    words = re.findall(r"\w+", text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over unigrams and bigrams, small enough to train at import time."""
+
+    def __init__(self, examples: List[Tuple[str, str]]):
+        self.word_counts: Dict[str, Dict[str, int]] = {}
+        self.totals: Dict[str, int] = {}
+        self.priors: Dict[str, float] = {}
+        vocabulary = set()
+
+        for text, intent in examples:
+            counts = self.word_counts.setdefault(intent, {})
+            for token in _tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+                vocabulary.add(token)
+            self.priors[intent] = self.priors.get(intent, 0) + 1
+
+        self.vocabulary_size = len(vocabulary)
+        for intent, counts in self.word_counts.items():
+            self.totals[intent] = sum(counts.values())
+            self.priors[intent] = math.log(self.priors[intent] / len(examples))
+
+    def probabilities(self, text: str) -> Dict[str, float]:
+        """Posterior probability of every intent."""
+        tokens = _tokenize(text)
+        scores = {}
+        for intent, counts in self.word_counts.items():
+            denominator = self.totals[intent] + self.vocabulary_size
+            scores[intent] = self.priors[intent] + sum(
+                math.log((counts.get(token, 0) + 1) / denominator) for token in tokens
+            )
+
+        top = max(scores.values())
+        weights = {intent: math.exp(score - top) for intent, score in scores.items()}
+        normalizer = sum(weights.values())
+        return {intent: weight / normalizer for intent, weight in weights.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely intent and its posterior probability."""
+        probabilities = self.probabilities(text)
+        best = max(probabilities, key=probabilities.get)
+        return best, probabilities[best]
+
+
+class IntentService:
+    """
+    Answers simple questions without an LLM round-trip.
+
+    Keyword rules run first; otherwise a small naive Bayes model guesses the intent.
+    Confident FAQ intents get curated answers and confident data intents are answered
+    from the user's certificates, in English or Hindi. Everything else falls through
+    to the LLM.
+    """
+
+    def __init__(self):
+        self.model = NaiveBayesIntentModel(TRAINING_EXAMPLES)
+        self.classified = 0
+        self.fast_path_hits: Dict[str, int] = {}
+
+    def classify(self, text: str) -> Dict:
+        """Guess the intent of a message."""
+        probabilities = self.model.probabilities(text)
+        for intent, pattern in KEYWORD_RULES:
+            if pattern.search(text):
+                confidence = 1 - (1 - RULE_WEIGHT) * (1 - probabilities.get(intent, 0.0))
+                return {"intent": intent, "confidence": confidence, "method": "rule"}
+
+        intent = max(probabilities, key=probabilities.get)
+        return {"intent": intent, "confidence": probabilities[intent], "method": "model"}
+
+    async def try_fast_path(
+        self,
+        message: str,
+        language: str = "en",
+        user_email: Optional[str] = None,
+        user_role: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Answer the message directly when the intent is clear.
+
+        Returns:
+            dict with 'answer', 'intent' and 'sources', or None to fall through to the LLM
+        """
+        self.classified += 1
+        result = self.classify(message)
+        intent = result["intent"]
+
+        if intent == INTENT_OTHER or result["confidence"] < settings.FAST_PATH_MIN_CONFIDENCE:
+            return None
+
+        language = "hi" if language == "hi" else "en"
+        answer = None
+        if intent in FAQ_ANSWERS:
+            answer = FAQ_ANSWERS[intent][language]
+        elif intent in DATA_INTENTS and user_email and (user_role or "").upper() not in STAFF_ROLES:
+            # Institution-wide questions from admins/MOE need the full prompt
+            from app.services.student_service import StudentDataService
+            try:
+                certificates = await StudentDataService.find_certificates(user_email, "USER")
+            except Exception as e:
+                # An empty list here would be a confident wrong answer ("You have 0 certificates")
+                logger.warning(f"Fast path skipped for intent={intent}: certificate lookup failed: {e}")
+                return None
+            answer = self._answer_from_certificates(intent, certificates, language)
+
+        if answer is None:
+            return None
+
+        self.fast_path_hits[intent] = self.fast_path_hits.get(intent, 0) + 1
+        logger.info(
+            f"Fast path answered intent={intent} via {result['method']} "
+            f"(confidence {result['confidence']:.2f})"
+        )
+        return {"answer": answer, "intent": intent, "sources": ["SatyaSetu"]}
+
+    def _answer_from_certificates(self, intent: str, certificates: List[Dict], language: str) -> Optional[str]:
+        hindi = language == "hi"
+
+        if intent == INTENT_CERTIFICATE_COUNT:
+            if hindi:
+                answer = f"आपके नाम पर {len(certificates)} प्रमाणपत्र जारी किए गए हैं।"
+            else:
+                answer = f"You have {len(certificates)} certificate{'s' if len(certificates) != 1 else ''} issued in your name."
+            if certificates:
+                answer += "\n" + self._format_certificates(certificates[:5], hindi)
+            return answer
+
+        if intent == INTENT_CGPA:
+            graded = [cert for cert in certificates if cert.get("grade") not in (None, "")]
+            if not graded:
+                # Nothing to template; let the LLM explain
+                return None
+            lines = [f"- {cert['course']}: {cert['grade']}" for cert in graded]
+            header = "आपके प्रमाणपत्रों पर दर्ज सीजीपीए:" if hindi else "CGPA recorded on your certificates:"
+            return header + "\n" + "\n".join(lines)
+
+        if intent == INTENT_LIST_CERTIFICATES:
+            if not certificates:
+                return "आपके नाम पर अभी कोई प्रमाणपत्र जारी नहीं हुआ है।" if hindi else "No certificates have been issued in your name yet."
+            header = "आपके प्रमाणपत्र:" if hindi else "Your certificates:"
+            return header + "\n" + self._format_certificates(certificates[:10], hindi)
+
+        return None
+
+    def _format_certificates(self, certificates: List[Dict], hindi: bool) -> str:
+        issued = "जारी" if hindi else "Issued"
+        status = "स्थिति" if hindi else "Status"
+        return "\n".join(
+            f"{i}. {cert['course']} ({cert['certificate_id']}) - {issued}: {cert['issue_date']}, {status}: {cert['status']}"
+            for i, cert in enumerate(certificates, 1)
+        )
+
+    def stats(self) -> Dict:
+        hits = sum(self.fast_path_hits.values())
+        return {
+            "classified": self.classified,
+            "fast_path_hits": hits,
+            "hit_rate": round(hits / self.classified, 3) if self.classified else 0.0,
+            "hits_by_intent": self.fast_path_hits
+        }
+
+
+# Singleton instance
+intent_service = IntentService()
@@ -1,10 +1,41 @@
 from groq import Groq
+import groq
 from typing import List, Dict, Optional
 from app.core.config import settings
+from app.core.llm_scheduler import llm_scheduler, PRIORITY_STUDENT
+from app.core.resilience import CircuitBreaker, LatencyTracker, backoff_delay
+from app.services.model_router import model_router
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Upstream failures worth retrying (and counting against the circuit breaker)
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+# Shared by every LLMService instance: they all talk to the same upstream
+llm_breaker = CircuitBreaker(
+    "groq",
+    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.LLM_BREAKER_RESET_SECONDS
+)
+llm_latency = LatencyTracker()
+
+
+class LLMUnavailableError(Exception):
+    """The LLM backend could not produce an answer (timeouts, upstream errors, open circuit)."""
+    
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
 
 class LLMService:
     """Service for interacting with Groq LLM (Free tier)."""
@@ -14,36 +45,194 @@ class LLMService:
             logger.warning("GROQ_API_KEY not set. LLM functionality will be limited.")
             self.client = None
         else:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
+            # Retries and timeouts are handled here, not inside the SDK
+            self.client = Groq(
+                api_key=settings.GROQ_API_KEY,
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                max_retries=0
+            )
     
     async def generate_response(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
-        max_tokens: int = 1024,
-        stream: bool = False
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        priority: str = PRIORITY_STUDENT,
+        route: Optional[Dict] = None
     ) -> str:
-        """Generate response from LLM."""
+        """
+        Generate response from LLM, scheduled by the caller's priority class.
+        A `route` from `route_request` selects the model and default completion budget.
+        
+        Raises:
+            LLMUnavailableError: when the backend fails after retries or the circuit is open
+        """
         if not self.client:
             return "LLM service is not configured. Please set GROQ_API_KEY."
         
-        try:
-            response = self.client.chat.completions.create(
-                model=settings.GROQ_MODEL,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream
-            )
+        model = route["model"] if route else settings.GROQ_MODEL
+        if max_tokens is None:
+            max_tokens = route["max_tokens"] if route else 1024
+        
+        # Admission control: waits for a slot by priority, raises 429 when overloaded
+        async with llm_scheduler.slot(priority):
+            started = time.monotonic()
+            response = await self._complete_with_retries(messages, model, temperature, max_tokens, stream, priority)
+            if route:
+                model_router.record_latency(route["tier"], time.monotonic() - started)
+            return response
+    
+    def route_request(
+        self,
+        question: str,
+        user_role: Optional[str] = None,
+        context_docs: Optional[List[Dict]] = None
+    ) -> Dict:
+        """Pick a model tier for a chat question (see ModelRouter)."""
+        return model_router.route(question, user_role, context_docs)
+    
+    async def _complete_with_retries(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        priority: str = PRIORITY_STUDENT
+    ) -> str:
+        last_error = None
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            if not llm_breaker.allow_request():
+                raise LLMUnavailableError(
+                    "LLM backend is temporarily unavailable",
+                    retry_after=llm_breaker.retry_after()
+                )
             
-            if stream:
-                return response
+            started = time.monotonic()
+            try:
+                if stream:
+                    response = await self._complete(messages, model, temperature, max_tokens, stream, priority)
+                else:
+                    response = await self._complete_hedged(messages, model, temperature, max_tokens, priority)
+            except RETRYABLE_ERRORS as e:
+                last_error = e
+                llm_breaker.record_failure()
+                logger.warning(
+                    f"LLM call failed (attempt {attempt + 1}/{settings.LLM_MAX_RETRIES + 1}): "
+                    f"{type(e).__name__}: {e}"
+                )
+                if attempt < settings.LLM_MAX_RETRIES:
+                    await asyncio.sleep(backoff_delay(
+                        attempt,
+                        settings.LLM_RETRY_BASE_DELAY_SECONDS,
+                        settings.LLM_RETRY_MAX_DELAY_SECONDS
+                    ))
+                continue
+            except Exception as e:
+                # Bad requests are our fault, not an upstream outage: don't retry, and neither
+                # trip nor reset the breaker
+                llm_breaker.record_neutral()
+                logger.error(f"Error generating LLM response: {e}")
+                raise LLMUnavailableError(f"Unable to generate response: {e}")
             
-            return response.choices[0].message.content
+            llm_breaker.record_success()
+            llm_latency.record(time.monotonic() - started)
+            return response
+        
+        raise LLMUnavailableError(
+            f"Unable to generate response: {type(last_error).__name__}",
+            retry_after=llm_breaker.retry_after()
+        )
+    
+    async def _complete_hedged(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        priority: str = PRIORITY_STUDENT
+    ) -> str:
+        """
+        Send the request; if it is still running after the observed p95 latency,
+        send a second copy and take whichever answers first.
+
+        The second copy needs its own scheduler slot and the losing copy keeps its slot
+        until its thread returns (see `_complete`), so hedging never pushes upstream
+        concurrency past LLM_MAX_CONCURRENCY; without a free slot the call just waits.
+        """
+        hedge_after = None
+        if settings.LLM_HEDGE_ENABLED and len(llm_latency) >= settings.LLM_HEDGE_MIN_SAMPLES:
+            hedge_after = llm_latency.percentile(0.95)
+        
+        primary = asyncio.create_task(self._complete(messages, model, temperature, max_tokens, False, priority))
+        pending = {primary}
+        try:
+            if hedge_after is None:
+                return await primary
+        
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done:
+                return primary.result()
+        
+            if not llm_scheduler.try_acquire(priority):
+                return await primary
         
-        except Exception as e:
-            logger.error(f"Error generating LLM response: {e}")
-            return f"Error: Unable to generate response. {str(e)}"
+            logger.info(f"LLM call exceeded p95 ({hedge_after * 1000:.0f} ms), sending hedged request")
+            hedge = asyncio.create_task(self._complete(messages, model, temperature, max_tokens, False, priority))
+            hedge.add_done_callback(lambda _: llm_scheduler.release(priority))
+            pending.add(hedge)
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # The losing copy, or both when the caller itself is cancelled
+            for task in pending:
+                task.cancel()
+    
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        priority: str = PRIORITY_STUDENT
+    ) -> str:
+        # The Groq client is synchronous; keep it off the event loop. A thread cannot be
+        # cancelled, so `call` is shielded and tracks the request until it really returns
+        call = asyncio.ensure_future(asyncio.to_thread(
+            self.client.chat.completions.create,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream
+        ))
+        try:
+            response = await asyncio.wait_for(asyncio.shield(call), timeout=settings.LLM_TIMEOUT_SECONDS)
+        finally:
+            if not call.done():
+                # Timed out, lost a hedge race or the caller went away: the request still
+                # occupies the upstream until its thread returns
+                llm_scheduler.hold_until(call, priority)
+        
+        if stream:
+            return response
+        
+        return response.choices[0].message.content
+    
+    def stats(self) -> Dict:
+        return {
+            "circuit_breaker": llm_breaker.stats(),
+            "latency": llm_latency.stats(),
+            "routing": model_router.stats()
+        }
     
     def create_system_prompt(self, context: str, language: str = "en") -> str:
         """Create system prompt with RAG context."""
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional
+from app.core.config import STAFF_ROLES, settings
+from app.core.resilience import LatencyTracker
+from app.services.prompt_budget_service import count_tokens
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+TIER_COMPLEX = "complex"
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|namaste|namaskar|good (morning|afternoon|evening)|thanks|thank you|ok|okay|bye|"
+    # (?!\w) rather than \b: Devanagari words can end in a vowel sign, which is not \w
+    r"नमस्ते|नमस्कार|धन्यवाद)(?!\w)",
+    re.IGNORECASE
+)
+FAQ_PATTERN = re.compile(
+    r"\b(what is|what are|how does|how do i|how to|explain|why|define|meaning of|"
+    r"blockchain|verify|verification|satyasetu|forgery|forged|fake)\b",
+    re.IGNORECASE
+)
+ANALYSIS_PATTERN = re.compile(
+    r"\b(compare|comparison|analy[sz]e|analysis|trend|statistics|stats|breakdown|distribution|"
+    r"report|summari[sz]e|all (certificates|institutions|students)|across|each institution|"
+    r"by (department|course|year|status))\b",
+    re.IGNORECASE
+)
+
+
+class ModelRouter:
+    """
+    Picks a model tier for each chat request from local signals only:
+    question length, a keyword intent guess, retrieval confidence and the user's role.
+    Tiers map to a Groq model and completion budget via settings.LLM_MODEL_TIERS.
+    """
+
+    def __init__(self, tiers: Dict[str, Dict] = None):
+        self.tiers = tiers or settings.LLM_MODEL_TIERS
+        self.decisions: Dict[str, int] = {}
+        self.latency = {tier: LatencyTracker() for tier in self.tiers}
+
+    def route(
+        self,
+        question: str,
+        user_role: Optional[str] = None,
+        context_docs: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Classify the request.
+
+        Returns:
+            dict with 'tier', 'model', 'max_tokens' and the 'reason' for the decision
+        """
+        if not settings.LLM_ROUTING_ENABLED:
+            return self._decision(TIER_STANDARD, "routing disabled")
+
+        tokens = count_tokens(question)
+        confidence = self.retrieval_confidence(context_docs)
+        is_data_role = (user_role or "").upper() in STAFF_ROLES
+
+        if GREETING_PATTERN.match(question) and tokens <= 12:
+            tier, reason = TIER_FAST, "greeting"
+        elif ANALYSIS_PATTERN.search(question) and is_data_role:
+            tier, reason = TIER_COMPLEX, "analysis over institution data"
+        elif is_data_role and tokens > 60:
+            tier, reason = TIER_COMPLEX, "long admin question"
+        elif (
+            FAQ_PATTERN.search(question)
+            and tokens <= 40
+            and confidence >= settings.LLM_ROUTING_MIN_RETRIEVAL_CONFIDENCE
+        ):
+            tier, reason = TIER_FAST, f"faq with retrieval confidence {confidence:.2f}"
+        else:
+            tier, reason = TIER_STANDARD, "default"
+
+        decision = self._decision(tier, reason)
+        self.decisions[tier] = self.decisions.get(tier, 0) + 1
+        logger.info(
+            f"Model route: tier={tier} model={decision['model']} max_tokens={decision['max_tokens']} "
+            f"reason='{reason}' tokens={tokens} role={user_role or 'public'}"
+        )
+        return decision
+
+    def retrieval_confidence(self, context_docs: Optional[List[Dict]]) -> float:
+        """How well the best knowledge-base match covers the question (0..1)."""
+        if not context_docs:
+            return 0.0
+        best = min(doc.get("distance", 1.0) for doc in context_docs)
+        return 1.0 - best
+
+    def record_latency(self, tier: str, seconds: float):
+        if tier in self.latency:
+            self.latency[tier].record(seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "decisions": self.decisions,
+            "latency": {tier: tracker.stats() for tier, tracker in self.latency.items()}
+        }
+
+    def _decision(self, tier: str, reason: str) -> Dict:
+        config = self.tiers.get(tier) or self.tiers[TIER_STANDARD]
+        return {
+            "tier": tier,
+            "model": config.get("model") or settings.GROQ_MODEL,
+            "max_tokens": config.get("max_tokens", 1024),
+            "reason": reason
+        }
+
+
+# Singleton instance
+model_router = ModelRouter()
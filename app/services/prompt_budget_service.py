@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional
+from app.core.config import settings
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# Words and individual punctuation marks, roughly how BPE tokenizers split text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+TRUNCATION_MARKER = "[...truncated to fit the prompt budget]"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """
+    Approximate the number of LLM tokens in a piece of text.
+    Local approximation (no tokenizer download): punctuation counts as one token
+    and words as one token per ~4 characters.
+    """
+    if not text:
+        return 0
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+class PromptBudgetService:
+    """
+    Packs chat prompts into a fixed token budget.
+
+    The system instructions and the current question are always kept. The remaining
+    budget is split between user data, the running conversation summary, retrieved
+    chunks and recent history (in that priority order) and each section is trimmed
+    to its allocation.
+    """
+
+    SECTIONS = ["user_data", "summary", "context", "history"]
+
+    def __init__(self, max_tokens: int = None):
+        self.max_tokens = max_tokens or settings.PROMPT_MAX_TOKENS
+        self.message_overhead = settings.PROMPT_MESSAGE_OVERHEAD_TOKENS
+
+    def pack(
+        self,
+        instructions: str,
+        question: str,
+        user_data: str = "",
+        summary: str = "",
+        context_docs: Optional[List[str]] = None,
+        history: Optional[List[Dict[str, str]]] = None,
+        max_tokens: Optional[int] = None,
+        label: str = "chat"
+    ) -> Dict:
+        """
+        Fit the prompt sections into the token budget.
+
+        Returns:
+            dict with trimmed 'user_data', 'summary', 'context_docs', 'history' and a token 'breakdown'
+        """
+        context_docs = context_docs or []
+        history = history or []
+        budget = max_tokens or self.max_tokens
+
+        # System message + current question are mandatory
+        fixed_tokens = (
+            count_tokens(instructions) + count_tokens(question) + 2 * self.message_overhead
+        )
+        available = max(0, budget - fixed_tokens)
+
+        needs = {
+            "user_data": count_tokens(user_data),
+            "summary": count_tokens(summary),
+            "context": sum(count_tokens(doc) for doc in context_docs),
+            "history": sum(count_tokens(msg["content"]) + self.message_overhead for msg in history)
+        }
+        allocation = self._allocate(needs, available)
+
+        packed_user_data = self._fit_text(user_data, allocation["user_data"])
+        packed_summary = summary
+        if needs["summary"] > allocation["summary"]:
+            packed_summary = self.truncate(summary, allocation["summary"])
+        packed_context = self._fit_chunks(context_docs, allocation["context"])
+        packed_history = self._fit_history(history, allocation["history"])
+
+        breakdown = {
+            "instructions": count_tokens(instructions),
+            "question": count_tokens(question),
+            "user_data": count_tokens(packed_user_data),
+            "summary": count_tokens(packed_summary),
+            "context": sum(count_tokens(doc) for doc in packed_context),
+            "history": sum(count_tokens(msg["content"]) + self.message_overhead for msg in packed_history),
+        }
+        breakdown["total"] = sum(breakdown.values()) + 2 * self.message_overhead
+        breakdown["budget"] = budget
+
+        logger.info(
+            f"Prompt budget [{label}]: total={breakdown['total']}/{budget} "
+            f"instructions={breakdown['instructions']} question={breakdown['question']} "
+            f"user_data={breakdown['user_data']}/{needs['user_data']} "
+            f"summary={breakdown['summary']}/{needs['summary']} "
+            f"context={breakdown['context']}/{needs['context']} ({len(packed_context)}/{len(context_docs)} docs) "
+            f"history={breakdown['history']}/{needs['history']} ({len(packed_history)}/{len(history)} msgs)"
+        )
+
+        return {
+            "user_data": packed_user_data,
+            "summary": packed_summary,
+            "context_docs": packed_context,
+            "history": packed_history,
+            "breakdown": breakdown
+        }
+
+    def _allocate(self, needs: Dict[str, int], available: int) -> Dict[str, int]:
+        """Split the available tokens by share, then hand leftovers out by priority."""
+        shares = settings.PROMPT_BUDGET_SHARES
+        allocation = {
+            section: min(needs[section], int(available * shares.get(section, 0)))
+            for section in self.SECTIONS
+        }
+
+        leftover = available - sum(allocation.values())
+        for section in self.SECTIONS:
+            if leftover <= 0:
+                break
+            extra = min(leftover, needs[section] - allocation[section])
+            allocation[section] += extra
+            leftover -= extra
+
+        return allocation
+
+    def _fit_text(self, text: str, budget: int) -> str:
+        """Keep whole lines from the top until the budget is used, then note what was dropped."""
+        if count_tokens(text) <= budget:
+            return text
+
+        lines = text.split("\n")
+        marker_tokens = count_tokens(TRUNCATION_MARKER) + 8
+        kept = []
+        used = 0
+        for line in lines:
+            line_tokens = count_tokens(line) + 1
+            if used + line_tokens > budget - marker_tokens:
+                break
+            kept.append(line)
+            used += line_tokens
+
+        if not kept:
+            # Not even one line fits: hard cut by approximate character count
+            return self.truncate(text, budget)
+
+        omitted = len(lines) - len(kept)
+        kept.append(f"...{omitted} more lines omitted {TRUNCATION_MARKER}")
+        return "\n".join(kept)
+
+    def _fit_chunks(self, chunks: List[str], budget: int) -> List[str]:
+        """Keep retrieved chunks in rank order; the last one may be cut short."""
+        packed = []
+        used = 0
+        for chunk in chunks:
+            chunk_tokens = count_tokens(chunk)
+            if used + chunk_tokens <= budget:
+                packed.append(chunk)
+                used += chunk_tokens
+                continue
+
+            remaining = budget - used
+            # A tiny fragment of a chunk is more noise than context
+            if remaining >= 50:
+                packed.append(self.truncate(chunk, remaining))
+            break
+
+        return packed
+
+    def _fit_history(self, history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        """Keep the most recent messages that fit, preserving chronological order."""
+        packed = []
+        used = 0
+        for msg in reversed(history):
+            msg_tokens = count_tokens(msg["content"]) + self.message_overhead
+            if used + msg_tokens <= budget:
+                packed.append(msg)
+                used += msg_tokens
+                continue
+
+            remaining = budget - used - self.message_overhead
+            if not packed and remaining >= 50:
+                # Always try to keep at least part of the latest turn
+                packed.append({**msg, "content": self.truncate(msg["content"], remaining)})
+            break
+
+        return list(reversed(packed))
+
+    def truncate(self, text: str, budget: int) -> str:
+        """Cut text down to roughly `budget` tokens."""
+        budget = max(0, budget - count_tokens(TRUNCATION_MARKER) - 1)
+        words = text.split(" ")
+        kept = []
+        used = 0
+        for word in words:
+            word_tokens = count_tokens(word)
+            if used + word_tokens > budget:
+                break
+            kept.append(word)
+            used += word_tokens
+        return " ".join(kept) + f" {TRUNCATION_MARKER}"
+
+
+# Singleton instance
+prompt_budget_service = PromptBudgetService()
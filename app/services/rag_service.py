@@ -129,11 +129,14 @@ class RAGService:
         
         # Format results as list of dicts
         context_docs = []
-        for i, (doc, meta) in enumerate(zip(results["documents"][0], results["metadatas"][0])):
+        for i, (doc, meta, distance) in enumerate(zip(
+            results["documents"][0], results["metadatas"][0], results["distances"][0]
+        )):
             context_docs.append({
                 "text": doc,
                 "source": meta.get("source", f"Document {i+1}"),
-                "metadata": meta
+                "metadata": meta,
+                "distance": distance
             })
         
         return context_docs
@@ -1,4 +1,8 @@
 from app.models.mongo_models import Certificate, StudentData, User
+from app.core.config import INSTITUTION_ROLES, MOE_ROLE, settings
+from app.core.mongodb import get_database
+from app.services.institution_stats_service import institution_stats_service
+from bson import ObjectId
 from typing import Dict, List, Optional
 import logging
 
@@ -10,53 +14,53 @@ class StudentDataService:
     
     @staticmethod
     async def get_student_certificates(user_email: str, user_role: str = "USER", organization_id: str = None) -> List[Dict]:
-        """Get certificates based on user role."""
+        """Get certificates based on user role (an empty list if the query fails)."""
         try:
-            # Query MongoDB certificates collection directly using Motor
-            from motor.motor_asyncio import AsyncIOMotorClient
-            from app.core.config import settings
-            from bson import ObjectId
-            
-            client = AsyncIOMotorClient(settings.MONGODB_URL)
-            db = client[settings.MONGODB_DB_NAME]
-            
-            # Build query based on role
-            if user_role == "MOE":
-                # MOE: Get ALL certificates across all institutions
-                query = {}
-                limit = 10000
-            elif user_role in ["ADMIN", "INSTITUTION"] and organization_id:
-                # Admin/Institution: Get all certificates from their institution
-                query = {"institutionId": ObjectId(organization_id)}
-                limit = 1000
-            else:
-                # Student: Get only their own certificates
-                query = {"student.email": user_email}
-                limit = 100
-            
-            certificates_cursor = db.certificates.find(query)
-            certificates = await certificates_cursor.to_list(length=limit)
-            
-            client.close()
-            
-            return [
-                {
-                    "certificate_id": cert.get("certificateId"),
-                    "name": cert.get("student", {}).get("fullName"),
-                    "course": cert.get("student", {}).get("course"),
-                    "issue_date": cert.get("issuedAt").strftime("%Y-%m-%d") if cert.get("issuedAt") else "N/A",
-                    "grade": cert.get("student", {}).get("cgpa"),
-                    "status": cert.get("status"),
-                    "pdf_url": cert.get("pdfUrl"),
-                    "department": cert.get("student", {}).get("department"),
-                    "roll_number": cert.get("student", {}).get("rollNumber"),
-                    "student_email": cert.get("student", {}).get("email")
-                }
-                for cert in certificates
-            ]
+            return await StudentDataService.find_certificates(user_email, user_role, organization_id)
         except Exception as e:
             logger.error(f"Error fetching certificates: {e}")
             return []
+
+    @staticmethod
+    async def find_certificates(user_email: str, user_role: str = "USER", organization_id: str = None) -> List[Dict]:
+        """Certificates visible to a role; database errors and timeouts are raised."""
+        # Query MongoDB certificates collection directly on the shared pooled client
+        db = get_database()
+
+        # Build query based on role
+        if user_role == MOE_ROLE:
+            # MOE: Get ALL certificates across all institutions
+            query = {}
+            limit = 10000
+        elif user_role in INSTITUTION_ROLES and organization_id:
+            # Admin/Institution: Get all certificates from their institution
+            query = {"institutionId": ObjectId(organization_id)}
+            limit = 1000
+        else:
+            # Student: Get only their own certificates
+            query = {"student.email": user_email}
+            limit = 100
+
+        certificates_cursor = db.certificates.find(query).limit(limit).max_time_ms(
+            settings.MONGODB_OPERATION_TIMEOUT_MS
+        )
+        certificates = await certificates_cursor.to_list(length=limit)
+
+        return [
+            {
+                "certificate_id": cert.get("certificateId"),
+                "name": cert.get("student", {}).get("fullName"),
+                "course": cert.get("student", {}).get("course"),
+                "issue_date": cert.get("issuedAt").strftime("%Y-%m-%d") if cert.get("issuedAt") else "N/A",
+                "grade": cert.get("student", {}).get("cgpa"),
+                "status": cert.get("status"),
+                "pdf_url": cert.get("pdfUrl"),
+                "department": cert.get("student", {}).get("department"),
+                "roll_number": cert.get("student", {}).get("rollNumber"),
+                "student_email": cert.get("student", {}).get("email")
+            }
+            for cert in certificates
+        ]
     
     @staticmethod
     async def get_student_data(student_id: str) -> Optional[Dict]:
@@ -78,66 +82,161 @@ class StudentDataService:
             logger.error(f"Error fetching student data: {e}")
             return None
     
+    @staticmethod
+    async def get_certificate_overview(
+        user_email: str,
+        user_role: str = "USER",
+        organization_id: str = None,
+        recent_limit: int = 10
+    ) -> Dict:
+        """
+        Count, status/course breakdown and most recent certificates for a role.
+
+        MOE and institution admins read the counts from the `institution_stats` view and
+        fetch only the `recent_limit` newest certificates. Everyone else (and admins before
+        the view exists) gets a single `$facet` aggregation. Either way only the certificates
+        shown leave the database.
+        """
+        db = get_database()
+        projection = {
+            "_id": 0, "certificateId": 1, "status": 1, "issuedAt": 1,
+            "student.fullName": 1, "student.email": 1, "student.course": 1
+        }
+        if user_role == MOE_ROLE:
+            query = {}
+            stats = await institution_stats_service.get_system_totals()
+        elif user_role in INSTITUTION_ROLES and organization_id:
+            query = {"institutionId": ObjectId(organization_id)}
+            stats = await institution_stats_service.get(organization_id)
+        else:
+            query = {"student.email": user_email}
+            stats = None
+
+        if stats:
+            total = stats.get("total", 0)
+            status_counts = stats.get("by_status") or {}
+            course_counts = stats.get("by_course") or {}
+            recent_docs = await db.certificates.find(query, projection).sort("issuedAt", -1).limit(
+                recent_limit
+            ).max_time_ms(settings.MONGODB_OPERATION_TIMEOUT_MS).to_list(length=recent_limit)
+        else:
+            pipeline = [
+                {"$match": query},
+                # Narrow documents before $facet so the facet sub-pipelines handle small records
+                {"$project": projection},
+                {"$facet": {
+                    "total": [{"$count": "n"}],
+                    "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                    "by_course": [{"$group": {"_id": "$student.course", "count": {"$sum": 1}}}],
+                    "recent": [{"$sort": {"issuedAt": -1}}, {"$limit": recent_limit}]
+                }}
+            ]
+            result = await db.certificates.aggregate(
+                pipeline, maxTimeMS=settings.MONGODB_OPERATION_TIMEOUT_MS
+            ).to_list(length=1)
+            facets = result[0] if result else {}
+            total = facets["total"][0]["n"] if facets.get("total") else 0
+            status_counts = {(row["_id"] or "unknown"): row["count"] for row in facets.get("by_status", [])}
+            course_counts = {(row["_id"] or "unknown"): row["count"] for row in facets.get("by_course", [])}
+            recent_docs = facets.get("recent", [])
+
+        by_status = dict(sorted(status_counts.items(), key=lambda item: -item[1]))
+        by_course = dict(sorted(course_counts.items(), key=lambda item: -item[1]))
+        recent = [
+            {
+                "certificate_id": cert.get("certificateId"),
+                "name": cert.get("student", {}).get("fullName"),
+                "course": cert.get("student", {}).get("course"),
+                "issue_date": cert.get("issuedAt").strftime("%Y-%m-%d") if cert.get("issuedAt") else "N/A",
+                "status": cert.get("status"),
+                "student_email": cert.get("student", {}).get("email")
+            }
+            for cert in recent_docs
+        ]
+        return {"total": total, "by_status": by_status, "by_course": by_course, "recent": recent}
+
     @staticmethod
     async def get_student_summary(user_email: str, user_name: str, user_role: str = "USER", organization_id: str = None) -> str:
         """Get a formatted summary based on user role."""
         try:
-            # Get certificates based on role
-            certificates = await StudentDataService.get_student_certificates(
-                user_email, user_role, organization_id
-            )
-            cert_count = len(certificates)
-            
-            # Get student data (optional - for future use)
-            student_data = None  # Not using student_id anymore
+            return await StudentDataService.build_student_summary(user_email, user_name, user_role, organization_id)
+        except Exception as e:
+            logger.error(f"Error creating student summary: {e}")
+            return f"Error retrieving data for {user_name}"
+    
+    @staticmethod
+    async def build_student_summary(user_email: str, user_name: str, user_role: str = "USER", organization_id: str = None) -> str:
+        """Render the role-based summary; raises on database errors so callers can avoid caching them."""
+        # Count, status breakdown and the certificates shown, aggregated server-side
+        if user_role == MOE_ROLE:
+            shown = 15
+        elif user_role in INSTITUTION_ROLES:
+            shown = 10
+        else:
+            shown = 100
+        overview = await StudentDataService.get_certificate_overview(
+            user_email, user_role, organization_id, recent_limit=shown
+        )
+        certificates = overview["recent"]
+        cert_count = overview["total"]
+        status_line = ", ".join(f"{status}: {count}" for status, count in overview["by_status"].items())
+        course_line = ", ".join(f"{course}: {count}" for course, count in list(overview["by_course"].items())[:5])
+        
+        # Get student data (optional - for future use)
+        student_data = None  # Not using student_id anymore
+        
+        # Format summary based on role
+        if user_role == MOE_ROLE:
+            summary = f"Ministry of Education - System Overview for {user_name}:\n\n"
+            summary += f"Role: Ministry of Education (MOE)\n"
+            summary += f"Total Certificates in System: {cert_count}\n"
+            if status_line:
+                summary += f"By Status: {status_line}\n"
+            if course_line:
+                summary += f"Top Courses: {course_line}\n"
             
-            # Format summary based on role
-            if user_role == "MOE":
-                summary = f"Ministry of Education - System Overview for {user_name}:\n\n"
-                summary += f"Role: Ministry of Education (MOE)\n"
-                summary += f"Total Certificates in System: {cert_count}\n"
-                
-                if certificates:
-                    summary += "\nRecent Certificates (showing up to 15):\n"
-                    for i, cert in enumerate(certificates[:15], 1):
-                        summary += f"{i}. {cert['name']} ({cert.get('student_email', 'N/A')}) - {cert['course']} "
-                        summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
-                    
-                    if cert_count > 15:
-                        summary += f"\n...and {cert_count - 15} more certificates across all institutions.\n"
-            elif user_role in ["ADMIN", "INSTITUTION"]:
-                summary = f"Institution Admin Profile for {user_name}:\n\n"
-                summary += f"Role: {user_role}\n"
-                summary += f"Total Certificates Issued: {cert_count}\n"
+            if certificates:
+                summary += f"\nMost Recent Certificates (showing {len(certificates)}):\n"
+                for i, cert in enumerate(certificates, 1):
+                    summary += f"{i}. {cert['name']} ({cert.get('student_email', 'N/A')}) - {cert['course']} "
+                    summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
                 
-                if certificates:
-                    summary += "\nRecent Certificates (showing up to 10):\n"
-                    for i, cert in enumerate(certificates[:10], 1):
-                        summary += f"{i}. {cert['name']} ({cert.get('student_email', 'N/A')}) - {cert['course']} "
-                        summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
-                    
-                    if cert_count > 10:
-                        summary += f"\n...and {cert_count - 10} more certificates.\n"
-            else:
-                # Student profile
-                summary = f"Student Profile for {user_name}:\n\n"
-                
-                if student_data:
-                    summary += f"Enrollment Number: {student_data['enrollment_number']}\n"
-                    summary += f"Department: {student_data.get('department', 'N/A')}\n"
-                    summary += f"Current Semester: {student_data.get('current_semester', 'N/A')}\n"
-                    summary += f"Total Credits: {student_data.get('total_credits', 0)}\n"
-                    summary += f"Courses Enrolled: {len(student_data.get('courses_enrolled', []))}\n"
-                
-                summary += f"\nCertificates Issued: {cert_count}\n"
+                if cert_count > len(certificates):
+                    summary += f"\n...and {cert_count - len(certificates)} more certificates across all institutions.\n"
+        elif user_role in INSTITUTION_ROLES:
+            summary = f"Institution Admin Profile for {user_name}:\n\n"
+            summary += f"Role: {user_role}\n"
+            summary += f"Total Certificates Issued: {cert_count}\n"
+            if status_line:
+                summary += f"By Status: {status_line}\n"
+            if course_line:
+                summary += f"Top Courses: {course_line}\n"
+            
+            if certificates:
+                summary += f"\nMost Recent Certificates (showing {len(certificates)}):\n"
+                for i, cert in enumerate(certificates, 1):
+                    summary += f"{i}. {cert['name']} ({cert.get('student_email', 'N/A')}) - {cert['course']} "
+                    summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
                 
-                if certificates:
-                    summary += "\nCertificate Details:\n"
-                    for i, cert in enumerate(certificates, 1):
-                        summary += f"{i}. {cert['name']} - {cert['course']} "
-                        summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
+                if cert_count > len(certificates):
+                    summary += f"\n...and {cert_count - len(certificates)} more certificates.\n"
+        else:
+            # Student profile
+            summary = f"Student Profile for {user_name}:\n\n"
             
-            return summary
-        except Exception as e:
-            logger.error(f"Error creating student summary: {e}")
-            return f"Error retrieving data for {user_name}"
+            if student_data:
+                summary += f"Enrollment Number: {student_data['enrollment_number']}\n"
+                summary += f"Department: {student_data.get('department', 'N/A')}\n"
+                summary += f"Current Semester: {student_data.get('current_semester', 'N/A')}\n"
+                summary += f"Total Credits: {student_data.get('total_credits', 0)}\n"
+                summary += f"Courses Enrolled: {len(student_data.get('courses_enrolled', []))}\n"
+            
+            summary += f"\nCertificates Issued: {cert_count}\n"
+            
+            if certificates:
+                summary += "\nCertificate Details:\n"
+                for i, cert in enumerate(certificates, 1):
+                    summary += f"{i}. {cert['name']} - {cert['course']} "
+                    summary += f"(Issued: {cert['issue_date']}, Status: {cert['status']})\n"
+        
+        return summary
@@ -0,0 +1,131 @@
+from typing import Dict, Optional, Tuple
+from app.core.config import INSTITUTION_ROLES, MOE_ROLE, settings
+from app.services.student_service import StudentDataService
+from collections import OrderedDict
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class StudentSummaryCache:
+    """
+    Rendered student summaries cached per (user, role, organization).
+
+    Entries expire after STUDENT_SUMMARY_CACHE_TTL_SECONDS and are dropped earlier when
+    the certificate watcher reports a change that affects them. Concurrent misses for
+    the same key share one rebuild, so a burst of messages runs one aggregation.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.STUDENT_SUMMARY_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.STUDENT_SUMMARY_CACHE_MAX_ENTRIES
+        # key -> (expires_at, user_name, summary)
+        self._entries: "OrderedDict[Tuple, Tuple[float, str, str]]" = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Task] = {}
+        # Bumped on every invalidation so builds that started earlier are not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def _key(self, user_email: str, user_role: str, organization_id: Optional[str]) -> Tuple:
+        return (user_email.lower(), user_role, str(organization_id) if organization_id else None)
+
+    async def get_summary(
+        self,
+        user_email: str,
+        user_name: str,
+        user_role: str = "USER",
+        organization_id: str = None
+    ) -> str:
+        key = self._key(user_email, user_role, organization_id)
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic() and entry[1] == user_name:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        # The build runs as its own task: if the request that started it is cancelled
+        # (client disconnect), requests sharing it still get their summary
+        task = asyncio.create_task(
+            self._build(key, self._generation, user_email, user_name, user_role, organization_id)
+        )
+        self._in_flight[key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(key, None) if self._in_flight.get(key) is task else None)
+        return await asyncio.shield(task)
+
+    async def _build(
+        self,
+        key: Tuple,
+        generation: int,
+        user_email: str,
+        user_name: str,
+        user_role: str,
+        organization_id: Optional[str]
+    ) -> str:
+        try:
+            summary = await StudentDataService.build_student_summary(
+                user_email, user_name, user_role, organization_id
+            )
+        except Exception as e:
+            logger.error(f"Error creating student summary: {e}")
+            # Not cached, so the next message retries
+            return f"Error retrieving data for {user_name}"
+        if generation == self._generation:
+            self._store(key, user_name, summary)
+        return summary
+
+    def _store(self, key: Tuple, user_name: str, summary: str):
+        self._entries[key] = (time.monotonic() + self.ttl, user_name, summary)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_all(self):
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def on_certificate_change(self, change: Dict):
+        """Certificate watcher subscriber: drop summaries that include the changed certificate."""
+        certificate = change.get("certificate")
+        if not certificate:
+            # Deletions without the document: any summary may be affected
+            self.invalidate_all()
+            return
+
+        self._generation += 1
+        student_email = ((certificate.get("student") or {}).get("email") or "").lower()
+        institution_id = str(certificate.get("institutionId") or "")
+        stale = [
+            key for key in self._entries
+            if key[1] == MOE_ROLE
+            or (key[1] in INSTITUTION_ROLES and key[2] == institution_id)
+            or key[0] == student_email
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None
+        }
+
+
+# Singleton instance
+student_summary_cache = StudentSummaryCache()
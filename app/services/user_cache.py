@@ -0,0 +1,97 @@
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.models.mongo_models import User
+from beanie import PydanticObjectId
+from collections import OrderedDict
+import time
+
+
+class UserCache:
+    """
+    Authenticated users cached per user id, plus a cache of decoded access tokens.
+
+    A user sending several messages in a row is loaded from MongoDB once per
+    USER_CACHE_TTL_SECONDS, and their token is verified once (until it expires) instead
+    of on every request. Profile changes made through the API call `invalidate()`;
+    changes made elsewhere, or on another worker, show up once the TTL runs out.
+
+    Callers get their own copy of the cached user, so mutating it never leaks into
+    other requests.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.USER_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.USER_CACHE_MAX_ENTRIES
+        # user id -> (expires_at, user)
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()
+        # token -> (expires_at, payload)
+        self._tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped on every invalidation so loads that started earlier are not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.token_hits = 0
+        self.token_misses = 0
+        self.invalidations = 0
+
+    def decode_token(self, token: str) -> Dict:
+        """decode_access_token with the result cached until the token's own expiry."""
+        now = time.time()
+        entry = self._tokens.get(token)
+        if entry and entry[0] > now:
+            self._tokens.move_to_end(token)
+            self.token_hits += 1
+            return entry[1]
+
+        self.token_misses += 1
+        # Raises a 401 for invalid or expired tokens; those are never cached
+        payload = decode_access_token(token)
+        expires_at = payload.get("exp")
+        if isinstance(expires_at, (int, float)) and expires_at > now:
+            self._put(self._tokens, token, (expires_at, payload))
+        return payload
+
+    async def get_user(self, user_id: str) -> Optional[User]:
+        """The user with this id, or None if there is none (misses are not cached)."""
+        entry = self._users.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return entry[1].model_copy(deep=True)
+
+        self.misses += 1
+        generation = self._generation
+        user = await User.get(PydanticObjectId(user_id))
+        if user is not None and generation == self._generation:
+            self._put(self._users, user_id, (time.monotonic() + self.ttl, user.model_copy(deep=True)))
+        return user
+
+    def invalidate(self, user_id: str):
+        """Drop a user after their document changed."""
+        self._generation += 1
+        self.invalidations += 1
+        self._users.pop(str(user_id), None)
+
+    def _put(self, entries: OrderedDict, key: str, value: tuple):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        token_lookups = self.token_hits + self.token_misses
+        return {
+            "users": len(self._users),
+            "tokens": len(self._tokens),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "token_hit_rate": round(self.token_hits / token_lookups, 3) if token_lookups else None,
+            "invalidations": self.invalidations
+        }
+
+
+# Singleton instance
+user_cache = UserCache()
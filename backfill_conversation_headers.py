@@ -0,0 +1,63 @@
+"""
+Backfill `message_count` and `preview` on conversation headers written before they
+were maintained, so conversation listings never need the embedded messages.
+
+New turns keep both fields current; listings fall back to the embedded messages for
+headers this has not reached yet, so it can run at any time and be re-run safely.
+
+Usage:
+    python backfill_conversation_headers.py
+"""
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+BATCH_SIZE = 500
+
+
+async def backfill():
+    from app.core.config import settings
+    from app.services.conversation_store import PREVIEW_CHARS
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    started = time.perf_counter()
+    pending = {"$or": [{"message_count": {"$exists": False}}, {"preview": {"$exists": False}}]}
+    headers = db.conversations.aggregate([
+        {"$match": pending},
+        {"$project": {
+            "message_count": {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]},
+            "preview": {"$ifNull": [
+                "$preview",
+                {"$substrCP": [{"$ifNull": [{"$arrayElemAt": ["$messages.content", 0]}, ""]}, 0, PREVIEW_CHARS]}
+            ]}
+        }}
+    ])
+
+    updated = 0
+    batch = []
+    async for header in headers:
+        batch.append(UpdateOne(
+            {"_id": header["_id"]},
+            # $ifNull: a turn appended meanwhile has already set the current values
+            [{"$set": {
+                "message_count": {"$ifNull": ["$message_count", header["message_count"]]},
+                "preview": {"$ifNull": ["$preview", {"$literal": header["preview"]}]}
+            }}]
+        ))
+        if len(batch) >= BATCH_SIZE:
+            updated += (await db.conversations.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.conversations.bulk_write(batch, ordered=False)).modified_count
+
+    elapsed = time.perf_counter() - started
+    print(f"Backfilled {updated} conversation header(s) in {elapsed:.1f}s")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
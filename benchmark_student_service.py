@@ -0,0 +1,70 @@
+"""
+Benchmark: per-call MongoDB client vs the shared pooled client for the
+certificate query run on every chat turn (StudentDataService.get_student_certificates).
+
+Usage:
+    python benchmark_student_service.py [student_email] [iterations]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+async def query_with_new_client(mongodb_url, db_name, email):
+    """Old behaviour: connect, query, close on every call."""
+    client = AsyncIOMotorClient(mongodb_url)
+    try:
+        await client[db_name].certificates.find({"student.email": email}).to_list(length=100)
+    finally:
+        client.close()
+
+
+async def query_with_pooled_client(client, db_name, email):
+    """New behaviour: reuse the application-wide pooled client."""
+    await client[db_name].certificates.find({"student.email": email}).limit(100).to_list(length=100)
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(f"{label:<22} mean={statistics.mean(timings):8.1f} ms  p50={statistics.median(timings):8.1f} ms  p95={p95:8.1f} ms")
+
+
+async def benchmark():
+    import os
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    mongodb_url = os.getenv('MONGODB_URL', 'mongodb://localhost:27017')
+    db_name = os.getenv('MONGODB_DB_NAME', 'SatyaSetu')
+    email = sys.argv[1] if len(sys.argv) > 1 else "student@example.com"
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("=" * 80)
+    print(f"Per-turn certificate query latency ({iterations} iterations, {email})")
+    print("=" * 80)
+
+    per_call = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await query_with_new_client(mongodb_url, db_name, email)
+        per_call.append((time.perf_counter() - started) * 1000)
+
+    pooled_client = AsyncIOMotorClient(mongodb_url, maxPoolSize=50, minPoolSize=2)
+    await pooled_client.admin.command('ping')  # Warm-up, as done once at app startup
+    pooled = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await query_with_pooled_client(pooled_client, db_name, email)
+        pooled.append((time.perf_counter() - started) * 1000)
+    pooled_client.close()
+
+    report("New client per call", per_call)
+    report("Shared pooled client", pooled)
+    print(f"\nSaved per chat turn: {statistics.mean(per_call) - statistics.mean(pooled):.1f} ms (mean)")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -0,0 +1,72 @@
+"""
+Check that every known query shape is served by an index.
+
+Ensures the registered indexes exist (pass --no-create to only inspect), then runs
+explain() on each shape in app.core.indexes.QUERY_SHAPES and flags collection scans.
+Exits with status 1 if any query would scan a collection, or if its plan shows no
+index stage the check recognises.
+
+Usage:
+    python check_indexes.py [--no-create]
+"""
+import asyncio
+import sys
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+async def sample_values(db):
+    """Real values for the placeholders in QUERY_SHAPES, so plans reflect actual data."""
+    institution = await db.institutions.find_one({}, {"_id": 1})
+    conversation = await db.conversations.find_one({}, {"user_id": 1})
+    return {
+        "<institution_id>": institution["_id"] if institution else None,
+        "<user_id>": conversation.get("user_id") if conversation else None,
+        "<datetime>": datetime.utcnow(),
+    }
+
+
+def fill(value, samples):
+    if isinstance(value, dict):
+        return {key: fill(item, samples) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, samples) for item in value]
+    if isinstance(value, str) and value in samples:
+        return samples[value]
+    return value
+
+
+async def check_indexes():
+    from app.core.config import settings
+    from app.core.indexes import QUERY_SHAPES, ensure_indexes, plan_status
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+
+    if "--no-create" not in sys.argv:
+        created = await ensure_indexes(db)
+        print(f"Indexes created: {created or 'none (all present)'}")
+
+    samples = await sample_values(db)
+    collection_scans = 0
+    print("=" * 80)
+    for collection, query, sort in QUERY_SHAPES:
+        query = fill(query, samples)
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = (await cursor.explain())["queryPlanner"]["winningPlan"]
+        status = plan_status(plan)
+        collection_scans += status != "ok"
+        print(f"{status:<9} {collection}.find({query}){f'.sort({sort})' if sort else ''}")
+    print("=" * 80)
+
+    client.close()
+    if collection_scans:
+        print(f"{collection_scans} query shape(s) scan a whole collection or have an unrecognised plan")
+        sys.exit(1)
+    print("All query shapes use an index")
+
+
+if __name__ == "__main__":
+    asyncio.run(check_indexes())
@@ -0,0 +1,37 @@
+"""
+Rebuild the institution_stats materialized view from the certificates collection.
+
+The API keeps institution_stats current from certificate change events; run this after
+bulk imports, restores or direct database edits.
+
+Usage:
+    python rebuild_institution_stats.py [institution_id]
+"""
+import asyncio
+import sys
+import time
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+
+async def rebuild():
+    from app.core.config import settings
+    from app.services.institution_stats_service import institution_stats_service
+
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.MONGODB_DB_NAME]
+    institution_id = ObjectId(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    started = time.perf_counter()
+    written = await institution_stats_service.rebuild(db, institution_id)
+    elapsed = time.perf_counter() - started
+    print(f"Rebuilt stats for {written} institution(s) in {elapsed:.1f}s")
+
+    async for stats in db.institution_stats.find({} if institution_id is None else {"_id": institution_id}).limit(10):
+        print(f"  {stats['_id']}: {stats['total']} certificates, by status {stats.get('by_status')}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,142 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+pytest.importorskip("app.models.mongo_models")
+
+from app.api import universities  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+INSTITUTION_ID = ObjectId()
+ISSUER_ID = ObjectId()
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+def certificate(number, **student):
+    return {
+        "_id": ObjectId(),
+        "certificateId": f"SATYA-2025-{number:016X}",
+        "student": {"fullName": f"Student {number}", "course": "B.Tech", **student},
+        "issuedAt": datetime(2025, 6, number),
+        "status": "ISSUED",
+        "issuerId": ISSUER_ID,
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    certificates = [
+        certificate(3, fullName='Rao, "Ravi" K.'),
+        certificate(2, course="M.Sc, Physics"),
+        certificate(1),
+    ]
+
+    async def find_institution(query, projection=None):
+        return {"_id": query["_id"]} if query["_id"] == INSTITUTION_ID else None
+
+    db = SimpleNamespace(
+        institutions=SimpleNamespace(find_one=find_institution),
+        certificates=SimpleNamespace(find=lambda query, projection=None: FakeCursor(
+            [doc for doc in certificates if query["institutionId"] == INSTITUTION_ID]
+        )),
+        users=SimpleNamespace(find=lambda query, projection=None: FakeCursor(
+            [{"_id": ISSUER_ID, "name": "Registrar", "email": "registrar@example.edu"}]
+        )),
+    )
+    monkeypatch.setattr(universities, "get_database", lambda: db)
+    monkeypatch.setattr(universities, "_issuer_cache", {})
+    # Several batches, so rows from every batch must reach the stream
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+
+    app = FastAPI()
+    app.include_router(universities.router)
+    return TestClient(app)
+
+
+def export(client, **params):
+    headers = params.pop("headers", {"Accept-Encoding": "identity"})
+    return client.get(
+        f"/universities/institution/{INSTITUTION_ID}/certificates/export", params=params, headers=headers
+    )
+
+
+def test_ndjson_export_streams_every_certificate_newest_first(client):
+    response = export(client)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in response.headers
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["student_name"] for row in rows] == ['Rao, "Ravi" K.', "Student 2", "Student 1"]
+    assert rows[0]["issuer"]["email"] == "registrar@example.edu"
+    assert rows[0]["issue_date"] == "2025-06-03T00:00:00"
+
+
+def test_csv_export_escapes_commas_and_quotes(client):
+    response = export(client, format="csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="certificates-' in response.headers["content-disposition"]
+    assert '"Rao, ""Ravi"" K."' in response.text
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == universities.EXPORT_CSV_COLUMNS
+    assert [row["student_name"] for row in rows] == ['Rao, "Ravi" K.', "Student 2", "Student 1"]
+    assert rows[1]["course"] == "M.Sc, Physics"
+    assert rows[0]["issuer_name"] == "Registrar"
+
+
+def test_gzip_is_used_only_when_the_client_accepts_it(client):
+    compressed = export(client, format="csv", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    # The test client decodes Content-Encoding; the payload matches the plain export
+    plain = export(client, format="csv", gzip="true")
+    assert "content-encoding" not in plain.headers
+    assert compressed.text == plain.text
+    assert plain.text.startswith("certificate_id,")
+
+
+def test_gzip_stream_is_a_single_valid_gzip_member(client):
+    with client.stream(
+        "GET", f"/universities/institution/{INSTITUTION_ID}/certificates/export",
+        headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        raw = b"".join(response.iter_raw())
+    lines = gzip.decompress(raw).decode("utf-8").splitlines()
+    assert len(lines) == 3
+
+
+def test_gzip_can_be_turned_off(client):
+    response = export(client, gzip="false", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.parametrize("institution_id,status", [("not-an-id", 400), (str(ObjectId()), 404)])
+def test_unknown_institution(client, institution_id, status):
+    response = client.get(f"/universities/institution/{institution_id}/certificates/export")
+    assert response.status_code == status
+
+
+def test_unknown_format_is_rejected(client):
+    assert export(client, format="xml").status_code == 422
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.certificate_lookup_service import BloomFilter, CertificateLookupService
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    ids = [f"SATYA-2025-{n:016X}" for n in range(1000)]
+    for certificate_id in ids:
+        bloom.add(certificate_id)
+    assert all(certificate_id in bloom for certificate_id in ids)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(2000, 0.01)
+    for n in range(2000):
+        bloom.add(f"SATYA-2025-{n:016X}")
+    false_positives = sum(f"SATYA-2024-{n:016X}" in bloom for n in range(10000))
+    assert false_positives / 10000 < 0.03
+
+
+def test_extract_ids_normalizes_and_deduplicates():
+    service = CertificateLookupService()
+    text = "check satya-2025-cb60c98fb3e0a4c0 and SATYA-2025-CB60C98FB3E0A4C0, not SATYA-25-XYZ"
+    assert service.extract_ids(text) == ["SATYA-2025-CB60C98FB3E0A4C0"]
+
+
+class FakeCertificates:
+    """A certificates collection whose scan lets the test run code mid-refresh."""
+
+    def __init__(self, ids, during_scan):
+        self.ids = ids
+        self.during_scan = during_scan
+
+    async def estimated_document_count(self):
+        return len(self.ids)
+
+    def find(self, query, projection):
+        collection = self
+
+        class Cursor:
+            def batch_size(self, size):
+                return self
+
+            async def __aiter__(self):
+                for certificate_id in collection.ids:
+                    yield {"certificateId": certificate_id}
+                collection.during_scan()
+
+        return Cursor()
+
+
+def test_ids_added_during_refresh_are_kept(monkeypatch):
+    service = CertificateLookupService()
+    old_id, new_id = "SATYA-2025-0000000000000001", "SATYA-2025-0000000000000002"
+    certificates = FakeCertificates(
+        [old_id],
+        # Issued after the scan passed it, reported by the certificate watcher mid-refresh
+        lambda: service.on_certificate_change({"operation": "insert", "certificate": {"certificateId": new_id}})
+    )
+    monkeypatch.setattr(
+        "app.services.certificate_lookup_service.get_database",
+        lambda: SimpleNamespace(certificates=certificates)
+    )
+
+    asyncio.run(service.refresh())
+    assert service.might_exist(old_id)
+    assert service.might_exist(new_id)
+
+    # A second refresh over a filter that already exists keeps them too
+    newer_id = "SATYA-2025-0000000000000003"
+    certificates.during_scan = lambda: service.add(newer_id.lower())
+    asyncio.run(service.refresh())
+    assert service.might_exist(newer_id)
+    assert service._added_during_refresh is None
+
+
+def test_resync_refreshes_the_filter(monkeypatch):
+    service = CertificateLookupService()
+    missed_id = "SATYA-2025-0000000000000004"
+    certificates = FakeCertificates([], lambda: None)
+    monkeypatch.setattr(
+        "app.services.certificate_lookup_service.get_database",
+        lambda: SimpleNamespace(certificates=certificates)
+    )
+
+    async def scenario():
+        await service.refresh()
+        # Issued while the change stream was down; only a rescan can find it
+        certificates.ids.append(missed_id)
+        service.on_certificate_change({"operation": "resync", "certificate": None})
+        await asyncio.gather(*service._tasks)
+
+    asyncio.run(scenario())
+    assert service.might_exist(missed_id)
@@ -0,0 +1,109 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import app.services.certificate_watcher as watcher_module
+from app.services.certificate_watcher import CertificateWatcher
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for token, change in self.changes:
+            self.resume_token = token
+            yield change
+        # Stay open like a real stream until the watcher is stopped
+        await asyncio.Event().wait()
+
+
+class FakeCertificates:
+    """certificates.watch() that fails with the scripted errors, then streams `changes`."""
+
+    def __init__(self, errors, changes):
+        self.errors = list(errors)
+        self.changes = changes
+        self.resume_tokens = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resume_tokens.append(resume_after)
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeStream(self.changes)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    attempts = []
+
+    def backoff_delay(attempt, base, cap):
+        attempts.append(attempt)
+        return 0
+
+    monkeypatch.setattr(watcher_module, "backoff_delay", backoff_delay)
+    return attempts
+
+
+def run_watcher(monkeypatch, certificates, until):
+    monkeypatch.setattr(watcher_module, "get_database", lambda: SimpleNamespace(certificates=certificates))
+    watcher = CertificateWatcher()
+    watcher._resume_token = "stale-token"
+    received = []
+    watcher.subscribe(received.append)
+
+    async def scenario():
+        task = asyncio.create_task(watcher._run())
+        for _ in range(100):
+            if until(received):
+                break
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(scenario())
+    return watcher, received
+
+
+def test_lost_resume_point_restarts_and_resyncs_subscribers(monkeypatch, delays):
+    history_lost = OperationFailure("resume point may no longer be in the oplog", code=286)
+    certificates = FakeCertificates(
+        [history_lost, history_lost],
+        [("t1", {"operationType": "insert", "fullDocument": {"certificateId": "C1"}})]
+    )
+
+    watcher, received = run_watcher(monkeypatch, certificates, lambda events: len(events) == 3)
+
+    assert certificates.resume_tokens == ["stale-token", None, None]
+    # One full invalidation per lost resume point, then live events again
+    assert received == [
+        {"operation": "resync", "certificate": None},
+        {"operation": "resync", "certificate": None},
+        {"operation": "insert", "certificate": {"certificateId": "C1"}},
+    ]
+    assert watcher.resyncs == 2
+    assert watcher._resume_token == "t1"
+    # Backoff grows while the stream keeps failing and resets once it is open
+    assert delays == [0, 1]
+    assert watcher.failures == 0
+
+
+def test_transient_errors_resume_from_the_saved_token(monkeypatch, delays):
+    certificates = FakeCertificates(
+        [AutoReconnect("primary stepped down"), OperationFailure("interrupted", code=11601)],
+        [("t1", {"operationType": "update", "fullDocument": {"certificateId": "C1"}})]
+    )
+
+    watcher, received = run_watcher(monkeypatch, certificates, lambda events: len(events) >= 1)
+
+    assert certificates.resume_tokens == ["stale-token"] * 3
+    assert [event["operation"] for event in received] == ["update"]
+    assert watcher.resyncs == 0
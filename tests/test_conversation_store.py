@@ -0,0 +1,155 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+
+pytest.importorskip("app.models.mongo_models")
+
+from app.services import conversation_store as store_module  # noqa: E402
+from app.services.conversation_store import MESSAGES_PER_BUCKET, RECENT_TURNS, ConversationStore  # noqa: E402
+
+
+class FakeHeaders:
+    """Conversation headers keyed by _id; `lose_replies` applies an update then raises."""
+
+    def __init__(self):
+        self.docs = {}
+        self.lose_replies = 0
+
+    @staticmethod
+    def reserved(doc, turn_id):
+        return [turn for turn in doc.get("recent_turns", []) if turn["id"] == turn_id]
+
+    async def find_one_and_update(self, query, pipeline, projection=None, upsert=False, return_document=None):
+        turn_id = query["recent_turns.id"]["$ne"]
+        doc = self.docs.get(query["_id"])
+        if doc is not None and self.reserved(doc, turn_id):
+            if upsert:
+                raise DuplicateKeyError("duplicate key")
+            return None
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+
+        stage = pipeline[0]["$set"]
+        start = doc.get("message_count", 0)
+        recent_turns = stage["recent_turns"]["$slice"]
+        doc["message_count"] = start + stage["message_count"]["$add"][1]
+        doc["recent_turns"] = (doc.get("recent_turns", []) + [{"id": turn_id, "start": start}])[recent_turns[1]:]
+        if self.lose_replies:
+            self.lose_replies -= 1
+            raise AutoReconnect("connection reset")
+        return {"_id": doc["_id"], "message_count": doc["message_count"]}
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        turns = self.reserved(doc, query["recent_turns.id"]) if doc else []
+        if not turns:
+            return None
+        return {"_id": doc["_id"], "recent_turns": turns}
+
+
+class FakeBuckets:
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    headers, buckets = FakeHeaders(), FakeBuckets()
+    monkeypatch.setattr(store_module, "Conversation", SimpleNamespace(get_motor_collection=lambda: headers))
+    monkeypatch.setattr(store_module, "get_database", lambda: SimpleNamespace(conversation_messages=buckets))
+    return headers, buckets
+
+
+def turn(conversation_id, size=2, defaults=None):
+    return {
+        "conversation_id": conversation_id,
+        "messages": [{"role": "user", "content": f"m{i}"} for i in range(size)],
+        "first_preview": "m0",
+        "preview": f"m{size - 1}",
+        "defaults": defaults,
+        "turn_id": store_module.PydanticObjectId(),
+        "start": None
+    }
+
+
+def bucket_indexes(buckets):
+    return [m["index"] for op in buckets.operations for m in op._doc["$addToSet"]["messages"]["$each"]]
+
+
+@pytest.mark.parametrize("defaults", [None, {"user_id": "u1"}])
+def test_retried_reservation_is_not_counted_twice(collections, defaults):
+    headers, buckets = collections
+    conversation_id = "c1"
+    headers.docs[conversation_id] = {"_id": conversation_id, "message_count": 4}
+    store = ConversationStore()
+    writes = [turn(conversation_id, defaults=defaults)]
+
+    async def scenario():
+        headers.lose_replies = 1
+        with pytest.raises(AutoReconnect):
+            await store.apply_writes(writes)
+        # The conversation writer retries the same batch
+        await store.apply_writes(writes)
+
+    asyncio.run(scenario())
+    assert headers.docs[conversation_id]["message_count"] == 6
+    assert writes[0]["start"] == 4
+    assert bucket_indexes(buckets) == [4, 5]
+
+
+def test_new_conversation_is_created_with_its_first_turn(collections):
+    headers, buckets = collections
+    store = ConversationStore()
+    writes = [turn("c1", size=MESSAGES_PER_BUCKET + 1, defaults={"user_id": "u1"}), turn("c1")]
+
+    asyncio.run(store.apply_writes(writes))
+    assert headers.docs["c1"]["message_count"] == MESSAGES_PER_BUCKET + 3
+    assert [write["start"] for write in writes] == [0, MESSAGES_PER_BUCKET + 1]
+    assert sorted({op._filter["seq"] for op in buckets.operations}) == [0, 1]
+
+
+def test_turn_for_deleted_conversation_is_dropped(collections):
+    _, buckets = collections
+    writes = [turn("gone")]
+
+    asyncio.run(ConversationStore().apply_writes(writes))
+    assert writes[0]["start"] == -1
+    assert buckets.operations == []
+
+
+def test_retried_reservation_survives_later_turns(collections):
+    headers, buckets = collections
+    headers.docs["c1"] = {"_id": "c1", "message_count": 0}
+    store = ConversationStore()
+    first, second = [turn("c1")], [turn("c1", size=3)]
+
+    async def scenario():
+        headers.lose_replies = 1
+        with pytest.raises(AutoReconnect):
+            await store.apply_writes(first)
+        # Another worker reserves the next turn before the first one is retried
+        await store.apply_writes(second)
+        await store.apply_writes(first)
+
+    asyncio.run(scenario())
+    assert headers.docs["c1"]["message_count"] == 5
+    assert first[0]["start"] == 0
+    assert second[0]["start"] == 2
+    assert sorted(bucket_indexes(buckets)) == [0, 1, 2, 3, 4]
+
+
+def test_reservations_kept_are_bounded(collections):
+    headers, _ = collections
+    store = ConversationStore()
+    writes = [turn("c1", size=1, defaults={"user_id": "u1"})] + [turn("c1", size=1) for _ in range(RECENT_TURNS + 5)]
+
+    asyncio.run(store.apply_writes(writes))
+    assert headers.docs["c1"]["message_count"] == RECENT_TURNS + 6
+    assert len(headers.docs["c1"]["recent_turns"]) == RECENT_TURNS
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("app.models.mongo_models")
+
+from app.core.config import settings  # noqa: E402
+from app.services.conversation_summary_service import ConversationSummaryService  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "CONVERSATION_RECENT_MESSAGES", 6)
+    monkeypatch.setattr(settings, "CONVERSATION_MAX_RAW_MESSAGES", 40)
+    return ConversationSummaryService()
+
+
+def test_keeps_every_unsummarized_message_while_fold_lags(service):
+    # 30 messages, only the first 4 summarized: 26 are in neither the summary nor a 6-message tail
+    tail = list(range(4, 30))
+
+    assert service.recent_messages(tail, 30, 4) == tail
+
+
+def test_skips_messages_covered_by_the_summary(service):
+    tail = list(range(10, 30))
+
+    assert service.recent_messages(tail, 30, 24) == list(range(24, 30))
+
+
+def test_caps_raw_history_for_unsummarized_legacy_conversations(service):
+    tail = list(range(0, 100))
+
+    assert service.recent_messages(tail, 100, 0) == list(range(60, 100))
@@ -0,0 +1,112 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+from app.core.config import settings
+from app.services.conversation_writer import ConversationWriter
+
+
+def test_writes_are_batched_in_queue_order():
+    async def scenario():
+        batches = []
+
+        async def apply(writes):
+            batches.append(list(writes))
+
+        writer = ConversationWriter(apply)
+        writer.start()
+        for turn in range(3):
+            await writer.submit("c1", {"turn": turn})
+        await writer.wait_for("c1")
+
+        assert [write["turn"] for batch in batches for write in batch] == [0, 1, 2]
+        assert writer.stats()["written"] == 3
+        await writer.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr("app.services.conversation_writer.backoff_delay", lambda *args: 0)
+
+    async def scenario():
+        calls = []
+
+        async def apply(writes):
+            calls.append(writes)
+            if len(calls) == 1:
+                raise AutoReconnect("primary stepped down")
+
+        writer = ConversationWriter(apply)
+        writer.start()
+        await writer.submit("c1", {"turn": 0})
+        await writer.wait_for("c1")
+
+        assert len(calls) == 2
+        assert writer.stats()["retries"] == 1
+        assert writer.stats()["failed"] == 0
+        await writer.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_unexpected_error_drops_batch_but_keeps_worker_alive():
+    async def scenario():
+        applied = []
+
+        async def apply(writes):
+            if any(write.get("bad") for write in writes):
+                raise TypeError("cannot encode object")
+            applied.extend(writes)
+
+        writer = ConversationWriter(apply)
+        writer.start()
+        await writer.submit("c1", {"bad": True})
+        # Returns instead of hanging on a write that will never land
+        await asyncio.wait_for(writer.wait_for("c1"), timeout=1)
+        assert writer.stats()["failed"] == 1
+
+        await writer.submit("c1", {"turn": 1})
+        await asyncio.wait_for(writer.wait_for("c1"), timeout=1)
+        assert applied == [{"turn": 1}]
+        await writer.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_dead_worker_falls_back_to_inline_writes():
+    async def scenario():
+        applied = []
+
+        async def apply(writes):
+            applied.extend(writes)
+
+        writer = ConversationWriter(apply)
+        writer.start()
+        writer._worker.cancel()
+        await asyncio.sleep(0)
+
+        await writer.submit("c1", {"turn": 0})
+        await asyncio.wait_for(writer.wait_for("c1"), timeout=1)
+        assert applied == [{"turn": 0}]
+        assert writer.stats()["inline_writes"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_sync_durability_writes_inline(monkeypatch):
+    monkeypatch.setattr(settings, "CONVERSATION_DURABILITY", "sync")
+
+    async def scenario():
+        applied = []
+
+        async def apply(writes):
+            applied.extend(writes)
+
+        writer = ConversationWriter(apply)
+        writer.start()
+        await writer.submit("c1", {"turn": 0})
+        assert applied == [{"turn": 0}]
+        await writer.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from app.core.indexes import INDEXES, QUERY_SHAPES, ensure_indexes, find_collection_scans, plan_status
+
+IXSCAN = {
+    "stage": "IXSCAN",
+    "keyPattern": {"institutionId": 1, "issuedAt": -1, "_id": -1},
+    "indexName": "institution_issued_at",
+    "indexBounds": {"institutionId": ["[\"abc\", \"abc\"]"]},
+}
+COLLSCAN = {"stage": "COLLSCAN", "filter": {"institutionId": {"$eq": "abc"}}, "direction": "forward"}
+
+# Canned queryPlanner.winningPlan shapes, as returned by explain() on different servers
+PLANS = {
+    "fetch over index": ({"stage": "FETCH", "inputStage": IXSCAN}, "ok"),
+    "limit over fetch over index": (
+        {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": IXSCAN}}, "ok"
+    ),
+    "_id lookup": ({"stage": "IDHACK"}, "ok"),
+    "bare collection scan": (COLLSCAN, "COLLSCAN"),
+    "in-memory sort over scan": ({"stage": "SORT", "sortPattern": {"issuedAt": -1}, "inputStage": COLLSCAN}, "COLLSCAN"),
+    "$or with one unindexed branch": (
+        {"stage": "SUBPLAN", "inputStage": {"stage": "OR", "inputStages": [{"stage": "FETCH", "inputStage": IXSCAN}, COLLSCAN]}},
+        "COLLSCAN",
+    ),
+    "$or fully indexed": (
+        {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [IXSCAN, IXSCAN]}}, "ok"
+    ),
+    "slot-based engine": (
+        {"queryPlan": {"stage": "FETCH", "inputStage": COLLSCAN}, "slotBasedPlan": {"stages": "[1] scan s1 ..."}},
+        "COLLSCAN",
+    ),
+    "sharded cluster": (
+        {
+            "stage": "SHARD_MERGE",
+            "shards": [
+                {"shardName": "s0", "winningPlan": {"stage": "FETCH", "inputStage": IXSCAN}},
+                {"shardName": "s1", "winningPlan": {"stage": "SHARDING_FILTER", "inputStage": COLLSCAN}},
+            ],
+        },
+        "COLLSCAN",
+    ),
+    # A layout with no stage we recognise must fail rather than count as indexed
+    "unrecognised layout": ({"planTree": "FETCH <- IXSCAN"}, "UNKNOWN"),
+    "predicate mentioning a stage name": ({"stage": "FETCH", "filter": {"stage": "IXSCAN"}, "inputStage": COLLSCAN}, "COLLSCAN"),
+}
+
+
+@pytest.mark.parametrize("plan,status", PLANS.values(), ids=list(PLANS))
+def test_plan_status(plan, status):
+    assert plan_status(plan) == status
+
+
+def test_find_collection_scans_counts_every_branch():
+    plan = {"stage": "OR", "inputStages": [COLLSCAN, {"stage": "FETCH", "inputStage": COLLSCAN}, IXSCAN]}
+    assert find_collection_scans(plan) == ["COLLSCAN", "COLLSCAN"]
+    assert find_collection_scans({"stage": "FETCH", "inputStage": IXSCAN}) == []
+
+
+def test_every_query_shape_has_a_leading_index():
+    for collection, query, sort in QUERY_SHAPES:
+        leading_field = next(iter(query), None) or sort[0][0]
+        leading_keys = {next(iter(model.document["key"])) for model in INDEXES[collection]}
+        assert leading_field in leading_keys, (collection, query, sort)
+
+
+def test_index_names_are_unique_per_collection():
+    for collection, models in INDEXES.items():
+        names = [model.document["name"] for model in models]
+        assert len(names) == len(set(names)), collection
+
+
+class FakeCollection:
+    def __init__(self, existing):
+        self.existing = existing
+        self.created = []
+
+    async def index_information(self):
+        return {"_id_": {"key": [("_id", 1)]}, **self.existing}
+
+    async def create_index(self, keys, **options):
+        self.created.append((keys, options))
+        return options["name"]
+
+
+def test_ensure_indexes_creates_only_missing_key_patterns():
+    # An existing index is matched on its keys, whatever name it was created under
+    collections = {"users": FakeCollection({"legacy_email": {"key": [("email", 1)]}})}
+    db = {name: collections.get(name) or FakeCollection({}) for name in INDEXES}
+
+    created = asyncio.run(ensure_indexes(db))
+
+    assert created["users"] == ["organization"]
+    assert db["users"].created == [([("organization", 1)], {"name": "organization", "background": True})]
+    assert created["conversation_messages"] == ["conversation_seq"]
+    assert db["conversation_messages"].created[0][1]["unique"] is True
+    assert set(created) == set(INDEXES)
@@ -0,0 +1,261 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+
+from app.services.institution_stats_service import (
+    COMPLETE_MARKER,
+    DIMENSIONS,
+    InstitutionStatsService,
+    certificate_keys,
+    stat_key,
+)
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and "$ne" in condition:
+            if condition["$ne"] in (value or []):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """The collection methods the stats service uses, over a dict keyed by _id."""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail_next_update = False
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return doc if doc is not None and matches(doc, query) else None
+
+    def find(self, query, projection=None):
+        async def rows():
+            for doc in list(self.docs.values()):
+                if matches(doc, query):
+                    yield doc
+        return rows()
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+    async def update_one(self, query, update, upsert=False):
+        if self.fail_next_update:
+            self.fail_next_update = False
+            raise AutoReconnect("connection reset")
+        doc = self.docs.get(query["_id"])
+        upserted_id = None
+        if doc is None or not matches(doc, query):
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            if doc is not None:
+                raise DuplicateKeyError("duplicate key")
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+            upserted_id = query["_id"]
+
+        for path, amount in update.get("$inc", {}).items():
+            target = doc
+            *parents, leaf = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = target.get(leaf, 0) + amount
+        doc.update(update.get("$set", {}))
+        for field, push in update.get("$push", {}).items():
+            doc[field] = (doc.get(field, []) + push["$each"])[push["$slice"]:]
+        return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id)
+
+    async def delete_one(self, query):
+        doc = self.docs.get(query["_id"])
+        if doc is None or not matches(doc, query):
+            return SimpleNamespace(deleted_count=0)
+        del self.docs[query["_id"]]
+        return SimpleNamespace(deleted_count=1)
+
+
+class FakeCertificates:
+    """`certificates` whose aggregation counts a snapshot, then runs `during_aggregate`."""
+
+    def __init__(self):
+        self.docs = []
+        self.during_aggregate = None
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        match = pipeline[0]["$match"]
+        snapshot = [doc for doc in self.docs if all(doc.get(k) == v for k, v in match.items())]
+        collection = self
+
+        class Cursor:
+            async def to_list(self, length=None):
+                if collection.during_aggregate:
+                    hook, collection.during_aggregate = collection.during_aggregate, None
+                    await hook()
+                facets = {"total": {}, **{name: {} for name in DIMENSIONS}}
+                for doc in snapshot:
+                    institution = doc["institutionId"]
+                    facets["total"][institution] = facets["total"].get(institution, 0) + 1
+                    for name, key in certificate_keys(doc).items():
+                        facets[name][(institution, key)] = facets[name].get((institution, key), 0) + 1
+                result = {"total": [{"_id": i, "n": n} for i, n in facets["total"].items()]}
+                for name in DIMENSIONS:
+                    result[name] = [{"_id": {"i": i, "v": v}, "n": n} for (i, v), n in facets[name].items()]
+                return [result] if snapshot else []
+
+        return Cursor()
+
+
+def fake_db():
+    return SimpleNamespace(
+        certificates=FakeCertificates(),
+        institution_stats=FakeCollection(),
+        institution_stats_meta=FakeCollection()
+    )
+
+
+def issue(db, institution_id, status="ISSUED"):
+    certificate = {"_id": ObjectId(), "institutionId": institution_id, "status": status}
+    db.certificates.docs.append(certificate)
+    return certificate
+
+
+def test_stat_key_sanitizes_document_keys():
+    assert stat_key(None) == "unknown"
+    assert stat_key("") == "unknown"
+    assert stat_key("B.Tech") == "B_Tech"
+    assert stat_key("$set") == "set"
+
+
+def test_certificate_keys():
+    keys = certificate_keys({"status": "ISSUED", "student": {"course": "B.Sc"}})
+    assert keys["by_status"] == "ISSUED"
+    assert keys["by_course"] == "B_Sc"
+    assert keys["by_year"] == "unknown"
+
+
+def test_insert_event_is_counted_once_across_workers():
+    async def scenario():
+        db = fake_db()
+        institution_id = ObjectId()
+        db.institution_stats.docs[institution_id] = {"_id": institution_id, "total": 0, "version": 1}
+        certificate = issue(db, institution_id)
+
+        # Two workers receive the same change event
+        workers = [InstitutionStatsService(), InstitutionStatsService()]
+        for worker in workers:
+            await worker.record_issued(certificate, db)
+
+        assert db.institution_stats.docs[institution_id]["total"] == 1
+        assert db.institution_stats.docs[institution_id]["by_status"] == {"ISSUED": 1}
+        assert sum(worker.duplicate_events for worker in workers) == 1
+
+    asyncio.run(scenario())
+
+
+def test_first_certificate_builds_the_institution_once():
+    async def scenario():
+        db = fake_db()
+        institution_id = ObjectId()
+        certificate = issue(db, institution_id)
+
+        workers = [InstitutionStatsService(), InstitutionStatsService()]
+        for worker in workers:
+            await worker.record_issued(certificate, db)
+
+        assert db.institution_stats.docs[institution_id]["total"] == 1
+        assert workers[1].duplicate_events == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_increment_is_counted_when_redelivered():
+    async def scenario():
+        db = fake_db()
+        institution_id = ObjectId()
+        issue(db, institution_id)
+        service = InstitutionStatsService()
+        await service.rebuild(db, institution_id)
+
+        certificate = issue(db, institution_id)
+        db.institution_stats.fail_next_update = True
+        with pytest.raises(AutoReconnect):
+            await service.record_issued(certificate, db)
+        # Nothing was claimed, so the redelivered event still counts
+        await service.record_issued(certificate, db)
+        assert db.institution_stats.docs[institution_id]["total"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_increment_during_rebuild_is_not_lost():
+    async def scenario():
+        db = fake_db()
+        institution_id = ObjectId()
+        issue(db, institution_id)
+        service = InstitutionStatsService()
+        await service.rebuild(db, institution_id)
+
+        async def concurrent_insert():
+            # Counted by another worker after the rebuild's aggregation read the certificates
+            await InstitutionStatsService().record_issued(issue(db, institution_id), db)
+
+        db.certificates.during_aggregate = concurrent_insert
+        await service.rebuild(db, institution_id)
+        assert db.institution_stats.docs[institution_id]["total"] == 2
+
+        # The rebuild keeps the claims, so the same event from a third worker is a duplicate
+        late = InstitutionStatsService()
+        await late.record_issued(db.certificates.docs[-1], db)
+        assert late.duplicate_events == 1
+        assert db.institution_stats.docs[institution_id]["total"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_removes_institutions_without_certificates():
+    async def scenario():
+        db = fake_db()
+        gone = ObjectId()
+        db.institution_stats.docs[gone] = {"_id": gone, "total": 3, "version": 4}
+        kept = ObjectId()
+        issue(db, kept)
+
+        assert await InstitutionStatsService().rebuild(db) == 1
+        assert list(db.institution_stats.docs) == [kept]
+        assert COMPLETE_MARKER in db.institution_stats_meta.docs
+
+    asyncio.run(scenario())
+
+
+def test_system_totals_build_every_institution_first():
+    async def scenario():
+        db = fake_db()
+        service = InstitutionStatsService()
+        lazily_built = ObjectId()
+        db.institution_stats.docs[lazily_built] = {"_id": lazily_built, "total": 2, "by_status": {"ISSUED": 2}}
+        rebuilds = []
+
+        async def rebuild(db=None, institution_id=None):
+            rebuilds.append(institution_id)
+            other = ObjectId()
+            db.institution_stats.docs[other] = {"_id": other, "total": 3, "by_status": {"ISSUED": 3}}
+            db.institution_stats_meta.docs[COMPLETE_MARKER] = {"_id": COMPLETE_MARKER}
+            return 2
+
+        service.rebuild = rebuild
+
+        totals = await service.get_system_totals(db)
+        assert rebuilds == [None]
+        assert totals["total"] == 5
+        assert totals["by_status"] == {"ISSUED": 5}
+
+        # Once complete, totals come straight from the view
+        await service.get_system_totals(db)
+        assert rebuilds == [None]
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import asyncio
+import sys
+from types import ModuleType
+
+import pytest
+from pymongo.errors import ExecutionTimeout
+
+from app.core.config import settings
+from app.services.intent_service import (
+    INTENT_CERTIFICATE_COUNT,
+    INTENT_CGPA,
+    INTENT_FAQ_VERIFY,
+    INTENT_LIST_CERTIFICATES,
+    INTENT_OTHER,
+    TRAINING_EXAMPLES,
+    IntentService,
+)
+
+intent_service = IntentService()
+
+
+def passes_gate(result):
+    return result["intent"] != INTENT_OTHER and result["confidence"] >= settings.FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text,label", TRAINING_EXAMPLES)
+def test_seed_phrases_are_never_confidently_misrouted(text, label):
+    result = intent_service.classify(text)
+    if passes_gate(result):
+        assert result["intent"] == label
+
+
+@pytest.mark.parametrize("text", [text for text, label in TRAINING_EXAMPLES if label == INTENT_OTHER])
+def test_seed_phrases_labelled_other_reach_the_llm(text):
+    assert not passes_gate(intent_service.classify(text))
+
+
+@pytest.mark.parametrize("text", [
+    "how many certificates did mmmut issue last year",
+    "How many certificates did IIT Delhi issue?",
+    "कितने प्रमाणपत्र जारी हुए",
+])
+def test_questions_about_other_issuers_are_not_answered_from_own_certificates(text):
+    result = intent_service.classify(text)
+    assert not (passes_gate(result) and result["intent"] == INTENT_CERTIFICATE_COUNT)
+
+
+@pytest.mark.parametrize("text,intent", [
+    ("how many certificates do I have?", INTENT_CERTIFICATE_COUNT),
+    ("How many of my certificates are there", INTENT_CERTIFICATE_COUNT),
+    ("मेरे पास कितने प्रमाणपत्र हैं?", INTENT_CERTIFICATE_COUNT),
+    ("what is my cgpa?", INTENT_CGPA),
+    ("please show my certificates", INTENT_LIST_CERTIFICATES),
+    ("How do I verify a certificate?", INTENT_FAQ_VERIFY),
+])
+def test_first_person_questions_take_the_fast_path(text, intent):
+    result = intent_service.classify(text)
+    assert result["intent"] == intent
+    assert passes_gate(result)
+
+
+def test_rule_hit_alone_cannot_clear_the_gate():
+    # Matches the "my grades" rule, but the model sees an unrelated request
+    result = intent_service.classify("can you help me write an email to the registrar about my grades")
+    assert result["method"] == "rule"
+    assert not passes_gate(result)
+
+
+def test_other_intent_falls_through_to_llm():
+    assert asyncio.run(intent_service.try_fast_path("hello how are you")) is None
+
+
+def student_service_returning(find_certificates, monkeypatch):
+    """Swap in a StudentDataService whose certificate lookup is `find_certificates`."""
+    module = ModuleType("app.services.student_service")
+    module.StudentDataService = type("StudentDataService", (), {"find_certificates": staticmethod(find_certificates)})
+    monkeypatch.setitem(sys.modules, "app.services.student_service", module)
+
+
+def test_certificate_count_is_answered_from_the_lookup(monkeypatch):
+    async def find_certificates(user_email, user_role):
+        return [{"course": "B.Tech", "certificate_id": "C1", "issue_date": "2025-06-01", "status": "ISSUED"}]
+
+    student_service_returning(find_certificates, monkeypatch)
+    result = asyncio.run(intent_service.try_fast_path("how many certificates do I have?", user_email="a@x.in"))
+    assert result["intent"] == INTENT_CERTIFICATE_COUNT
+    assert "You have 1 certificate " in result["answer"]
+
+
+@pytest.mark.parametrize("text", ["how many certificates do I have?", "please show my certificates"])
+def test_database_failure_falls_through_to_llm(monkeypatch, text):
+    async def find_certificates(user_email, user_role):
+        raise ExecutionTimeout("operation exceeded time limit")
+
+    student_service_returning(find_certificates, monkeypatch)
+    assert asyncio.run(intent_service.try_fast_path(text, user_email="a@x.in")) is None
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.llm_scheduler import (
+    PRIORITY_ADMIN,
+    PRIORITY_PUBLIC,
+    PRIORITY_STUDENT,
+    LLMScheduler,
+    priority_for_role,
+)
+
+WEIGHTS = {PRIORITY_ADMIN: 6, PRIORITY_STUDENT: 3, PRIORITY_PUBLIC: 1}
+SHARES = {PRIORITY_ADMIN: 1.0, PRIORITY_STUDENT: 0.75, PRIORITY_PUBLIC: 0.5}
+
+
+def make_scheduler(max_concurrency=8, max_queue=32, queue_timeout=1.0):
+    return LLMScheduler(
+        max_concurrency=max_concurrency,
+        max_queue=max_queue,
+        queue_timeout=queue_timeout,
+        weights=WEIGHTS,
+        shares=SHARES
+    )
+
+
+async def hold(scheduler, priority, release: asyncio.Event, started: list):
+    async with scheduler.slot(priority):
+        started.append(priority)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_priority_for_role():
+    assert priority_for_role("moe") == PRIORITY_ADMIN
+    assert priority_for_role("INSTITUTION") == PRIORITY_ADMIN
+    assert priority_for_role("USER") == PRIORITY_STUDENT
+    assert priority_for_role(None) == PRIORITY_STUDENT
+
+
+def test_admin_is_not_blocked_by_public_waiter_held_back_by_its_share():
+    async def scenario():
+        scheduler = make_scheduler()
+        release_public = asyncio.Event()
+        started = []
+
+        # Public may hold 4 of 8 slots; a fifth public call waits on its share
+        public = [asyncio.create_task(hold(scheduler, PRIORITY_PUBLIC, release_public, started)) for _ in range(5)]
+        await settle()
+        assert started.count(PRIORITY_PUBLIC) == 4
+        assert scheduler.active == 4
+
+        # Four global slots are idle, so an admin call starts straight away
+        release_admin = asyncio.Event()
+        admin = asyncio.create_task(hold(scheduler, PRIORITY_ADMIN, release_admin, started))
+        await settle()
+        assert PRIORITY_ADMIN in started
+        assert scheduler.active == 5
+
+        release_admin.set()
+        release_public.set()
+        await asyncio.gather(admin, *public)
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_are_dispatched_by_weight_when_slots_free():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=1)
+        release = asyncio.Event()
+        started = []
+
+        first = asyncio.create_task(hold(scheduler, PRIORITY_STUDENT, release, started))
+        await settle()
+
+        order = []
+
+        async def quick(priority):
+            async with scheduler.slot(priority):
+                order.append(priority)
+
+        waiters = [asyncio.create_task(quick(PRIORITY_PUBLIC)) for _ in range(3)]
+        waiters += [asyncio.create_task(quick(PRIORITY_ADMIN)) for _ in range(3)]
+        await settle()
+
+        release.set()
+        await asyncio.gather(first, *waiters)
+
+        # Admin (weight 6) drains ahead of public (weight 1) despite queueing later
+        assert order[:4].count(PRIORITY_ADMIN) == 3
+        assert order[-2:] == [PRIORITY_PUBLIC] * 2
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_shed_with_429():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=1, max_queue=2)
+        release = asyncio.Event()
+        started = []
+
+        holders = [asyncio.create_task(hold(scheduler, PRIORITY_ADMIN, release, started)) for _ in range(3)]
+        await settle()
+
+        with pytest.raises(HTTPException) as error:
+            async with scheduler.slot(PRIORITY_ADMIN):
+                pass
+        assert error.value.status_code == 429
+        assert scheduler.stats()["classes"][PRIORITY_ADMIN]["rejected"] == 1
+
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_is_shed_and_releases_nothing():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=1, queue_timeout=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(scheduler, PRIORITY_STUDENT, release, []))
+        await settle()
+
+        with pytest.raises(HTTPException):
+            async with scheduler.slot(PRIORITY_STUDENT):
+                pass
+        assert scheduler.active == 1
+
+        release.set()
+        await holder
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
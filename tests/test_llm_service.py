@@ -0,0 +1,170 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.llm_service as llm_module
+from app.core.config import settings
+from app.core.llm_scheduler import PRIORITY_ADMIN, PRIORITY_STUDENT, LLMScheduler
+from app.core.resilience import CircuitBreaker, LatencyTracker
+from app.services.llm_service import LLMService, LLMUnavailableError
+
+
+class FakeLLMService(LLMService):
+    """LLMService with `_complete` replaced by a scripted coroutine."""
+
+    def __init__(self, complete):
+        self.client = object()
+        self.complete = complete
+        self.calls = 0
+
+    async def _complete(self, messages, model, temperature, max_tokens, stream, priority=PRIORITY_STUDENT):
+        self.calls += 1
+        return await self.complete(self.calls)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    latency = LatencyTracker()
+    scheduler = LLMScheduler(
+        max_concurrency=2,
+        max_queue=4,
+        queue_timeout=1.0,
+        weights={PRIORITY_ADMIN: 6, PRIORITY_STUDENT: 3},
+        shares={PRIORITY_ADMIN: 1.0, PRIORITY_STUDENT: 1.0}
+    )
+    monkeypatch.setattr(llm_module, "llm_breaker", breaker)
+    monkeypatch.setattr(llm_module, "llm_latency", latency)
+    monkeypatch.setattr(llm_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 1)
+    latency.record(0.01)
+    return breaker, scheduler
+
+
+def test_client_error_does_not_reset_the_breaker(llm):
+    breaker, _ = llm
+    breaker.record_failure()
+    breaker.record_failure()
+
+    async def bad_request(call):
+        raise ValueError("400 invalid model")
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(FakeLLMService(bad_request).generate_response([]))
+
+    assert breaker.failures == 2
+
+
+def test_client_error_frees_the_half_open_probe(llm):
+    breaker, _ = llm
+    # Open long enough ago that the next call is the half-open probe
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = -1e9
+
+    async def bad_request(call):
+        raise ValueError("400 invalid model")
+
+    service = FakeLLMService(bad_request)
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(service.generate_response([]))
+    assert service.calls == 1
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_slow_call_is_hedged_when_a_slot_is_free(llm):
+    _, scheduler = llm
+
+    async def primary_slow(call):
+        await asyncio.sleep(0.5 if call == 1 else 0.0)
+        return f"answer {call}"
+
+    service = FakeLLMService(primary_slow)
+    assert asyncio.run(service.generate_response([])) == "answer 2"
+    assert service.calls == 2
+    assert scheduler.active == 0
+
+
+def test_hedge_is_skipped_without_a_free_slot(llm):
+    _, scheduler = llm
+
+    async def slow(call):
+        await asyncio.sleep(0.05)
+        return f"answer {call}"
+
+    async def scenario():
+        # The other slot is busy, so the hedge would exceed the concurrency cap
+        assert scheduler.try_acquire(PRIORITY_STUDENT)
+        service = FakeLLMService(slow)
+        answer = await service.generate_response([])
+        scheduler.release(PRIORITY_STUDENT)
+        return service, answer
+
+    service, answer = asyncio.run(scenario())
+    assert answer == "answer 1"
+    assert service.calls == 1
+    assert scheduler.active == 0
+
+
+def test_cancelled_caller_cancels_primary_and_hedge(llm):
+    _, scheduler = llm
+    cancelled = []
+
+    async def never_answers(call):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(call)
+            raise
+
+    async def scenario():
+        service = FakeLLMService(never_answers)
+        request = asyncio.create_task(service.generate_response([]))
+        # Past the p95 hedge delay, so both copies are running
+        await asyncio.sleep(0.1)
+        assert service.calls == 2
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        await asyncio.sleep(0)
+        # Checked before asyncio.run tears down leftover tasks
+        assert sorted(cancelled) == [1, 2]
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_call_keeps_its_slot_until_the_thread_returns(llm, monkeypatch):
+    _, scheduler = llm
+    monkeypatch.setattr(settings, "LLM_HEDGE_ENABLED", False)
+    upstream_done = threading.Event()
+
+    def create(**kwargs):
+        upstream_done.wait(5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="late"))])
+
+    service = LLMService.__new__(LLMService)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def scenario():
+        request = asyncio.create_task(service.generate_response([]))
+        await asyncio.sleep(0.05)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        # The Groq request is still running in its thread
+        assert scheduler.active == 1
+        upstream_done.set()
+        for _ in range(100):
+            if scheduler.active == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert scheduler.active == 0
+
+    asyncio.run(scenario())
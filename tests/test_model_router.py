@@ -0,0 +1,74 @@
+import pytest
+
+from app.core.config import INSTITUTION_ROLES, STAFF_ROLES, settings
+from app.core.llm_scheduler import PRIORITY_ADMIN, priority_for_role
+from app.services.model_router import TIER_COMPLEX, TIER_FAST, TIER_STANDARD, ModelRouter
+
+TIERS = {
+    TIER_FAST: {"model": "small-model", "max_tokens": 384},
+    TIER_STANDARD: {"model": "", "max_tokens": 1024},
+    TIER_COMPLEX: {"model": "large-model", "max_tokens": 2048},
+}
+
+GOOD_MATCH = [{"distance": 0.2}]
+WEAK_MATCH = [{"distance": 0.7}]
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_ROUTING_MIN_RETRIEVAL_CONFIDENCE", 0.6)
+    return ModelRouter(TIERS)
+
+
+@pytest.mark.parametrize("question,role,context_docs,tier", [
+    ("hello", None, None, TIER_FAST),
+    ("नमस्ते", "USER", None, TIER_FAST),
+    ("How do I verify a certificate?", "USER", GOOD_MATCH, TIER_FAST),
+    # An FAQ without a good knowledge-base match needs the bigger model
+    ("How do I verify a certificate?", "USER", WEAK_MATCH, TIER_STANDARD),
+    ("Give me a breakdown by department of this year's certificates", "ADMIN", None, TIER_COMPLEX),
+    ("Give me a breakdown by department of this year's certificates", "subadmin", None, TIER_COMPLEX),
+    # Students cannot ask about institution-wide data, so analysis words alone don't escalate
+    ("Give me a breakdown by department of this year's certificates", "USER", None, TIER_STANDARD),
+    ("What does my certificate status mean " + "and also " * 30, "MOE", None, TIER_COMPLEX),
+    ("Can you help me with my application", "USER", None, TIER_STANDARD),
+])
+def test_route_picks_tier(router, question, role, context_docs, tier):
+    assert router.route(question, role, context_docs)["tier"] == tier
+
+
+def test_decision_maps_tier_to_model_and_budget(router):
+    decision = router.route("hello")
+    assert decision["model"] == "small-model"
+    assert decision["max_tokens"] == 384
+    assert router.stats()["decisions"] == {TIER_FAST: 1}
+
+    # An empty model name falls back to the default Groq model
+    assert router.route("Can you help me with my application")["model"] == settings.GROQ_MODEL
+
+
+def test_long_greeting_is_not_fast(router):
+    question = "hello " + "I need help understanding the results on my transcript " * 3
+    assert router.route(question, "USER")["tier"] == TIER_STANDARD
+
+
+def test_routing_disabled_uses_standard_tier(router, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTING_ENABLED", False)
+    assert router.route("hello")["tier"] == TIER_STANDARD
+    assert router.stats()["decisions"] == {}
+
+
+def test_retrieval_confidence(router):
+    assert router.retrieval_confidence(None) == 0.0
+    assert router.retrieval_confidence([{"distance": 0.5}, {"distance": 0.1}]) == pytest.approx(0.9)
+
+
+@pytest.mark.parametrize("role", sorted(STAFF_ROLES))
+def test_staff_roles_get_admin_priority(role):
+    assert priority_for_role(role) == PRIORITY_ADMIN
+
+
+def test_institution_roles_are_staff():
+    assert INSTITUTION_ROLES < STAFF_ROLES
+    assert "USER" not in STAFF_ROLES
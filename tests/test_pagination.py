@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.pagination import decode_cursor, encode_cursor, keyset_filter, page_result
+
+
+def test_cursor_round_trips_datetimes_and_ids():
+    issued_at = datetime(2025, 3, 1, 12, 30)
+    last_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(issued_at, last_id)) == (issued_at, last_id)
+
+
+def test_cursor_round_trips_missing_sort_value():
+    last_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(None, last_id)) == (None, last_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", ""])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_no_cursor_means_first_page():
+    assert keyset_filter("issuedAt", None) == {}
+
+
+def test_keyset_filter_selects_rows_after_the_cursor():
+    issued_at = datetime(2025, 3, 1)
+    last_id = ObjectId()
+
+    assert keyset_filter("issuedAt", encode_cursor(issued_at, last_id)) == {"$or": [
+        {"issuedAt": {"$lt": issued_at}},
+        {"issuedAt": issued_at, "_id": {"$lt": last_id}},
+        {"issuedAt": None}
+    ]}
+
+
+def test_keyset_filter_after_rows_without_the_field():
+    last_id = ObjectId()
+
+    assert keyset_filter("issuedAt", encode_cursor(None, last_id)) == {"issuedAt": None, "_id": {"$lt": last_id}}
+
+
+def test_page_result_last_page_has_no_cursor():
+    rows = [{"_id": ObjectId(), "issuedAt": datetime(2025, 1, day)} for day in (3, 2)]
+
+    assert page_result(rows, 2, "issuedAt") == (rows, None)
+
+
+def test_page_result_cursor_points_at_last_row_of_page():
+    rows = [{"_id": ObjectId(), "issuedAt": datetime(2025, 1, day)} for day in (3, 2, 1)]
+
+    page, cursor = page_result(rows, 2, "issuedAt")
+
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (rows[1]["issuedAt"], rows[1]["_id"])
+
+
+def test_walking_pages_visits_every_row_once():
+    # Rows in (issuedAt desc, _id desc) order, with ties and rows missing issuedAt
+    ids = [ObjectId() for _ in range(7)]
+    rows = sorted(
+        [{"_id": ids[i], "issuedAt": datetime(2025, 1, 1 + i // 2)} for i in range(5)],
+        key=lambda row: (row["issuedAt"], row["_id"]),
+        reverse=True
+    ) + sorted([{"_id": ids[5]}, {"_id": ids[6]}], key=lambda row: row["_id"], reverse=True)
+
+    def after(cursor):
+        if not cursor:
+            return rows
+        value, last_id = decode_cursor(cursor)
+        if value is None:
+            return [row for row in rows if row.get("issuedAt") is None and row["_id"] < last_id]
+        return [
+            row for row in rows
+            if row.get("issuedAt") is None
+            or row["issuedAt"] < value
+            or (row["issuedAt"] == value and row["_id"] < last_id)
+        ]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = page_result(after(cursor)[:3], 2, "issuedAt")
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert seen == rows
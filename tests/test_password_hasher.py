@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import app.core.password_hasher as hasher_module
+from app.core.config import settings
+from app.core.password_hasher import MAX_ROUNDS, MIN_ROUNDS, PasswordHasher
+from app.core.security import get_password_hash, is_bcrypt_hash, needs_rehash, verify_password
+
+
+def test_get_password_hash_uses_requested_cost():
+    hashed = get_password_hash("secret", rounds=5)
+    assert hashed.startswith("$2b$05$")
+    assert verify_password("secret", hashed)
+    assert not verify_password("wrong", hashed)
+
+
+def test_legacy_2a_hashes_still_verify():
+    hashed = "$2a$" + get_password_hash("secret", rounds=4)[4:]
+    assert verify_password("secret", hashed)
+
+
+def test_is_bcrypt_hash():
+    assert is_bcrypt_hash("$2b$12$abc")
+    assert is_bcrypt_hash("$2a$10$abc")
+    assert is_bcrypt_hash("$2y$10$abc")
+    assert not is_bcrypt_hash("secret")
+    assert not is_bcrypt_hash("")
+
+
+@pytest.mark.parametrize("stored,rounds,expected", [
+    ("plaintext", 12, True),
+    ("$2a$12$" + "x" * 53, 12, True),
+    ("$2b$10$" + "x" * 53, 12, True),
+    ("$2b$12$" + "x" * 53, 12, False),
+    # Stronger hashes are never downgraded
+    ("$2b$14$" + "x" * 53, 12, False),
+    ("$2b$", 12, True),
+    ("$2b$xx$", 12, True),
+])
+def test_needs_rehash(stored, rounds, expected):
+    assert needs_rehash(stored, rounds) is expected
+
+
+def test_tune_keeps_configured_rounds(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 11)
+    hasher = PasswordHasher(workers=1)
+    assert asyncio.run(hasher.tune()) == 11
+    assert hasher.needs_rehash(get_password_hash("secret", rounds=10))
+    hasher.shutdown()
+
+
+def test_tune_picks_largest_cost_within_target(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 0)
+    monkeypatch.setattr(settings, "BCRYPT_TARGET_MS", 300.0)
+    # 20 ms at the calibration cost: cost 13 is ~160 ms, cost 14 would be ~320 ms
+    monkeypatch.setattr(hasher_module, "get_password_hash", lambda password, rounds: time.sleep(0.02))
+    hasher = PasswordHasher(workers=1)
+    assert asyncio.run(hasher.tune()) == 13
+    hasher.shutdown()
+
+
+def test_tuned_cost_is_clamped(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 0)
+    monkeypatch.setattr(settings, "BCRYPT_TARGET_MS", 1.0)
+    monkeypatch.setattr(hasher_module, "get_password_hash", lambda password, rounds: time.sleep(0.02))
+    hasher = PasswordHasher(workers=1)
+    assert asyncio.run(hasher.tune()) == MIN_ROUNDS
+
+    monkeypatch.setattr(settings, "BCRYPT_TARGET_MS", 1e9)
+    assert asyncio.run(hasher.tune()) == MAX_ROUNDS
+    hasher.shutdown()
+
+
+def test_full_queue_is_shed_with_503():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        slow = [asyncio.create_task(hasher._run(time.sleep, 0.1)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert hasher.active == 1
+        assert hasher.waiting == 1
+
+        with pytest.raises(HTTPException) as error:
+            await hasher.verify("secret", get_password_hash("secret", rounds=4))
+        assert error.value.status_code == 503
+
+        await asyncio.gather(*slow)
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["completed"] == 2
+        hasher.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+from app.services.prompt_budget_service import TRUNCATION_MARKER, PromptBudgetService, count_tokens
+
+
+def test_count_tokens():
+    assert count_tokens(None) == 0
+    assert count_tokens("") == 0
+    assert count_tokens("hi, you") == 3
+    assert count_tokens("internationalization") == 5
+
+
+def test_small_prompt_is_kept_whole():
+    service = PromptBudgetService(max_tokens=1000)
+    history = [{"role": "user", "content": "hello"}, {"role": "assistant", "content": "hi"}]
+    packed = service.pack("Be helpful.", "What is my CGPA?", user_data="CGPA: 8.1", history=history)
+    assert packed["user_data"] == "CGPA: 8.1"
+    assert packed["history"] == history
+    assert packed["breakdown"]["total"] <= 1000
+
+
+def test_oversized_sections_are_trimmed_to_the_budget():
+    service = PromptBudgetService(max_tokens=600)
+    user_data = "\n".join(f"Certificate {n}: Bachelor of Technology" for n in range(200))
+    history = [{"role": "user", "content": f"message {n} " + "word " * 40} for n in range(30)]
+    docs = ["chunk " * 300, "another " * 300]
+
+    packed = service.pack(
+        "Be helpful.", "What is my CGPA?", user_data=user_data, summary="earlier " * 200,
+        context_docs=docs, history=history
+    )
+    assert packed["breakdown"]["total"] <= 600
+    assert packed["user_data"].endswith(TRUNCATION_MARKER)
+    assert packed["user_data"].startswith("Certificate 0")
+    # History keeps the latest messages, in order
+    assert packed["history"] == history[-len(packed["history"]):]
+    assert 0 < len(packed["history"]) < len(history)
+
+
+def test_truncate_respects_budget():
+    service = PromptBudgetService(max_tokens=1000)
+    truncated = service.truncate("word " * 500, 100)
+    assert truncated.endswith(TRUNCATION_MARKER)
+    assert count_tokens(truncated) <= 100
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.rate_limit import get_client_ip
+
+
+def make_request(forwarded=None, peer="10.0.0.5"):
+    headers = {"x-forwarded-for": forwarded} if forwarded is not None else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=peer))
+
+
+def test_uses_entry_appended_by_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 1)
+
+    # The client sent "1.2.3.4"; the proxy appended the address it saw
+    assert get_client_ip(make_request("1.2.3.4, 203.0.113.9")) == "203.0.113.9"
+
+
+def test_rotating_spoofed_entries_does_not_change_the_ip(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 1)
+
+    ips = {get_client_ip(make_request(f"198.51.100.{i}, 203.0.113.9")) for i in range(10)}
+    assert ips == {"203.0.113.9"}
+
+
+def test_multiple_trusted_hops(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", 2)
+
+    assert get_client_ip(make_request("1.2.3.4, 203.0.113.9, 10.1.1.1")) == "203.0.113.9"
+
+
+@pytest.mark.parametrize("hops,forwarded", [(0, "1.2.3.4"), (2, "203.0.113.9"), (1, None), (1, " , ")])
+def test_falls_back_to_socket_peer(monkeypatch, hops, forwarded):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", hops)
+
+    assert get_client_ip(make_request(forwarded)) == "10.0.0.5"
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("app.models.mongo_models")
+
+from app.services import student_summary_cache as cache_module  # noqa: E402
+from app.services.student_summary_cache import StudentSummaryCache  # noqa: E402
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+
+    async def build_student_summary(user_email, user_name, user_role, organization_id):
+        calls.append(user_email)
+        await asyncio.sleep(0.05)
+        return f"summary for {user_name}"
+
+    monkeypatch.setattr(cache_module.StudentDataService, "build_student_summary", build_student_summary)
+    return calls
+
+
+def test_concurrent_misses_share_one_build(builds):
+    async def scenario():
+        cache = StudentSummaryCache(ttl=60, max_entries=10)
+        results = await asyncio.gather(*[cache.get_summary("a@x.in", "A") for _ in range(5)])
+        return cache, results
+
+    cache, results = asyncio.run(scenario())
+    assert results == ["summary for A"] * 5
+    assert builds == ["a@x.in"]
+    assert cache.coalesced == 4
+
+
+def test_cancelled_leader_does_not_cancel_waiters(builds):
+    async def scenario():
+        cache = StudentSummaryCache(ttl=60, max_entries=10)
+        leader = asyncio.create_task(cache.get_summary("a@x.in", "A"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_summary("a@x.in", "A"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        summary = await waiter
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The build finished and was cached despite the disconnect
+        assert await cache.get_summary("a@x.in", "A") == summary
+        return cache, summary
+
+    cache, summary = asyncio.run(scenario())
+    assert summary == "summary for A"
+    assert builds == ["a@x.in"]
+    assert cache.hits == 1
+
+
+def test_invalidation_during_build_is_not_overwritten(builds):
+    async def scenario():
+        cache = StudentSummaryCache(ttl=60, max_entries=10)
+        pending = asyncio.create_task(cache.get_summary("a@x.in", "A"))
+        await asyncio.sleep(0)
+        cache.invalidate_all()
+        await pending
+        await cache.get_summary("a@x.in", "A")
+
+    asyncio.run(scenario())
+    assert builds == ["a@x.in", "a@x.in"]
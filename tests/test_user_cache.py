@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("app.models.mongo_models")
+
+from app.services import user_cache as cache_module  # noqa: E402
+from app.services.user_cache import UserCache  # noqa: E402
+
+USER_ID = "64b000000000000000000001"
+
+
+class FakeUser(SimpleNamespace):
+    def model_copy(self, deep=False):
+        return FakeUser(**vars(self))
+
+
+@pytest.fixture
+def users(monkeypatch):
+    store = {USER_ID: FakeUser(id=USER_ID, name="Old name")}
+    loads = []
+
+    async def get(user_id):
+        loads.append(str(user_id))
+        user = store.get(str(user_id))
+        await asyncio.sleep(0.01)
+        return user.model_copy() if user else None
+
+    monkeypatch.setattr(cache_module, "User", SimpleNamespace(get=get))
+    return store, loads
+
+
+def test_user_is_loaded_once_and_copied(users):
+    _, loads = users
+    cache = UserCache(ttl=60, max_entries=10)
+
+    first = asyncio.run(cache.get_user(USER_ID))
+    first.name = "mutated by a request"
+    second = asyncio.run(cache.get_user(USER_ID))
+
+    assert loads == [USER_ID]
+    assert second.name == "Old name"
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidation_during_load_is_not_overwritten(users):
+    store, loads = users
+    cache = UserCache(ttl=60, max_entries=10)
+
+    async def scenario():
+        pending = asyncio.create_task(cache.get_user(USER_ID))
+        await asyncio.sleep(0)
+        # The profile changes while the old document is still being loaded
+        store[USER_ID] = FakeUser(id=USER_ID, name="New name")
+        cache.invalidate(USER_ID)
+        assert (await pending).name == "Old name"
+        return await cache.get_user(USER_ID)
+
+    assert asyncio.run(scenario()).name == "New name"
+    assert len(loads) == 2
+
+
+def test_missing_users_are_not_cached(users):
+    _, loads = users
+    cache = UserCache(ttl=60, max_entries=10)
+    missing = "64b000000000000000000002"
+    assert asyncio.run(cache.get_user(missing)) is None
+    assert asyncio.run(cache.get_user(missing)) is None
+    assert loads == [missing, missing]